@@ -1,12 +1,17 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Response, request, jsonify, send_file, url_for
 import os
 import tempfile
-import shutil
+import threading
 from datetime import datetime
 from l10_sheet_automation import L10SheetAutomation
 from l10_processor import parse_l10_json
+from workbook_cache import WorkbookCache
+from item_index import ItemIndex
+from download_cache import DownloadCache
+from job_queue import JobQueue, PENDING_STATUSES, is_worker_process
+from sheet_delta import describe
 import traceback
-import requests
+import uuid
 from io import BytesIO
 import json
 
@@ -15,6 +20,51 @@ app = Flask(__name__)
 # Configuration
 EXCEL_STORAGE_URL = os.environ.get('EXCEL_STORAGE_URL', '')
 WEBHOOK_RETURN_URL = os.environ.get('WEBHOOK_RETURN_URL', '')
+# 'openpyxl' loads the whole workbook, 'xml' only touches the parts it changes
+L10_ENGINE = os.environ.get('L10_ENGINE', 'openpyxl')
+# Parsed-workbook cache; each entry can take hundreds of MB, so it is off unless sized
+WORKBOOK_CACHE_MB = int(os.environ.get('WORKBOOK_CACHE_MB', '0'))
+WORKBOOK_CACHE_ENTRIES = int(os.environ.get('WORKBOOK_CACHE_ENTRIES', '4'))
+# Downloaded workbooks are kept here and revalidated with ETag/Last-Modified
+EXCEL_CACHE_DIR = os.environ.get('EXCEL_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'l10_excel_cache'))
+EXCEL_DOWNLOAD_TIMEOUT = float(os.environ.get('EXCEL_DOWNLOAD_TIMEOUT', '120'))
+# Async job mode: durable SQLite queue plus a bounded pool of worker processes.
+# JOB_WORKERS bounds each web process's pool, so N gunicorn workers run up to N * JOB_WORKERS jobs
+JOBS_DIR = os.environ.get('JOBS_DIR', 'l10_jobs')
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '2'))
+ASYNC_JOBS_DEFAULT = os.environ.get('ASYNC_JOBS_DEFAULT', 'false')
+# Optional rotation of old tabs into archive workbooks; 0 keeps every tab in the live file
+ARCHIVE_DIR = os.environ.get('ARCHIVE_DIR', 'l10_archive')
+ARCHIVE_KEEP_LAST = int(os.environ.get('ARCHIVE_KEEP_LAST', '0'))
+# Archive in batches so each run doesn't produce a one-tab archive
+ARCHIVE_MIN_SHEETS = int(os.environ.get('ARCHIVE_MIN_SHEETS', '4'))
+# Optional fuzzy matching of new to-dos/issues against tracked ones; empty turns it off
+NEAR_DUPLICATE_THRESHOLD = os.environ.get('NEAR_DUPLICATE_THRESHOLD', '')
+NEAR_DUPLICATE_SCOPE = os.environ.get('NEAR_DUPLICATE_SCOPE', 'latest')
+# Drop empty, unformatted cells past each sheet's content on save (openpyxl engine)
+TRIM_USED_RANGE = os.environ.get('TRIM_USED_RANGE', 'false').lower() in ('1', 'true', 'yes')
+# 'skeleton' builds each new tab from a cached skeleton of the previous one instead of copy_worksheet
+DUPLICATE_MODE = os.environ.get('DUPLICATE_MODE', 'copy')
+# Copy unchanged zip parts into the saved workbook without recompressing them
+SAVE_PASSTHROUGH = os.environ.get('SAVE_PASSTHROUGH', 'true').lower() in ('1', 'true', 'yes')
+# Processes parsing worksheets when the openpyxl engine loads a workbook; 0 uses one per CPU
+LOAD_WORKERS = int(os.environ.get('LOAD_WORKERS', '1'))
+# Compression preset of saved workbooks ('fast', 'balanced' or 'small') and threads deflating their parts; 0 uses one per CPU
+SAVE_COMPRESSION = os.environ.get('SAVE_COMPRESSION', 'balanced')
+SAVE_WORKERS = int(os.environ.get('SAVE_WORKERS', '1'))
+# Optional SQLite index of every to-do and issue in the live workbook; empty turns it off
+ITEM_INDEX_PATH = os.environ.get('ITEM_INDEX_PATH', '')
+# Workbooks returned by /process-l10 stay in memory up to this size, then spill to a temp file
+RESPONSE_SPOOL_MB = int(os.environ.get('RESPONSE_SPOOL_MB', '32'))
+# With mode=delta only the new tab is returned, as a one-tab workbook ('xlsx') or described as JSON ('json')
+DELTA_FORMAT = os.environ.get('DELTA_FORMAT', 'xlsx')
+
+download_cache = DownloadCache(EXCEL_CACHE_DIR, timeout=(10, EXCEL_DOWNLOAD_TIMEOUT))
+
+workbook_cache = None
+if WORKBOOK_CACHE_MB > 0:
+    workbook_cache = WorkbookCache(max_entries=WORKBOOK_CACHE_ENTRIES,
+                                   max_bytes=WORKBOOK_CACHE_MB * 1024 * 1024)
 
 @app.route('/health', methods=['GET'])
 def health():
@@ -27,7 +77,8 @@ def debug():
     return jsonify({
         'current_dir': os.getcwd(),
         'files': os.listdir('.'),
-        'xlsx_files': [f for f in os.listdir('.') if f.endswith('.xlsx')]
+        'xlsx_files': [f for f in os.listdir('.') if f.endswith('.xlsx')],
+        'workbook_cache': workbook_cache.stats() if workbook_cache else None
     })
 
 @app.route('/echo', methods=['POST'])
@@ -49,11 +100,300 @@ def echo():
         return jsonify({'error': str(e)}), 500
 
 
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Bytes read from a saved workbook per chunk of a multipart response
+RESPONSE_CHUNK_SIZE = 64 * 1024
+
+
+class MissingWorkbookError(Exception):
+    """No excel_url was given and the local template is missing"""
+
+
+def extract_meeting_data(data):
+    """Find the meeting data and meeting date in a Zapier payload"""
+    # Try different possible data locations
+    meeting_json = None
+    meeting_date = None
+    
+    # Check if Zapier sent data in "JSON" field (common pattern)
+    if 'JSON' in data and isinstance(data['JSON'], str):
+        print("Found data in JSON field from Zapier")
+        # Parse the JSON string
+        try:
+            # Remove 'json' prefix if present
+            json_str = data['JSON']
+            if json_str.startswith('json '):
+                json_str = json_str[5:]
+            meeting_json = json.loads(json_str)
+            print(f"Parsed JSON data successfully: {list(meeting_json.keys()) if isinstance(meeting_json, dict) else 'not a dict'}")
+        except:
+            # If JSON parsing fails, treat as text
+            meeting_json = data['JSON']
+            print("Treating JSON field as raw text")
+    # Try standard location
+    elif 'meeting_data' in data:
+        meeting_json = data['meeting_data']
+        print("Found meeting_data in standard location")
+    # Try if data IS the meeting data
+    elif 'NEW TO-DOS' in data or 'new_commitments' in data:
+        meeting_json = data
+        print("Data IS the meeting data (no wrapper)")
+    # Try nested structure
+    elif 'data' in data and isinstance(data['data'], dict):
+        if 'meeting_data' in data['data']:
+            meeting_json = data['data']['meeting_data']
+            print("Found meeting_data in nested structure")
+    
+    if meeting_json is None:
+        meeting_json = data  # Last resort - use entire payload
+        print("Using entire payload as meeting data")
+    
+    # Extract meeting date if provided
+    if 'meeting_date' in data:
+        meeting_date = data['meeting_date']
+        print(f"Found meeting date: {meeting_date}")
+    
+    print(f"Meeting JSON type: {type(meeting_json)}")
+    print(f"Meeting JSON keys: {list(meeting_json.keys()) if isinstance(meeting_json, dict) else 'Not a dict'}")
+    
+    # Parse the meeting data
+    if isinstance(meeting_json, str):
+        meeting_data = parse_l10_json(meeting_json)
+    else:
+        meeting_data = parse_l10_json(meeting_json)  # Always call parse_l10_json to trigger conversion
+    
+    print(f"Parsed meeting data with {len(meeting_data.get('NEW TO-DOS', []))} new TODOs and {len(meeting_data.get('ISSUES LIST (IDS)', []))} issues")
+    return meeting_data, meeting_date
+
+
+def build_l10_workbook(data, output):
+    """
+    Run the whole pipeline for one request payload and save the updated
+    workbook once to output, a path or a writable binary file. Used directly
+    by /process-l10 and by job workers.
+    """
+    meeting_data, meeting_date = extract_meeting_data(data)
+    delta = requested_delta(data)
+    with open_source(data) as source:
+        automation = open_automation(data, source, output, delta)
+        try:
+            # Rotate old tabs out first: the archive is cut from the source workbook.
+            # A delta leaves the master as it is, so there is nothing to rotate out of.
+            archive = None
+            keep_last = int(data.get('archive_keep_last', ARCHIVE_KEEP_LAST))
+            if keep_last > 0 and delta is None:
+                archive = automation.archive_old_sheets(ARCHIVE_DIR, keep_last=keep_last,
+                                                        min_sheets=ARCHIVE_MIN_SHEETS)
+            
+            # Process the meeting data - create new sheet with AI section
+            result = automation.create_next_l10_sheet_from_data(
+                meeting_data,
+                'weekly',
+                meeting_date=meeting_date
+            )
+            
+            # The automation has saved to output, unless the delta is described as JSON
+            if delta == 'json':
+                result['delta'] = describe(automation)[0]
+        finally:
+            automation.close()
+    
+    print(f"Sheets after save: {result}")
+    if delta != 'json':
+        print(f"File size: {output_size(output)} bytes")
+    
+    if archive:
+        result['archive'] = archive
+    
+    # Generate filename with the new sheet name
+    prefix = 'L10_Delta' if delta else 'L10_Meeting'
+    result['download_name'] = f"{prefix}_{result['new_sheet_name'].replace(' ', '_')}.xlsx"
+    return result
+
+
+def build_l10_batch_workbook(data, output):
+    """
+    Apply every meeting in data['meetings'] to one workbook with a single
+    load and save. Each item accepts the same shapes as a /process-l10 body.
+    """
+    meetings = []
+    for item in data.get('meetings', []):
+        meeting_data, meeting_date = extract_meeting_data(item)
+        meetings.append({'meeting_data': meeting_data, 'meeting_date': meeting_date})
+    
+    delta = requested_delta(data)
+    with open_source(data) as source:
+        automation = open_automation(data, source, output, delta)
+        try:
+            results = automation.create_next_l10_sheets_from_data(meetings, 'weekly')
+            if delta == 'json':
+                for result, description in zip(results, describe(automation)):
+                    result['delta'] = description
+        finally:
+            automation.close()
+    
+    print(f"Batch results: {results}")
+    if delta != 'json':
+        print(f"File size: {output_size(output)} bytes")
+    return results
+
+
+def requested_delta(data):
+    """The delta format asked for with mode=delta, or None for the whole workbook"""
+    if data.get('mode', 'full') != 'delta':
+        return None
+    return data.get('delta_format', DELTA_FORMAT)
+
+
+def request_options(data):
+    """Copy mode and delta_format from the query string into the payload, unless it sets them"""
+    for option in ('mode', 'delta_format'):
+        if data is not None and option in request.args:
+            data.setdefault(option, request.args[option])
+    return data
+
+
+def output_size(output):
+    """Size of a saved workbook, given its path or the file it was written to"""
+    if hasattr(output, 'seek'):
+        return output.seek(0, os.SEEK_END)
+    return os.path.getsize(output)
+
+
+def open_source(data):
+    """
+    Open the payload's source workbook read-only. It is the local template or
+    is opened by the download cache, which replaces or removes its files
+    rather than rewriting them, so the open file keeps the version this
+    request started with.
+    """
+    excel_url = data.get('excel_url', EXCEL_STORAGE_URL)
+    
+    # Download the current Excel file or use template
+    if excel_url:
+        print(f"Downloading Excel from: {excel_url}")
+        source = download_cache.open(excel_url)
+    else:
+        # Use local template
+        excel_file = 'L10 Summary Template 1.xlsx'
+        if not os.path.exists(excel_file):
+            raise MissingWorkbookError('No Excel file provided and no template found')
+        source = open(excel_file, 'rb')
+    
+    print(f"Working with Excel file: {source.name}")
+    return source
+
+
+def open_automation(data, source, output, delta=None):
+    """Open the source workbook for editing; saving writes to output (or the delta) and leaves source untouched"""
+    engine = data.get('engine', L10_ENGINE)
+    threshold = data.get('near_duplicate_threshold', NEAR_DUPLICATE_THRESHOLD)
+    threshold = float(threshold) if threshold not in (None, '') else None
+    scope = data.get('near_duplicate_scope', NEAR_DUPLICATE_SCOPE)
+    
+    # Use L10SheetAutomation which adds a new sheet tab
+    automation = L10SheetAutomation(source, engine=engine, cache=workbook_cache,
+                                    near_duplicate_threshold=threshold,
+                                    near_duplicate_scope=scope,
+                                    item_index=ItemIndex(ITEM_INDEX_PATH) if ITEM_INDEX_PATH else None,
+                                    trim_used_range=TRIM_USED_RANGE,
+                                    duplicate_mode=DUPLICATE_MODE,
+                                    output=output,
+                                    delta=delta,
+                                    passthrough=SAVE_PASSTHROUGH,
+                                    load_workers=LOAD_WORKERS,
+                                    compression=SAVE_COMPRESSION,
+                                    save_workers=SAVE_WORKERS)
+    print(f"Using {engine} engine")
+    
+    # Get sheet names before
+    print(f"Sheets before: {automation.wb.sheetnames}")
+    return automation
+
+
+def wants_async(data):
+    """Async mode is opted into with "async": true in the body or ?async=1"""
+    flag = data.get('async', request.args.get('async', ASYNC_JOBS_DEFAULT))
+    return str(flag).lower() in ('1', 'true', 'yes')
+
+
+def stream_workbook(output, download_name):
+    """Response sending a workbook saved to an open file in chunks; the file is closed once sent"""
+    size = output_size(output)
+    output.seek(0)
+    response = send_file(output, as_attachment=True, download_name=download_name,
+                         mimetype=XLSX_MIMETYPE)
+    response.content_length = size
+    return response
+
+
+def stream_workbook_with_results(output, download_name, results, attachments=()):
+    """
+    multipart/mixed response: results as an application/json part, then the
+    workbook saved to an open file and any further (open file, download name)
+    workbooks, each sent in chunks; the files are closed once sent
+    """
+    boundary = uuid.uuid4().hex
+    workbooks = [(output, download_name)] + list(attachments)
+    head = f"--{boundary}\r\nContent-Type: application/json\r\n\r\n{json.dumps(results)}".encode()
+    parts = []
+    for workbook, name in workbooks:
+        part_head = (f"\r\n--{boundary}\r\nContent-Type: {XLSX_MIMETYPE}\r\n"
+                     f"Content-Disposition: attachment; filename=\"{name}\"\r\n\r\n").encode()
+        parts.append((part_head, workbook, output_size(workbook)))
+        workbook.seek(0)
+    tail = f"\r\n--{boundary}--\r\n".encode()
+    
+    def body():
+        yield head
+        for part_head, workbook, _ in parts:
+            yield part_head
+            for chunk in iter(lambda: workbook.read(RESPONSE_CHUNK_SIZE), b''):
+                yield chunk
+        yield tail
+    
+    def close():
+        for workbook, _ in workbooks:
+            workbook.close()
+    
+    response = Response(body(), content_type=f'multipart/mixed; boundary={boundary}')
+    response.content_length = len(head) + sum(len(part_head) + size for part_head, _, size in parts) + len(tail)
+    response.call_on_close(close)
+    return response
+
+
+def archive_path(result):
+    """Path of the archive workbook a result's archive step wrote, or None if it archived nothing"""
+    archive = result.get('archive')
+    if not archive or not archive['archive']:
+        return None
+    return os.path.join(ARCHIVE_DIR, archive['archive'])
+
+
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """
+    The async job queue, created on first use so that importing this module
+    doesn't create the jobs database. Creating it also requeues the jobs an
+    earlier process left behind; a client polling its job triggers that.
+    """
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue(JOBS_DIR, build_l10_workbook, max_workers=JOB_WORKERS)
+            if not is_worker_process():
+                _job_queue.recover()
+        return _job_queue
+
+
 @app.route('/process-l10', methods=['POST'])
 def process_l10():
     """Main webhook endpoint for Zapier"""
-    working_file = None
-    excel_file = None
+    output = None
     
     try:
         print("Received L10 processing request")
@@ -64,121 +404,81 @@ def process_l10():
         print(raw_data[:500])
         
         # Get JSON from Zapier
-        data = request.json
+        data = request_options(request.json)
         print(f"=== PARSED REQUEST STRUCTURE ===")
         print(f"Top-level keys: {list(data.keys()) if data else 'None'}")
         
-        # Try different possible data locations
-        meeting_json = None
-        meeting_date = None
-        
-        # Check if Zapier sent data in "JSON" field (common pattern)
-        if 'JSON' in data and isinstance(data['JSON'], str):
-            print("Found data in JSON field from Zapier")
-            # Parse the JSON string
-            try:
-                # Remove 'json' prefix if present
-                json_str = data['JSON']
-                if json_str.startswith('json '):
-                    json_str = json_str[5:]
-                meeting_json = json.loads(json_str)
-                print(f"Parsed JSON data successfully: {list(meeting_json.keys()) if isinstance(meeting_json, dict) else 'not a dict'}")
-            except:
-                # If JSON parsing fails, treat as text
-                meeting_json = data['JSON']
-                print("Treating JSON field as raw text")
-        # Try standard location
-        elif 'meeting_data' in data:
-            meeting_json = data['meeting_data']
-            print("Found meeting_data in standard location")
-        # Try if data IS the meeting data
-        elif 'NEW TO-DOS' in data or 'new_commitments' in data:
-            meeting_json = data
-            print("Data IS the meeting data (no wrapper)")
-        # Try nested structure
-        elif 'data' in data and isinstance(data['data'], dict):
-            if 'meeting_data' in data['data']:
-                meeting_json = data['data']['meeting_data']
-                print("Found meeting_data in nested structure")
-        
-        if meeting_json is None:
-            meeting_json = data  # Last resort - use entire payload
-            print("Using entire payload as meeting data")
-        
-        # Extract meeting date if provided
-        if 'meeting_date' in data:
-            meeting_date = data['meeting_date']
-            print(f"Found meeting date: {meeting_date}")
-        
-        print(f"Meeting JSON type: {type(meeting_json)}")
-        print(f"Meeting JSON keys: {list(meeting_json.keys()) if isinstance(meeting_json, dict) else 'Not a dict'}")
-        excel_url = data.get('excel_url', EXCEL_STORAGE_URL)
-        
-        # Parse the meeting data
-        if isinstance(meeting_json, str):
-            meeting_data = parse_l10_json(meeting_json)
-        else:
-            meeting_data = parse_l10_json(meeting_json)  # Always call parse_l10_json to trigger conversion
+        if wants_async(data):
+            job_id = get_job_queue().submit(data)
+            print(f"Queued job {job_id}")
+            return jsonify({
+                'job_id': job_id,
+                'status': 'queued',
+                'status_url': url_for('get_job', job_id=job_id)
+            }), 202
         
-        print(f"Parsed meeting data with {len(meeting_data.get('NEW TO-DOS', []))} new TODOs and {len(meeting_data.get('ISSUES LIST (IDS)', []))} issues")
+        # The workbook is saved once into memory and streamed from there
+        output = tempfile.SpooledTemporaryFile(max_size=RESPONSE_SPOOL_MB * 1024 * 1024)
+        result = build_l10_workbook(data, output)
+        if 'delta' in result:
+            return jsonify(result)
         
-        # Download the current Excel file or use template
-        if excel_url:
-            print(f"Downloading Excel from: {excel_url}")
-            response = requests.get(excel_url)
-            response.raise_for_status()
-            
-            with tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False) as tmp:
-                tmp.write(response.content)
-                excel_file = tmp.name
+        # Return the updated file with the new sheet tab, and the tabs archived out of it
+        archived = archive_path(result)
+        if archived:
+            response = stream_workbook_with_results(output, result['download_name'], result,
+                                                    [(open(archived, 'rb'), result['archive']['archive'])])
         else:
-            # Use local template
-            excel_file = 'L10 Summary Template 1.xlsx'
-            if not os.path.exists(excel_file):
-                return jsonify({'error': 'No Excel file provided and no template found'}), 400
-        
-        # Create a working copy to preserve the original
-        with tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False) as tmp:
-            shutil.copy(excel_file, tmp.name)
-            working_file = tmp.name
-        
-        print(f"Working with Excel file: {working_file}")
-        
-        # Use L10SheetAutomation which adds a new sheet tab
-        automation = L10SheetAutomation(working_file)
-        
-        # Get sheet names before
-        print(f"Sheets before: {automation.wb.sheetnames}")
-        
-        # Process the meeting data - create new sheet with AI section
-        result = automation.create_next_l10_sheet_from_data(
-            meeting_data,
-            'weekly',
-            meeting_date=meeting_date
-        )
-        
-        # CRITICAL: The automation saves to self.workbook_path which is the temp file
-        # But we need to make sure it's actually saved
-        # Force save to ensure changes are written
-        automation.wb.save(working_file)
-        automation.wb.close()
+            response = stream_workbook(output, result['download_name'])
+        output = None
+        return response
+    
+    except MissingWorkbookError as e:
+        return jsonify({'error': str(e)}), 400
         
-        print(f"Sheets after save: {result}")
-        print(f"File size: {os.path.getsize(working_file)} bytes")
+    except Exception as e:
+        print(f"Error processing L10: {str(e)}")
+        print(traceback.format_exc())
+        return jsonify({
+            'error': str(e),
+            'traceback': traceback.format_exc()
+        }), 500
+    
+    finally:
+        # The response closes the output once sent; only a failed request closes it here
+        if output is not None:
+            output.close()
+
+
+@app.route('/process-l10/batch', methods=['POST'])
+def process_l10_batch():
+    """Apply an ordered list of meetings to one workbook in a single load/save"""
+    output = None
+    
+    try:
+        data = request_options(request.json or {})
+        meetings = data.get('meetings')
+        if not isinstance(meetings, list) or not meetings:
+            return jsonify({'error': 'Expected a non-empty "meetings" list'}), 400
+        print(f"Received L10 batch request with {len(meetings)} meetings")
         
-        # Generate filename with the new sheet name
-        output_filename = f"L10_Meeting_{result['new_sheet_name'].replace(' ', '_')}.xlsx"
+        output = tempfile.SpooledTemporaryFile(max_size=RESPONSE_SPOOL_MB * 1024 * 1024)
+        results = build_l10_batch_workbook(data, output)
+        if 'delta' in results[-1]:
+            return jsonify(results)
+        last_sheet = results[-1]['new_sheet_name'].replace(' ', '_')
+        prefix = 'L10_Delta_Batch' if requested_delta(data) else 'L10_Meeting_Batch'
         
-        # Return the updated file with the new sheet tab
-        return send_file(
-            working_file,
-            as_attachment=True,
-            download_name=output_filename,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
+        # Per-meeting results, same shape as the single-meeting result, ahead of the workbook
+        response = stream_workbook_with_results(output, f"{prefix}_{last_sheet}.xlsx", results)
+        output = None
+        return response
+    
+    except MissingWorkbookError as e:
+        return jsonify({'error': str(e)}), 400
         
     except Exception as e:
-        print(f"Error processing L10: {str(e)}")
+        print(f"Error processing L10 batch: {str(e)}")
         print(traceback.format_exc())
         return jsonify({
             'error': str(e),
@@ -186,13 +486,39 @@ def process_l10():
         }), 500
     
     finally:
-        # Cleanup temp files
-        for temp_file in [excel_file, working_file]:
-            if temp_file and os.path.exists(temp_file) and temp_file.startswith('/tmp'):
-                try:
-                    os.remove(temp_file)
-                except:
-                    pass
+        if output is not None:
+            output.close()
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Status of an async job; once it is done, the finished workbook (or with ?part=archive, its archive)"""
+    job = get_job_queue().get(job_id)
+    if job is None:
+        return jsonify({'error': f'Unknown job {job_id}'}), 404
+    
+    if request.args.get('part') == 'archive':
+        archived = archive_path(job['result']) if job['status'] == 'done' else None
+        if not archived:
+            return jsonify({'error': f'Job {job_id} has no archive'}), 404
+        return send_file(archived, as_attachment=True, download_name=job['result']['archive']['archive'],
+                         mimetype=XLSX_MIMETYPE)
+    
+    # A delta described as JSON has no workbook to send
+    if job['status'] == 'done' and request.args.get('format') != 'json' and 'delta' not in job['result']:
+        return send_file(
+            job['result_path'],
+            as_attachment=True,
+            download_name=job['result']['download_name'],
+            mimetype=XLSX_MIMETYPE
+        )
+    
+    job.pop('result_path', None)
+    if job['status'] in PENDING_STATUSES:
+        return jsonify(job), 202
+    if job['status'] == 'failed':
+        return jsonify(job), 500
+    return jsonify(job)
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
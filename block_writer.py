@@ -0,0 +1,136 @@
+"""
+Blocks of rows written to a sheet in one call.
+
+The AI IDENTIFIED ITEMS section is a stack of small grids (a banner, a
+header row and one row per to-do, issue or reviewed to-do), which used to
+be written one sheet.cell() call and one apply_style() call at a time. A
+SheetBlock is built up row by row as plain lists, with a registered style
+per band of rows and columns and the ranges to merge, and write() puts the
+whole thing on the sheet at once. For openpyxl sheets cells go straight
+into the sheet's cell map and each band's style array is resolved once per
+distinct base style, so hundreds of items cost little more than creating
+their cells. Strings are stripped of the control characters Excel can't
+store, which openpyxl would otherwise reject and the xml engine would
+write as a broken sheet.
+"""
+
+from copy import copy
+
+from openpyxl.cell.cell import ERROR_CODES, ILLEGAL_CHARACTERS_RE
+from openpyxl.styles.cell_style import StyleArray
+
+from openpyxl_internals import cell_map, put_cell, set_raw_value, set_style_array, style_array
+from style_registry import apply_style, registry_for
+from used_range import extend
+
+
+# Longest string a cell holds; openpyxl truncates to it as well
+MAX_TEXT_LENGTH = 32767
+
+
+def _clean(value):
+    if isinstance(value, str):
+        return ILLEGAL_CHARACTERS_RE.sub('', value)
+    return value
+
+
+def _bind(cell, value):
+    """cell.value = value, with plain strings typed directly as openpyxl's setter would"""
+    if type(value) is not str:
+        cell.value = value
+        return
+    value = ILLEGAL_CHARACTERS_RE.sub('', value)[:MAX_TEXT_LENGTH]
+    if len(value) > 1 and value.startswith('='):
+        data_type = 'f'
+    elif value in ERROR_CODES:
+        data_type = 'e'
+    else:
+        data_type = 's'
+    set_raw_value(cell, value, data_type)
+
+
+class SheetBlock:
+    """Rows of values, style bands and merges relative to the block's top-left cell"""
+
+    def __init__(self):
+        self.rows = []
+        self.bands = []
+        self.merges = []
+
+    def __len__(self):
+        return len(self.rows)
+
+    def add_row(self, values, style=None, merge_to=None):
+        """
+        Append a row; None leaves a cell untouched. style applies a registered
+        style to the row's cells, merge_to merges the row from its first
+        column through that column.
+        """
+        self.add_rows([values], style)
+        if merge_to:
+            self.merges.append((len(self.rows) - 1, merge_to))
+
+    def add_rows(self, rows, style=None):
+        """Append rows sharing one style across the band they cover"""
+        first = len(self.rows)
+        self.rows.extend(list(values) for values in rows)
+        if style and len(self.rows) > first:
+            width = max(len(values) for values in self.rows[first:])
+            self.bands.append((first, len(self.rows) - 1, width, style))
+
+    def skip(self, count=1):
+        """Leave count empty rows"""
+        self.rows.extend([] for _ in range(count))
+
+    def write(self, sheet, start_row, start_column=1):
+        """Write the block with its top-left cell at (start_row, start_column); returns the row below it"""
+        if hasattr(sheet, '_get_value'):
+            self._write_cells(sheet, start_row, start_column)
+        else:
+            self._write_openpyxl(sheet, start_row, start_column)
+
+        for offset, last_column in self.merges:
+            row = start_row + offset
+            sheet.merge_cells(start_row=row, start_column=start_column,
+                              end_row=row, end_column=start_column + last_column - 1)
+        filled = [offset for offset, values in enumerate(self.rows) if any(v is not None for v in values)]
+        if filled:
+            width = max(len(values) for values in self.rows)
+            extend(sheet, start_row + filled[-1], start_column + width - 1)
+        return start_row + len(self.rows)
+
+    def _write_cells(self, sheet, start_row, start_column):
+        # xlsx_engine sheets resolve and dedupe styles in their own StyleTable
+        for offset, values in enumerate(self.rows):
+            for index, value in enumerate(values):
+                if value is not None:
+                    sheet.cell(row=start_row + offset, column=start_column + index, value=_clean(value))
+        for first, last, width, style in self.bands:
+            for row in range(start_row + first, start_row + last + 1):
+                for column in range(start_column, start_column + width):
+                    apply_style(sheet.cell(row=row, column=column), style)
+
+    def _write_openpyxl(self, ws, start_row, start_column):
+        cells = cell_map(ws)
+
+        def cell_at(row, column):
+            cell = cells.get((row, column))
+            if cell is None:
+                cell = put_cell(ws, row, column)
+            return cell
+
+        for offset, values in enumerate(self.rows):
+            row = start_row + offset
+            for index, value in enumerate(values):
+                if value is not None:
+                    _bind(cell_at(row, start_column + index), value)
+
+        registry = registry_for(ws.parent)
+        for first, last, width, style in self.bands:
+            for row in range(start_row + first, start_row + last + 1):
+                for column in range(start_column, start_column + width):
+                    cell = cell_at(row, column)
+                    base = style_array(cell)
+                    if base is None:
+                        base = StyleArray()
+                    set_style_array(cell, copy(registry.style_array(style, base)))
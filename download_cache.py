@@ -0,0 +1,203 @@
+"""
+Conditional, connection-pooled download of workbooks from excel_url.
+
+Downloads are streamed to disk in chunks and kept in a small on-disk cache
+keyed by URL. Later requests for the same URL send If-None-Match /
+If-Modified-Since, so an unchanged workbook costs one 304 round trip and
+no transfer or file write at all. A 304 is only trusted in answer to such a
+conditional request while the cached copy still exists; otherwise the
+workbook is downloaded again without conditions.
+
+Requests run on several threads and processes at once, so every entry is
+read, refreshed and pruned under an flock: its data and metadata are always
+replaced together, and open hands back the workbook as an already open
+file, which a later refresh or prune of the entry can't take away from it.
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+CHUNK_SIZE = 256 * 1024
+
+# Entries share lock files by the first hex digits of their key. Lock files
+# are never deleted, so pruning can't split a lock between a request waiting
+# on the old file and one creating a new one.
+LOCK_PREFIX_LENGTH = 2
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Process-wide requests.Session with a pooled, retrying adapter"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            retries = Retry(total=3, backoff_factor=0.5,
+                            status_forcelist=(502, 503, 504),
+                            allowed_methods=('GET', 'HEAD'))
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retries)
+            session = requests.Session()
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _session = session
+        return _session
+
+
+@contextmanager
+def _locked(lock_path, wait=True):
+    """
+    Hold an exclusive flock on lock_path, against other threads and
+    processes. With wait=False, yield False instead of waiting for it.
+    """
+    with open(lock_path, 'a') as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX if wait else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _replace_atomically(directory, path, write):
+    """Write a file through write(f) under a temporary name and move it over path"""
+    fd, tmp_path = tempfile.mkstemp(suffix='.part', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            result = write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return result
+
+
+class DownloadCache:
+    """On-disk cache of downloaded workbooks with HTTP revalidation"""
+
+    def __init__(self, cache_dir, max_entries=16, timeout=(10, 120)):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.lock_dir = os.path.join(cache_dir, 'locks')
+        os.makedirs(self.lock_dir, exist_ok=True)
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        base = os.path.join(self.cache_dir, key)
+        return base + '.xlsx', base + '.json'
+
+    def _lock_path(self, data_path):
+        return os.path.join(self.lock_dir, os.path.basename(data_path)[:LOCK_PREFIX_LENGTH] + '.lock')
+
+    def open(self, url):
+        """
+        The current contents of url as an open binary file. It is opened
+        while the entry is locked, so it keeps these bytes even if the entry
+        is refreshed or pruned before the caller is done with it.
+        """
+        data_path, meta_path = self._paths(url)
+        with _locked(self._lock_path(data_path)):
+            self._refresh(url, data_path, meta_path)
+            workbook = open(data_path, 'rb')
+        self._prune()
+        return workbook
+
+    def _refresh(self, url, data_path, meta_path):
+        """Bring the entry up to date with url; the caller holds its lock"""
+        headers = {}
+        meta = {}
+        if os.path.exists(data_path) and os.path.exists(meta_path):
+            try:
+                with open(meta_path, 'r') as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                meta = {}
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        with get_session().get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+            if response.status_code != 304:
+                return self._store(url, response, data_path, meta_path)
+            # A 304 only vouches for the cached copy if one was revalidated and it is still there
+            if headers and self._touch(data_path):
+                print(f"Excel not modified, using cached copy: {data_path}")
+                return
+        print(f"Got 304 without a cached copy to use, downloading {url} again")
+
+        with get_session().get(url, stream=True, timeout=self.timeout) as response:
+            if response.status_code == 304:
+                raise requests.HTTPError(f"304 Not Modified for an unconditional request to {url}",
+                                         response=response)
+            self._store(url, response, data_path, meta_path)
+
+    @staticmethod
+    def _touch(data_path):
+        """Mark a cached copy as recently used; False if it is gone"""
+        try:
+            os.utime(data_path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def _store(self, url, response, data_path, meta_path):
+        """Stream a successful response into the entry, data first and then its metadata"""
+        response.raise_for_status()
+
+        def write_data(f):
+            size = 0
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                f.write(chunk)
+                size += len(chunk)
+            return size
+
+        size = _replace_atomically(self.cache_dir, data_path, write_data)
+        meta = {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'size': size,
+        }
+        _replace_atomically(self.cache_dir, meta_path, lambda f: f.write(json.dumps(meta).encode('utf-8')))
+        print(f"Downloaded {size} bytes to {data_path}")
+
+    def _prune(self):
+        """
+        Drop the least recently used entries beyond max_entries. An entry
+        whose lock is held is being fetched and stays; files already handed
+        out by open stay readable after their entry is removed.
+        """
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.xlsx'):
+                data_path = os.path.join(self.cache_dir, name)
+                try:
+                    entries.append((os.path.getmtime(data_path), data_path))
+                except OSError:
+                    pass
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort()
+        for _, data_path in entries[:len(entries) - self.max_entries]:
+            with _locked(self._lock_path(data_path), wait=False) as held:
+                if not held:
+                    continue
+                for path in (data_path, data_path[:-len('.xlsx')] + '.json'):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
@@ -0,0 +1,341 @@
+"""
+Persistent index of every to-do and issue across a workbook's weekly tabs.
+
+Questions like "is this to-do already tracked?" or "when was this issue
+first raised?" would otherwise mean reading every tab cell by cell. The
+index is a SQLite sidecar holding one row per item (owner, text, status,
+tab, meeting date and row), built once by a backfill over all tabs and
+then kept current by L10SheetAutomation, which indexes each tab it adds.
+The index records the SHA-256 of the workbook it was built from, the tabs
+indexed since (pending) and the SHA-256 of the workbook they were saved
+in. Opening the saved workbook makes it the new base; opening the base
+again, e.g. after a failed save or when every request starts from the
+template, re-reads just the pending tabs from it. Any other workbook is
+a stale match and the index is rebuilt.
+
+    python item_index.py "L10 Summary Template 1.xlsx" l10_index.sqlite3
+    python item_index.py "L10 Summary Template 1.xlsx" l10_index.sqlite3 --find "State Exams"
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import time
+
+from sheet_archive import sheet_date
+from todo_dedup import normalize
+from used_range import cell_value, used_range
+from workbook_cache import file_digest
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    owner_key TEXT NOT NULL,
+    text TEXT NOT NULL,
+    text_key TEXT NOT NULL,
+    status TEXT NOT NULL,
+    sheet_name TEXT NOT NULL,
+    sheet_date TEXT,
+    row INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_by_owner ON items (kind, owner_key, text_key);
+CREATE INDEX IF NOT EXISTS items_by_text ON items (kind, text_key, sheet_date);
+CREATE INDEX IF NOT EXISTS items_by_sheet ON items (sheet_name);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+KINDS = ('todo', 'issue')
+
+# Status cells that mean a to-do is done or an issue is solved
+DONE_STATUSES = ('yes', 'done', 'complete', 'completed', 'solved', 'closed')
+
+# The to-do and issue headers sit in the first rows of every tab
+HEADER_ROWS = 60
+
+# Headers are looked for in the first eight columns and items read up to two columns right of them
+ITEM_COLUMNS = 10
+
+
+def _connect(db_path):
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    return conn
+
+
+def _text(value):
+    return str(value).strip() if value is not None else ''
+
+
+def read_sheet_items(sheet):
+    """
+    (kind, owner, text, status, row) for the to-dos and issues on a weekly
+    tab. The WHO / TO-DO / DONE? header and the Issues (IDS) header move
+    between rows and columns across the workbook's history, so both are
+    located first and the columns are taken from them.
+    """
+    max_row, max_col = used_range(sheet)
+    return find_items(lambda row, column: cell_value(sheet, row, column), max_row, max_col)
+
+
+def find_headers(value_at, max_row, max_col):
+    """(row, column) of the WHO / TO-DO header and of the Issues (IDS) header below it, each None if missing"""
+    max_col = min(8, max_col)
+    todo_header = issue_header = None
+    for row in range(1, min(HEADER_ROWS, max_row) + 1):
+        for col in range(1, max_col + 1):
+            value = _text(value_at(row, col)).upper()
+            if (todo_header is None and value == 'WHO'
+                    and _text(value_at(row, col + 1)).upper() == 'TO-DO'):
+                todo_header = (row, col)
+            elif todo_header is not None and 'ISSUES' in value and '(IDS)' in value:
+                issue_header = (row, col)
+                break
+        if issue_header:
+            break
+    return todo_header, issue_header
+
+
+def issues_end(value_at, row, issue_col):
+    """Whether the issue list in issue_col is over by row"""
+    marker = value_at(row, issue_col - 1) if issue_col > 1 else None
+    return not _text(value_at(row, issue_col)) or 'DUE DATE' in _text(marker).upper()
+
+
+def find_items(value_at, max_row, max_col):
+    """
+    read_sheet_items over any source of values: value_at(row, column)
+    gives a value and max_row, max_col bound the tab's values. Nothing past
+    column ITEM_COLUMNS is read.
+    """
+    todo_header, issue_header = find_headers(value_at, max_row, max_col)
+
+    items = []
+    if todo_header:
+        header_row, who_col = todo_header
+        end_row = issue_header[0] if issue_header else max_row + 1
+        for row in range(header_row + 1, end_row):
+            text = _text(value_at(row, who_col + 1))
+            if not text:
+                continue
+            owner = _text(value_at(row, who_col))
+            status = _text(value_at(row, who_col + 2))
+            items.append(('todo', owner, text, status, row))
+
+    if issue_header:
+        header_row, issue_col = issue_header
+        for row in range(header_row + 1, max_row + 1):
+            if issues_end(value_at, row, issue_col):
+                break
+            marker = value_at(row, issue_col - 1) if issue_col > 1 else None
+            text = _text(value_at(row, issue_col))
+            # Older tabs list who owns the issue where newer ones put its priority
+            owner = marker.strip() if isinstance(marker, str) else ''
+            status = _text(value_at(row, issue_col + 1))
+            items.append(('issue', owner, text, status, row))
+    return items
+
+
+def is_done(status):
+    return normalize(status) in DONE_STATUSES
+
+
+class ItemIndex:
+    """SQLite sidecar index of to-dos and issues, tied to one workbook version by hash"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = _connect(db_path)
+        with self._conn:
+            self._conn.executescript(SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    def _meta(self, key):
+        row = self._conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row['value'] if row else None
+
+    def _set_meta(self, key, value):
+        self._conn.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, value))
+
+    @property
+    def workbook_digest(self):
+        return self._meta('workbook_sha256')
+
+    @property
+    def pending_sheets(self):
+        """Tabs (re)indexed or dropped since the index last matched a workbook file"""
+        return json.loads(self._meta('pending_sheets') or '[]')
+
+    def _set_pending(self, titles):
+        self._set_meta('pending_sheets', json.dumps(sorted(titles)))
+
+    def _add_pending(self, titles):
+        saved = self._meta('saved_sha256')
+        if saved:
+            # Changed again after a save: what was pending is in the saved workbook now
+            self._set_base(saved)
+        self._set_pending(set(self.pending_sheets) | set(titles))
+
+    def _set_base(self, digest):
+        self._set_meta('workbook_sha256', digest)
+        self._set_meta('saved_sha256', '')
+        self._set_pending(())
+
+    def is_current(self, workbook_path):
+        """Whether the index describes exactly this workbook file"""
+        digest = file_digest(workbook_path)
+        if digest == self._meta('saved_sha256'):
+            return True
+        return digest == self.workbook_digest and not self.pending_sheets
+
+    def _replace_sheet(self, title, items):
+        date = sheet_date(title)
+        self._conn.execute('DELETE FROM items WHERE sheet_name = ?', (title,))
+        rows = [(kind, owner, normalize(owner), text, normalize(text), status,
+                 title, date.strftime('%Y-%m-%d') if date else None, row)
+                for kind, owner, text, status, row in items]
+        self._conn.executemany(
+            'INSERT INTO items (kind, owner, owner_key, text, text_key, status, '
+            'sheet_name, sheet_date, row) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+        return len(rows)
+
+    def index_sheet(self, sheet):
+        """(Re)index one tab, pending until mark_synced records the workbook it is saved in"""
+        with self._conn:
+            count = self._replace_sheet(sheet.title, read_sheet_items(sheet))
+            self._add_pending([sheet.title])
+        return count
+
+    def remove_sheets(self, titles):
+        """Drop the items of tabs taken out of the workbook, pending like index_sheet"""
+        with self._conn:
+            self._conn.executemany('DELETE FROM items WHERE sheet_name = ?', [(title,) for title in titles])
+            self._add_pending(titles)
+
+    def rebuild(self, wb, workbook_path):
+        """Backfill the index from every tab of wb, which must match the file at workbook_path"""
+        return self.rebuild_items(((name, read_sheet_items(wb[name])) for name in wb.sheetnames),
+                                  workbook_path)
+
+    def rebuild_items(self, tabs, workbook_path):
+        """
+        Backfill the index from (title, read_sheet_items result) for every tab
+        of the file at workbook_path, e.g. as sheet_reader.extract streams them
+        """
+        started = time.time()
+        count = tab_count = 0
+        with self._conn:
+            self._conn.execute('DELETE FROM items')
+            for title, items in tabs:
+                count += self._replace_sheet(title, items)
+                tab_count += 1
+            self._set_base(file_digest(workbook_path))
+        print(f"Indexed {count} to-dos and issues from {tab_count} tabs "
+              f"in {time.time() - started:.2f}s")
+        return count
+
+    def ensure_current(self, wb, workbook_path):
+        """
+        Bring the index in line with wb, loaded from workbook_path: adopt it
+        if it is the saved workbook, re-read the pending tabs if it is the
+        base, else rebuild. Returns whether it rebuilt.
+        """
+        digest = file_digest(workbook_path)
+        if digest == self._meta('saved_sha256'):
+            with self._conn:
+                self._set_base(digest)
+            return False
+        if digest == self.workbook_digest:
+            pending = self.pending_sheets
+            if pending:
+                with self._conn:
+                    for title in pending:
+                        items = read_sheet_items(wb[title]) if title in wb.sheetnames else []
+                        self._replace_sheet(title, items)
+                    self._set_base(digest)
+                print(f"Item index {self.db_path}: re-read {len(pending)} tabs changed since the last save")
+            return False
+        print(f"Item index {self.db_path} is stale, rebuilding")
+        self.rebuild(wb, workbook_path)
+        return True
+
+    def mark_synced(self, workbook_path):
+        """Record that the pending tabs were saved in the workbook at workbook_path"""
+        with self._conn:
+            self._set_meta('saved_sha256', file_digest(workbook_path))
+
+    def _rows(self, sql, params):
+        return [dict(row) for row in self._conn.execute(sql, params)]
+
+    def find(self, text, kind='todo', owner=None):
+        """Every tab an item with this text (and owner, if given) appears on, oldest first"""
+        if owner is None:
+            return self._rows('SELECT * FROM items WHERE kind = ? AND text_key = ? '
+                              'ORDER BY sheet_date, row', (kind, normalize(text)))
+        return self._rows('SELECT * FROM items WHERE kind = ? AND owner_key = ? AND text_key = ? '
+                          'ORDER BY sheet_date, row', (kind, normalize(owner), normalize(text)))
+
+    def is_tracked(self, text, kind='todo', owner=None):
+        return bool(self.find(text, kind, owner))
+
+    def first_raised(self, text, kind='issue'):
+        """The earliest tab an item appears on, or None"""
+        rows = self.find(text, kind)
+        return rows[0] if rows else None
+
+    def open_items(self, sheet_name, kind='todo'):
+        """Items on a tab that aren't marked done, i.e. the ones carried over to the next meeting"""
+        rows = self._rows('SELECT * FROM items WHERE kind = ? AND sheet_name = ? ORDER BY row',
+                          (kind, sheet_name))
+        return [row for row in rows if not is_done(row['status'])]
+
+    def stats(self):
+        counts = dict(self._conn.execute('SELECT kind, COUNT(*) FROM items GROUP BY kind').fetchall())
+        sheets = self._conn.execute('SELECT COUNT(DISTINCT sheet_name) FROM items').fetchone()[0]
+        return {'todos': counts.get('todo', 0), 'issues': counts.get('issue', 0),
+                'sheets': sheets, 'workbook_sha256': self.workbook_digest,
+                'pending_sheets': self.pending_sheets}
+
+
+def main():
+    from l10_sheet_automation import L10SheetAutomation, ENGINES
+    from sheet_reader import extract, read_items
+
+    parser = argparse.ArgumentParser(description='Build or query the to-do/issue index of an L10 workbook')
+    parser.add_argument('workbook', help='L10 workbook the index describes')
+    parser.add_argument('index', help='SQLite index file')
+    parser.add_argument('--rebuild', action='store_true', help='Rebuild even if the index is current')
+    parser.add_argument('--find', help='Print every tab a to-do or issue with this text appears on')
+    parser.add_argument('--kind', choices=KINDS, default='issue')
+    parser.add_argument('--engine', choices=('read-only',) + ENGINES, default='read-only',
+                        help='How to read the tabs for a rebuild; read-only streams them one at a time')
+    args = parser.parse_args()
+
+    index = ItemIndex(args.index)
+    if args.rebuild or not index.is_current(args.workbook):
+        if args.engine == 'read-only':
+            index.rebuild_items(extract(args.workbook, read=read_items), args.workbook)
+        else:
+            automation = L10SheetAutomation(args.workbook, engine=args.engine)
+            index.rebuild(automation.wb, args.workbook)
+            automation.wb.close()
+    if args.find:
+        print(json.dumps(index.find(args.find, args.kind), indent=2))
+    else:
+        print(json.dumps(index.stats(), indent=2))
+    index.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,225 @@
+"""
+Durable background job queue for /process-l10.
+
+Jobs are written to a local SQLite database before they are handed to a
+bounded pool of worker processes, so a restart never loses a queued
+meeting and at most max_workers heavy workbook jobs run at once. Workers
+claim a job with a conditional UPDATE, which keeps a job from running
+twice when several web processes share the same database.
+"""
+
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    result_path TEXT,
+    worker_pid INTEGER,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+)
+"""
+
+PENDING_STATUSES = ('queued', 'running')
+
+
+def _connect(db_path):
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute('PRAGMA journal_mode=WAL')
+    return conn
+
+
+def _pid_alive(pid):
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def run_job(db_path, results_dir, job_id, handler):
+    """Worker-process entry point: claim a queued job, run it and record the outcome"""
+    conn = _connect(db_path)
+    try:
+        with conn:
+            claimed = conn.execute(
+                "UPDATE jobs SET status = 'running', worker_pid = ?, started_at = ? "
+                "WHERE id = ? AND status = 'queued'",
+                (os.getpid(), time.time(), job_id)).rowcount
+        if not claimed:
+            return
+
+        payload = json.loads(conn.execute('SELECT payload FROM jobs WHERE id = ?',
+                                          (job_id,)).fetchone()['payload'])
+        output_path = os.path.join(results_dir, f"{job_id}.xlsx")
+        print(f"Job {job_id} started in process {os.getpid()}")
+        try:
+            result = handler(payload, output_path)
+        except Exception:
+            print(f"Job {job_id} failed:\n{traceback.format_exc()}")
+            with conn:
+                conn.execute("UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ?",
+                             (traceback.format_exc(), time.time(), job_id))
+            return
+
+        with conn:
+            conn.execute("UPDATE jobs SET status = 'done', result = ?, result_path = ?, finished_at = ? "
+                         "WHERE id = ?",
+                         (json.dumps(result), output_path, time.time(), job_id))
+        print(f"Job {job_id} finished")
+    finally:
+        conn.close()
+
+
+class JobQueue:
+    """SQLite-backed job queue served by a bounded process pool"""
+
+    def __init__(self, jobs_dir, handler, max_workers=2, retention_hours=72):
+        self.db_path = os.path.join(jobs_dir, 'jobs.sqlite3')
+        self.results_dir = os.path.join(jobs_dir, 'results')
+        self.handler = handler
+        self.max_workers = max_workers
+        self.retention_seconds = retention_hours * 3600
+        self._executor = None
+        self._lock = threading.Lock()
+
+        os.makedirs(self.results_dir, exist_ok=True)
+        conn = _connect(self.db_path)
+        try:
+            with conn:
+                conn.execute(SCHEMA)
+        finally:
+            conn.close()
+
+    def _pool(self, broken=None):
+        """The worker pool, replaced if it is the broken one (several callers may notice at once)"""
+        with self._lock:
+            if self._executor is None or self._executor is broken:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._executor
+
+    def _dispatch(self, job_id):
+        pool = self._pool()
+        try:
+            future = pool.submit(run_job, self.db_path, self.results_dir, job_id, self.handler)
+        except BrokenProcessPool:
+            print("Worker pool was broken, starting a new one")
+            future = self._pool(broken=pool).submit(run_job, self.db_path, self.results_dir,
+                                                    job_id, self.handler)
+        future.add_done_callback(partial(self._job_crashed, job_id))
+
+    def _job_crashed(self, job_id, future):
+        """
+        Done callback: run_job records its own outcome, so an exception here
+        means the worker died (killed, out of memory, a segfault) or couldn't
+        reach the database. A job it had claimed is marked failed; one that
+        was still waiting when the pool broke is dispatched again.
+        """
+        error = future.exception()
+        if error is None:
+            return
+        print(f"Job worker crashed on job {job_id}: {error!r}")
+        conn = _connect(self.db_path)
+        try:
+            with conn:
+                failed = conn.execute(
+                    "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? "
+                    "WHERE id = ? AND status = 'running'",
+                    (f"Job worker crashed: {error!r}", time.time(), job_id)).rowcount
+        finally:
+            conn.close()
+        if not failed and isinstance(error, BrokenProcessPool):
+            self._dispatch(job_id)
+
+    def submit(self, payload):
+        """Record a job and queue it for a worker; returns the job id"""
+        job_id = uuid.uuid4().hex
+        conn = _connect(self.db_path)
+        try:
+            with conn:
+                conn.execute("INSERT INTO jobs (id, status, payload, created_at) VALUES (?, 'queued', ?, ?)",
+                             (job_id, json.dumps(payload), time.time()))
+        finally:
+            conn.close()
+        self._dispatch(job_id)
+        self.purge()
+        return job_id
+
+    def get(self, job_id):
+        """Status of a job as a dict, or None if it doesn't exist"""
+        conn = _connect(self.db_path)
+        try:
+            row = conn.execute('SELECT id, status, result, error, result_path, created_at, '
+                               'started_at, finished_at FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        job = dict(row)
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    def recover(self):
+        """Requeue jobs orphaned by a restart and dispatch everything still queued"""
+        conn = _connect(self.db_path)
+        try:
+            with conn:
+                for row in conn.execute("SELECT id, worker_pid FROM jobs WHERE status = 'running'").fetchall():
+                    if not _pid_alive(row['worker_pid']):
+                        conn.execute("UPDATE jobs SET status = 'queued', worker_pid = NULL "
+                                     "WHERE id = ? AND status = 'running'", (row['id'],))
+            queued = [row['id'] for row in
+                      conn.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at")]
+        finally:
+            conn.close()
+        for job_id in queued:
+            self._dispatch(job_id)
+        if queued:
+            print(f"Recovered {len(queued)} queued jobs")
+        return len(queued)
+
+    def purge(self):
+        """Delete finished jobs and their workbooks once they are past retention"""
+        cutoff = time.time() - self.retention_seconds
+        conn = _connect(self.db_path)
+        try:
+            with conn:
+                expired = conn.execute("SELECT id, result_path FROM jobs WHERE finished_at < ?",
+                                       (cutoff,)).fetchall()
+                for row in expired:
+                    if row['result_path'] and os.path.exists(row['result_path']):
+                        os.remove(row['result_path'])
+                    conn.execute('DELETE FROM jobs WHERE id = ?', (row['id'],))
+        finally:
+            conn.close()
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+
+
+def is_worker_process():
+    """True inside a pool worker, where the queue must not be recovered again"""
+    return multiprocessing.parent_process() is not None
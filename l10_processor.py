@@ -1,10 +1,17 @@
+import io
 import json
 import openpyxl
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from datetime import datetime, timedelta
 import os
 from copy import copy
 import re
+from todo_dedup import TodoIndex
+from used_range import used_range
+from sheet_layout import layout_for
+from row_insertion import RowInsertionPlan
+from block_writer import SheetBlock
+from openpyxl_internals import set_style_array, style_array
+from zip_writer import compression_levels, save_workbook
 
 def parse_l10_json(input_data):
     """Parse L10 meeting data - handles JSON input"""
@@ -91,8 +98,87 @@ def convert_to_l10_format(data):
             converted[key] = data[key]
     
     return converted
-def parse_l10_text(text):
-    """Parse the structured L10 text output into a dictionary format"""
+# Sections whose items are blocks of "KEY: value" lines ended by '---', and
+# the item field each key fills
+RECORD_SECTIONS = {
+    'TO-DO REVIEW': {'WHO': 'WHO', 'TO-DO': 'TO-DO', 'DONE?': 'DONE?', 'NOTES': 'NOTES'},
+    'ISSUES LIST (IDS)': {'ISSUE': 'issue', 'RAISED BY': 'raised_by', 'DISCUSSION': 'discussion'},
+    'NEW TO-DOS': {'WHO': 'WHO', 'TO-DO': 'TO-DO', 'DUE': 'DUE'},
+}
+
+
+def _headline(line):
+    if line.startswith('-'):
+        return 'HEADLINES', line[1:].strip()
+
+
+def _customer_headline(line):
+    if line.startswith('-'):
+        return 'CUSTOMER/EMPLOYEE HEADLINES', line[1:].strip()
+    if line != 'None discussed' and line != '---':
+        return 'CUSTOMER/EMPLOYEE HEADLINES', line
+
+
+def _rating(line):
+    if ':' in line and not line.startswith('Average'):
+        name, rating = line.split(':', 1)
+        return 'MEETING RATING', {'name': name.strip(), 'rating': rating.strip()}
+    if line.startswith('Average:'):
+        return 'average_rating', line.split(':')[1].strip()
+
+
+# Sections read one line at a time: line -> (key, item) or None
+LINE_SECTIONS = {
+    'HEADLINES': _headline,
+    'CUSTOMER/EMPLOYEE HEADLINES': _customer_headline,
+    'MEETING RATING': _rating,
+}
+
+
+def iter_l10_text(lines):
+    """
+    Yield (key, item) for each item of structured L10 text, reading lines
+    (an open file or any iterable of lines) one at a time. key is the
+    section the item belongs to, or 'average_rating' for the average.
+    """
+    section = None
+    fields = handler = None
+    item = {}
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+
+        if line.startswith('**') and line.endswith('**'):
+            if item:
+                yield section, item
+                item = {}
+            section = line.strip('*').strip()
+            fields = RECORD_SECTIONS.get(section)
+            handler = LINE_SECTIONS.get(section)
+            continue
+
+        if fields is not None:
+            if line == '---':
+                if item:
+                    yield section, item
+                    item = {}
+            else:
+                key, colon, value = line.partition(':')
+                field = fields.get(key) if colon else None
+                if field is not None:
+                    item[field] = value.strip()
+        elif handler is not None:
+            parsed = handler(line)
+            if parsed is not None:
+                yield parsed
+
+    if item:
+        yield section, item
+
+
+def parse_l10_lines(lines):
+    """Parse structured L10 text, given as an open file or iterable of lines, into a dictionary"""
     sections = {
         'HEADLINES': [],
         'TO-DO REVIEW': [],
@@ -104,117 +190,32 @@ def parse_l10_text(text):
         'CASCADING MESSAGES': '',
         'MEETING RATING': []
     }
-    
-    current_section = None
-    current_item = {}
-    lines = text.strip().split('\n')
-    
-    i = 0
-    while i < len(lines):
-        line = lines[i].strip()
-        
-        if not line:
-            i += 1
-            continue
-            
-        if line.startswith('**') and line.endswith('**'):
-            if current_item and current_section in ['TO-DO REVIEW', 'ISSUES LIST (IDS)', 'NEW TO-DOS']:
-                sections[current_section].append(current_item)
-                current_item = {}
-            
-            current_section = line.strip('*').strip()
-            i += 1
-            continue
-        
-        # Handle different sections
-        if current_section == 'HEADLINES':
-            if line.startswith('-'):
-                sections['HEADLINES'].append(line[1:].strip())
-        
-        elif current_section == 'TO-DO REVIEW':
-            if line == '---':
-                if current_item:
-                    sections['TO-DO REVIEW'].append(current_item)
-                    current_item = {}
-            elif line.startswith('WHO:'):
-                current_item['WHO'] = line[4:].strip()
-            elif line.startswith('TO-DO:'):
-                current_item['TO-DO'] = line[6:].strip()
-            elif line.startswith('DONE?:'):
-                current_item['DONE?'] = line[6:].strip()
-            elif line.startswith('NOTES:'):
-                current_item['NOTES'] = line[6:].strip()
-        
-        elif current_section == 'ISSUES LIST (IDS)':
-            if line == '---':
-                if current_item:
-                    sections['ISSUES LIST (IDS)'].append(current_item)
-                    current_item = {}
-            elif line.startswith('ISSUE:'):
-                current_item['issue'] = line[6:].strip()
-            elif line.startswith('RAISED BY:'):
-                current_item['raised_by'] = line[10:].strip()
-            elif line.startswith('DISCUSSION:'):
-                current_item['discussion'] = line[11:].strip()
-        
-        elif current_section == 'NEW TO-DOS':
-            if line == '---':
-                if current_item:
-                    sections['NEW TO-DOS'].append(current_item)
-                    current_item = {}
-            elif line.startswith('WHO:'):
-                current_item['WHO'] = line[4:].strip()
-            elif line.startswith('TO-DO:'):
-                current_item['TO-DO'] = line[6:].strip()
-            elif line.startswith('DUE:'):
-                current_item['DUE'] = line[4:].strip()
-        
-        elif current_section == 'CUSTOMER/EMPLOYEE HEADLINES':
-            if line.startswith('-'):
-                sections['CUSTOMER/EMPLOYEE HEADLINES'].append(line[1:].strip())
-            elif line != 'None discussed' and line != '---':
-                sections['CUSTOMER/EMPLOYEE HEADLINES'].append(line)
-        
-        elif current_section == 'MEETING RATING':
-            if ':' in line and not line.startswith('Average'):
-                name, rating = line.split(':', 1)
-                sections['MEETING RATING'].append({
-                    'name': name.strip(),
-                    'rating': rating.strip()
-                })
-            elif line.startswith('Average:'):
-                sections['average_rating'] = line.split(':')[1].strip()
-        
-        i += 1
-    
-    if current_item and current_section in ['TO-DO REVIEW', 'ISSUES LIST (IDS)', 'NEW TO-DOS']:
-        sections[current_section].append(current_item)
-    
+    for key, item in iter_l10_text(lines):
+        if key == 'average_rating':
+            sections[key] = item
+        else:
+            sections[key].append(item)
     return sections
 
+
+def parse_l10_text(text):
+    """Parse the structured L10 text output into a dictionary format"""
+    return parse_l10_lines(io.StringIO(text))
+
 def find_section_row(ws, keywords, start_row=1, end_row=None):
     """Find row containing any of the keywords"""
     if end_row is None:
-        end_row = min(30, ws.max_row)
-    
-    for row in range(start_row, end_row + 1):
-        for col in range(1, min(7, ws.max_column + 1)):
-            cell_value = ws.cell(row=row, column=col).value
-            if cell_value:
-                cell_str = str(cell_value).upper()
-                for keyword in keywords:
-                    if keyword.upper() in cell_str:
-                        return row
-    return None
+        end_row = min(30, used_range(ws)[0])
+    return layout_for(ws).find_row(keywords, start_row, end_row)
 
 def copy_row_format(ws, source_row, target_row):
     """Copy formatting from source row to target row"""
-    for col in range(1, ws.max_column + 1):
+    for col in range(1, used_range(ws)[1] + 1):
         source_cell = ws.cell(row=source_row, column=col)
         target_cell = ws.cell(row=target_row, column=col)
         
         if source_cell.has_style:
-            target_cell._style = copy(source_cell._style)
+            set_style_array(target_cell, copy(style_array(source_cell)))
 
 def populate_l10_from_text(text_input, template_path, output_path):
     """Original function to populate L10 template from structured text input"""
@@ -238,8 +239,9 @@ def populate_l10_from_text(text_input, template_path, output_path):
     
     print(f"Found sections at rows - Headlines: {headlines_row}, TO-DO: {todo_header_row}, Issues: {issues_row}, Rating: {rating_row}")
     
-    # Track how many rows we've inserted
-    total_inserted = 0
+    # Every insertion and write below is planned against the sheet as it will be
+    # after the earlier insertions, then applied with a single shift
+    plan = RowInsertionPlan(ws)
     
     # 1. HEADLINES Section - Place in the Good News area
     if data['HEADLINES'] and good_news_row:
@@ -260,78 +262,73 @@ def populate_l10_from_text(text_input, template_path, output_path):
                 insert_row = r + 1
                 break
         
-        insert_row += total_inserted
+        insert_row += plan.inserted
         
         num_todos = len(data['TO-DO REVIEW'])
-        ws.insert_rows(insert_row, num_todos)
-        total_inserted += num_todos
+        plan.insert_rows(insert_row, num_todos)
         
         for i, todo in enumerate(data['TO-DO REVIEW']):
             row = insert_row + i
-            ws.cell(row=row, column=1, value=todo.get('WHO', ''))
-            ws.cell(row=row, column=2, value=todo.get('TO-DO', ''))
-            ws.cell(row=row, column=3, value=todo.get('DONE?', ''))
-            ws.cell(row=row, column=4, value=todo.get('NOTES', ''))
+            plan.cell(row, 1, todo.get('WHO', ''))
+            plan.cell(row, 2, todo.get('TO-DO', ''))
+            plan.cell(row, 3, todo.get('DONE?', ''))
+            plan.cell(row, 4, todo.get('NOTES', ''))
             if insert_row > 1:
-                copy_row_format(ws, insert_row - 1, row)
+                plan.defer(copy_row_format, insert_row - 1, row)
     
     # 3. ISSUES LIST Section
     if data['ISSUES LIST (IDS)'] and issues_row:
         print(f"Processing {len(data['ISSUES LIST (IDS)'])} issues...")
-        insert_row = issues_row + 1 + total_inserted
+        insert_row = issues_row + 1 + plan.inserted
         
         num_issues = len(data['ISSUES LIST (IDS)'])
-        ws.insert_rows(insert_row, num_issues)
-        total_inserted += num_issues
+        plan.insert_rows(insert_row, num_issues)
         
         for i, issue in enumerate(data['ISSUES LIST (IDS)']):
             row = insert_row + i
             issue_text = f"{issue.get('issue', '')} - {issue.get('raised_by', '')} - {issue.get('discussion', '')}"
-            ws.cell(row=row, column=2, value=issue_text)
-            copy_row_format(ws, issues_row + total_inserted - num_issues, row)
+            plan.cell(row, 2, issue_text)
+            plan.defer(copy_row_format, insert_row - 1, row)
     
     # 4. NEW TO-DOS Section
     if data['NEW TO-DOS'] and todo_header_row:
         print(f"Processing {len(data['NEW TO-DOS'])} new TO-DOs...")
-        insert_row = (todo_header_row + total_inserted + 
+        insert_row = (todo_header_row + plan.inserted + 
                      len(data['TO-DO REVIEW']) + 2)
         
-        ws.insert_rows(insert_row, 1)
-        ws.cell(row=insert_row, column=1, value="NEW ACTION ITEMS THIS WEEK:")
-        ws.cell(row=insert_row, column=1).font = Font(bold=True)
-        total_inserted += 1
+        plan.insert_rows(insert_row, 1)
+        plan.cell(insert_row, 1, "NEW ACTION ITEMS THIS WEEK:", style='bold')
         
         num_new_todos = len(data['NEW TO-DOS'])
-        ws.insert_rows(insert_row + 1, num_new_todos)
-        total_inserted += num_new_todos
+        plan.insert_rows(insert_row + 1, num_new_todos)
         
         for i, todo in enumerate(data['NEW TO-DOS']):
             row = insert_row + 1 + i
-            ws.cell(row=row, column=1, value=todo.get('WHO', ''))
-            ws.cell(row=row, column=2, value=todo.get('TO-DO', ''))
-            ws.cell(row=row, column=3, value=todo.get('DUE', ''))
+            plan.cell(row, 1, todo.get('WHO', ''))
+            plan.cell(row, 2, todo.get('TO-DO', ''))
+            plan.cell(row, 3, todo.get('DUE', ''))
     
     # 5. MEETING RATING Section
     if data['MEETING RATING'] and rating_row:
         print(f"Processing {len(data['MEETING RATING'])} ratings...")
-        insert_row = rating_row + 1 + total_inserted
+        insert_row = rating_row + 1 + plan.inserted
         
         num_ratings = len(data['MEETING RATING']) + 2
-        ws.insert_rows(insert_row, num_ratings)
+        plan.insert_rows(insert_row, num_ratings)
         
-        ws.cell(row=insert_row, column=1, value="Meeting Ratings:")
-        ws.cell(row=insert_row, column=1).font = Font(bold=True)
+        plan.cell(insert_row, 1, "Meeting Ratings:", style='bold')
         
         for i, rating in enumerate(data['MEETING RATING']):
             row = insert_row + 1 + i
-            ws.cell(row=row, column=1, value=rating['name'])
-            ws.cell(row=row, column=2, value=f"{rating['rating']}/10")
+            plan.cell(row, 1, rating['name'])
+            plan.cell(row, 2, f"{rating['rating']}/10")
         
         if 'average_rating' in data:
             avg_row = insert_row + len(data['MEETING RATING']) + 1
-            ws.cell(row=avg_row, column=1, value="Average:")
-            ws.cell(row=avg_row, column=2, value=f"{data['average_rating']}/10")
-            ws.cell(row=avg_row, column=1).font = Font(bold=True)
+            plan.cell(avg_row, 1, "Average:", style='bold')
+            plan.cell(avg_row, 2, f"{data['average_rating']}/10")
+    
+    plan.apply()
     
     # Save the file
     wb.save(output_path)
@@ -364,7 +361,14 @@ def test_with_text_input():
 
 # NEW: Enhanced L10Processor class with automation features
 class L10Processor:
-    def __init__(self):
+    def __init__(self, compression='balanced', save_workers=1):
+        """
+        compression is the zip_writer preset ('fast', 'balanced' or 'small')
+        saved workbooks are deflated with, on up to save_workers threads
+        """
+        compression_levels(compression)
+        self.compression = compression
+        self.save_workers = save_workers
         self.sections = {
             'HEADLINES': [],
             'TO-DO REVIEW': [],
@@ -379,8 +383,10 @@ class L10Processor:
         }
     
     def parse_l10_text(self, text):
-        """Parse text - reuses the original function"""
-        return parse_l10_text(text)
+        """Parse text (or an open file / iterable of lines) - reuses the module parser"""
+        if isinstance(text, str):
+            return parse_l10_text(text)
+        return parse_l10_lines(text)
     
     def duplicate_previous_sheet(self, previous_path, output_path, next_meeting_date=None):
         """
@@ -395,7 +401,7 @@ class L10Processor:
         if next_meeting_date:
             # Look for date in typical locations (usually in header area)
             for row in range(1, 5):
-                for col in range(1, ws.max_column + 1):
+                for col in range(1, used_range(ws)[1] + 1):
                     cell = ws.cell(row=row, column=col)
                     if cell.value and isinstance(cell.value, str):
                         # Look for date patterns
@@ -404,7 +410,7 @@ class L10Processor:
                             break
         
         # Save as new file
-        wb.save(output_path)
+        save_workbook(wb, output_path, self.compression, self.save_workers)
         return wb, ws
     
     def find_existing_todos(self, ws):
@@ -416,7 +422,7 @@ class L10Processor:
         
         if todo_row:
             # Look for TO-DO items after the header
-            for row in range(todo_row + 1, ws.max_row + 1):
+            for row in range(todo_row + 1, used_range(ws)[0] + 1):
                 who = ws.cell(row=row, column=1).value
                 todo = ws.cell(row=row, column=2).value
                 done = ws.cell(row=row, column=3).value
@@ -441,69 +447,42 @@ class L10Processor:
         """
         truly_new = []
         updates = []
+        index = TodoIndex(existing_todos)
         
         for new_todo in new_todos:
-            found = False
-            for existing in existing_todos:
-                # Check if it's the same TO-DO (by WHO and TO-DO text)
-                if (new_todo.get('WHO', '').lower() == existing.get('WHO', '').lower() and
-                    new_todo.get('TO-DO', '').lower() == existing.get('TO-DO', '').lower()):
-                    found = True
-                    # Check if status needs update
-                    if new_todo.get('DONE?', '') != existing.get('DONE?', ''):
-                        updates.append({
-                            'row': existing['row'],
-                            'new_status': new_todo.get('DONE?', ''),
-                            'new_notes': new_todo.get('NOTES', '')
-                        })
-                    break
-            
-            if not found:
+            # Same TO-DO means same WHO and TO-DO text
+            existing = index.find_exact(new_todo.get('WHO'), new_todo.get('TO-DO'))
+            if existing is None:
                 truly_new.append(new_todo)
+            # Check if status needs update
+            elif new_todo.get('DONE?', '') != existing.get('DONE?', ''):
+                updates.append({
+                    'row': existing['row'],
+                    'new_status': new_todo.get('DONE?', ''),
+                    'new_notes': new_todo.get('NOTES', '')
+                })
         
         return truly_new, updates
     
     def add_ai_section(self, ws, ai_items, start_row):
         """Add a dedicated AI Identified Items section"""
-        # Add header
-        ws.cell(row=start_row, column=1, value="AI IDENTIFIED ITEMS (Review & Move to Appropriate Sections)")
-        ws.cell(row=start_row, column=1).font = Font(bold=True, color="0066CC")
-        
-        # Add border
-        border = Border(
-            top=Side(style='thin'),
-            bottom=Side(style='thin'),
-            left=Side(style='thin'),
-            right=Side(style='thin')
-        )
-        
-        current_row = start_row + 1
+        block = SheetBlock()
+        block.add_row(["AI IDENTIFIED ITEMS (Review & Move to Appropriate Sections)"], style='ai_title')
         
         # Add TO-DOs identified by AI
         if 'new_todos' in ai_items and ai_items['new_todos']:
-            ws.cell(row=current_row, column=1, value="Potential TO-DOs:")
-            ws.cell(row=current_row, column=1).font = Font(italic=True)
-            current_row += 1
-            
-            for todo in ai_items['new_todos']:
-                ws.cell(row=current_row, column=1, value=f"• {todo.get('WHO', 'TBD')}")
-                ws.cell(row=current_row, column=2, value=todo.get('TO-DO', ''))
-                ws.cell(row=current_row, column=3, value=todo.get('DUE', ''))
-                current_row += 1
+            block.add_row(["Potential TO-DOs:"], style='italic')
+            block.add_rows([f"• {todo.get('WHO', 'TBD')}", todo.get('TO-DO', ''), todo.get('DUE', '')]
+                           for todo in ai_items['new_todos'])
         
         # Add Issues identified by AI
         if 'new_issues' in ai_items and ai_items['new_issues']:
-            current_row += 1
-            ws.cell(row=current_row, column=1, value="Potential Issues:")
-            ws.cell(row=current_row, column=1).font = Font(italic=True)
-            current_row += 1
-            
-            for issue in ai_items['new_issues']:
-                ws.cell(row=current_row, column=1, value=f"• {issue.get('issue', '')}")
-                ws.cell(row=current_row, column=2, value=f"Raised by: {issue.get('raised_by', 'TBD')}")
-                current_row += 1
+            block.skip()
+            block.add_row(["Potential Issues:"], style='italic')
+            block.add_rows([f"• {issue.get('issue', '')}", f"Raised by: {issue.get('raised_by', 'TBD')}"]
+                           for issue in ai_items['new_issues'])
         
-        return current_row
+        return block.write(ws, start_row)
     
     def calculate_next_meeting_date(self, cadence='weekly', last_date=None):
         """Calculate the next meeting date based on cadence"""
@@ -548,8 +527,7 @@ class L10Processor:
         # Step 3: Parse new meeting data
         if isinstance(new_data_path, str) and new_data_path.endswith('.txt'):
             with open(new_data_path, 'r') as f:
-                text_input = f.read()
-            new_data = self.parse_l10_text(text_input)
+                new_data = self.parse_l10_text(f)
         else:
             # Assume it's already parsed data
             new_data = new_data_path
@@ -577,7 +555,7 @@ class L10Processor:
         }
         
         # Find a good place to add AI section (after existing content)
-        last_content_row = ws.max_row
+        last_content_row = used_range(ws)[0]
         ai_section_start = last_content_row + 2
         
         self.add_ai_section(ws, ai_items, ai_section_start)
@@ -595,7 +573,7 @@ class L10Processor:
                             col += 1
         
         # Step 9: Save the updated workbook
-        wb.save(output_path)
+        save_workbook(wb, output_path, self.compression, self.save_workers)
         print(f"Successfully saved automated L10 to: {output_path}")
         
         return {
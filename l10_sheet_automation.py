@@ -1,17 +1,158 @@
-import openpyxl
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 from datetime import datetime, timedelta
 import re
 from copy import copy
+from xlsx_engine import XmlWorkbook
+from workbook_cache import file_digest, private_sheet_copy
+from sheet_archive import archive_sheets
+from style_registry import compact_styles
+from todo_dedup import filter_new_todos
+from near_duplicates import NearDuplicateIndex
+from item_index import read_sheet_items, is_done
+from meeting_record import (read_records, write_records, build_record, set_sheet_todos, record_cells,
+                            record_matches, record_todos)
+from used_range import used_range, cell_value, extend, trim_workbook
+from sheet_layout import LAYOUT_COLUMNS, layout_for, register_source
+from sheet_skeleton import duplicate, built_from
+from block_writer import SheetBlock
+from sheet_delta import DELTA_FORMATS, write_delta
+from parallel_load import load_workbook
+from zip_writer import compression_levels, stage_workbook, save_workbook
+
+ENGINES = ('openpyxl', 'xml')
+NEAR_DUPLICATE_SCOPES = ('latest', 'all')
+DUPLICATE_MODES = ('copy', 'skeleton')
 
 class L10SheetAutomation:
     """
     Automates L10 meeting workflow by duplicating sheets within the same workbook
     """
     
-    def __init__(self, workbook_path):
+    def __init__(self, workbook_path, engine='openpyxl', cache=None,
+                 near_duplicate_threshold=None, near_duplicate_scope='latest', item_index=None,
+                 trim_used_range=False, duplicate_mode='copy', output=None, delta=None,
+                 passthrough=True, load_workers=1, compression='balanced', save_workers=1):
+        """
+        engine='openpyxl' loads the full workbook; engine='xml' works on the zip
+        parts directly and only parses the sheets that are touched.
+        cache is an optional WorkbookCache used by the openpyxl engine.
+        near_duplicate_threshold (a Jaccard similarity, e.g. 0.4) turns on
+        dropping new to-dos and issues that rephrase tracked ones, looking at
+        the latest tab or, with near_duplicate_scope='all', every tab.
+        item_index is an optional ItemIndex; it is rebuilt if it doesn't match
+        the workbook and kept current with every tab this instance saves.
+        trim_used_range drops the empty cells outside each sheet's used range
+        on save (openpyxl engine).
+        duplicate_mode='skeleton' builds each new tab from a cached skeleton of
+        the tab it copies (see sheet_skeleton) instead of copy_worksheet.
+        output is where save() writes by default, a path or a writable binary
+        file; when given, workbook_path is only ever read.
+        delta='xlsx' makes save() write only the tabs this instance created,
+        delta='json' makes it write nothing so they can be described instead
+        (see sheet_delta).
+        passthrough copies the compressed bytes of parts a save leaves unchanged
+        straight from the source zip, such as the xml engine's untouched sheets;
+        the openpyxl engine stages its output uncompressed, so each part is
+        deflated only once when the meeting records are spliced back in.
+        load_workers > 1 parses the worksheets on that many processes when the
+        openpyxl engine loads the workbook, 0 on one per CPU (see parallel_load).
+        compression is the zip_writer preset ('fast', 'balanced' or 'small')
+        for the parts a save deflates, on up to save_workers threads.
+        """
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine '{engine}', expected one of {ENGINES}")
+        if near_duplicate_scope not in NEAR_DUPLICATE_SCOPES:
+            raise ValueError(f"Unknown near_duplicate_scope '{near_duplicate_scope}', "
+                             f"expected one of {NEAR_DUPLICATE_SCOPES}")
+        if duplicate_mode not in DUPLICATE_MODES:
+            raise ValueError(f"Unknown duplicate_mode '{duplicate_mode}', expected one of {DUPLICATE_MODES}")
+        if delta is not None and delta not in DELTA_FORMATS:
+            raise ValueError(f"Unknown delta format '{delta}', expected one of {DELTA_FORMATS}")
+        compression_levels(compression)
+        self.near_duplicate_threshold = near_duplicate_threshold
+        self.near_duplicate_scope = near_duplicate_scope
         self.workbook_path = workbook_path
-        self.wb = openpyxl.load_workbook(workbook_path)
+        self.engine = engine
+        self.trim_used_range = trim_used_range
+        self.duplicate_mode = duplicate_mode
+        self.output = output
+        self.delta = delta
+        self.passthrough = passthrough
+        self.compression = compression
+        self.save_workers = save_workers
+        # Tabs created by this instance, and the AI section written to each (by title)
+        self.created_sheets = []
+        self.ai_sections = {}
+        self._shared_sheets = set()
+        if engine == 'xml':
+            self.wb = XmlWorkbook(workbook_path, passthrough=passthrough,
+                                  compression=compression, save_workers=save_workers)
+        elif cache is not None:
+            self.wb = cache.load(workbook_path, workers=load_workers)
+            # Sheets of a cached workbook are shared and must not be edited in place
+            self._shared_sheets = {id(ws) for ws in self.wb.worksheets}
+        else:
+            self.wb = load_workbook(workbook_path, workers=load_workers)
+        if cache is None or engine == 'xml':
+            # Layouts of the loaded tabs are reused by later loads of the same file
+            register_source(self.wb, file_digest(workbook_path))
+        # Meeting data embedded by earlier runs, keyed by tab name
+        self.meeting_records = read_records(workbook_path)
+        self._records_changed = False
+        # Tabs recorded since the last save; their to-dos are read when it happens
+        self._unsaved_records = set()
+        self.item_index = item_index
+        if item_index is not None:
+            item_index.ensure_current(self.wb, workbook_path)
+    
+    def _writable_sheet(self, sheet):
+        """Return a sheet that is safe to edit in place"""
+        if id(sheet) not in self._shared_sheets:
+            return sheet
+        self._shared_sheets.discard(id(sheet))
+        return private_sheet_copy(self.wb, sheet)
+        
+    def save(self, path=None):
+        """
+        Save the workbook, dropping style entries no cell uses any more (openpyxl only).
+        path is a path or a writable binary file and defaults to output, else workbook_path.
+        """
+        path = path or self.output or self.workbook_path
+        self._finish_records()
+        if self.delta is not None:
+            # The full workbook isn't written, so the item index isn't marked synced either
+            if self.delta == 'xlsx':
+                write_delta(self, path)
+            self._records_changed = False
+            return
+        if self.engine == 'openpyxl':
+            if self.trim_used_range:
+                trim_workbook(self.wb)
+            compact_styles(self.wb)
+            if self.meeting_records:
+                # openpyxl dropped the custom XML part on load, so put it back
+                # into the saved package before it reaches path
+                staged = stage_workbook(self.wb)
+                package = XmlWorkbook(staged, passthrough=self.passthrough,
+                                      compression=self.compression, save_workers=self.save_workers)
+                try:
+                    write_records(package, self.meeting_records, self.wb.sheetnames)
+                    package.save(path)
+                finally:
+                    package.close()
+            else:
+                save_workbook(self.wb, path, self.compression, self.save_workers)
+        else:
+            if self._records_changed:
+                write_records(self.wb, self.meeting_records, self.wb.sheetnames)
+            self.wb.save(path)
+        self._records_changed = False
+        if self.item_index is not None:
+            self.item_index.mark_synced(path)
+    
+    def close(self):
+        self.wb.close()
+        if self.item_index is not None:
+            self.item_index.close()
         
     def get_latest_sheet(self):
         """Find the most recent L10 sheet in the workbook"""
@@ -31,15 +172,24 @@ class L10SheetAutomation:
         year = new_date.year
         new_sheet_name = f"{month}.{day:02d}.{year}"
         
+        if self.duplicate_mode == 'skeleton':
+            new_sheet = duplicate(self.wb, source_sheet, new_date)
+            new_sheet.title = new_sheet_name
+            self.created_sheets.append(new_sheet)
+            print(f"Created new sheet: {new_sheet_name}")
+            return new_sheet
+        
         # Copy the sheet
         new_sheet = self.wb.copy_worksheet(source_sheet)
         new_sheet.title = new_sheet_name
+        self.created_sheets.append(new_sheet)
         
         print(f"Created new sheet: {new_sheet_name}")
         
         # Update date in the new sheet (look for date patterns)
+        last_col = used_range(new_sheet)[1]
         for row in range(1, 10):  # Check first 10 rows
-            for col in range(1, min(8, new_sheet.max_column + 1)):
+            for col in range(1, min(8, last_col + 1)):
                 cell = new_sheet.cell(row=row, column=col)
                 if cell.value and isinstance(cell.value, str):
                     # Look for date patterns and update them
@@ -55,29 +205,48 @@ class L10SheetAutomation:
         
         return new_sheet
     
+    def archive_old_sheets(self, archive_dir, keep_last=None, keep_since=None, min_sheets=1):
+        """
+        Move dated tabs outside the retention policy (the keep_last most recent,
+        or anything dated on or after keep_since) into an archive workbook in
+        archive_dir. Call before other changes; the workbook is not saved here.
+        """
+        return archive_sheets(self, archive_dir, keep_last=keep_last,
+                              keep_since=keep_since, min_sheets=min_sheets)
+    
     def find_existing_todos(self, sheet):
         """Extract existing TO-DOs from the sheet"""
+        return self._scan_todos(sheet)[0]
+    
+    def _scan_todos(self, sheet):
+        """
+        The to-dos on sheet and the block of cells the scan read them from,
+        as (first_row, last_row, last_column), or None without a TO-DO header
+        """
+        # A tab built from a skeleton lists the same to-dos as every other tab built from it
+        skeleton = built_from(sheet)
+        if skeleton is not None and skeleton.todos is not None:
+            todos, cells = skeleton.todos
+            return [dict(todo) for todo in todos], cells
+        
         existing_todos = []
+        cells = None
+        
+        last_row = used_range(sheet)[0]
         
         # Find TO-DO section
-        todo_row = None
-        for row in range(1, min(30, sheet.max_row)):
-            for col in range(1, min(7, sheet.max_column + 1)):
-                cell_value = sheet.cell(row=row, column=col).value
-                if cell_value and 'TO-DO' in str(cell_value).upper() and 'REVIEW' in str(cell_value).upper():
-                    todo_row = row
-                    break
-            if todo_row:
-                break
+        header = layout_for(sheet).section('todo_review')
+        todo_row = header[0] if header and header[0] < min(30, last_row) else None
         
         if todo_row:
             # Look for TO-DO items after the header
             # Skip a few rows to get past headers
-            for row in range(todo_row + 3, sheet.max_row + 1):
-                who = sheet.cell(row=row, column=2).value  # WHO column
-                todo = sheet.cell(row=row, column=3).value  # TO-DO column
-                done = sheet.cell(row=row, column=4).value  # DONE? column
-                notes = sheet.cell(row=row, column=5).value  # Notes column
+            stopped = None
+            for row in range(todo_row + 3, last_row + 1):
+                who = cell_value(sheet, row, 2)  # WHO column
+                todo = cell_value(sheet, row, 3)  # TO-DO column
+                done = cell_value(sheet, row, 4)  # DONE? column
+                notes = cell_value(sheet, row, 5)  # Notes column
                 
                 if who and todo:
                     existing_todos.append({
@@ -88,9 +257,133 @@ class L10SheetAutomation:
                         'row': row
                     })
                 elif not who and not todo and row > todo_row + 10:
+                    stopped = row
                     break
-        
-        return existing_todos
+            # The header row down to the row the scan stopped at, or the first row a
+            # to-do written below the sheet's content would change; the header can be
+            # in any layout column
+            cells = (todo_row, stopped or max(last_row + 1, todo_row + 11), LAYOUT_COLUMNS)
+        
+        if skeleton is not None:
+            skeleton.todos = ([dict(todo) for todo in existing_todos], cells)
+        return existing_todos, cells
+    
+    @staticmethod
+    def _todo_cells(sheet, cells):
+        """Raw values of a block of to-do cells, row by row"""
+        first_row, last_row, last_column = cells
+        return [[cell_value(sheet, row, column) for column in range(1, last_column + 1)]
+                for row in range(first_row, last_row + 1)]
+    
+    def carried_todos(self, sheet, fallback_sheet=None):
+        """
+        The to-dos listed on sheet: read from its embedded meeting record
+        when there is one and the cells it was read from haven't been
+        edited since, otherwise scanned from the cells of fallback_sheet
+        (sheet itself by default)
+        """
+        record = self.meeting_records.get(sheet.title)
+        if record is not None and sheet.title not in self._unsaved_records:
+            cells = record_cells(record)
+            if cells is not None and record_matches(record, self._todo_cells(sheet, cells)):
+                print(f"Reading TO-DOs from the meeting record of {sheet.title}")
+                return record_todos(record)
+            print(f"TO-DOs on {sheet.title} were edited after its meeting record was made, scanning the sheet")
+        return self.find_existing_todos(fallback_sheet or sheet)
+    
+    def record_meeting(self, sheet, new_todos, new_issues, meeting_data):
+        """
+        Remember what the meeting added to sheet so the next run can read the
+        tab's to-dos back instead of scanning; they are taken from the tab's
+        cells when it is saved, after every write to it
+        """
+        self.meeting_records[sheet.title] = build_record(sheet.title, new_todos, new_issues, meeting_data)
+        self._unsaved_records.add(sheet.title)
+        self._records_changed = True
+    
+    def _finish_records(self):
+        """Store the to-dos, and their cells, of every tab recorded since the last save"""
+        for title in self._unsaved_records:
+            if title in self.wb.sheetnames and title in self.meeting_records:
+                sheet = self.wb[title]
+                todos, cells = self._scan_todos(sheet)
+                set_sheet_todos(self.meeting_records[title], todos, cells,
+                                self._todo_cells(sheet, cells) if cells else ())
+        self._unsaved_records.clear()
+    
+    def find_existing_issues(self, sheet):
+        """Extract the issues listed under the Issues (IDS) header"""
+        return [{'ISSUE': text, 'row': row}
+                for kind, owner, text, status, row in read_sheet_items(sheet) if kind == 'issue']
+    
+    def drop_near_duplicates(self, latest_sheet, new_todos, new_issues, skip=None):
+        """
+        Split off new to-dos and issues that rephrase ones already tracked on
+        latest_sheet, or on every tab but skip with near_duplicate_scope='all'.
+        Returns the kept to-dos, the kept issues and the dropped items with
+        the text they matched, its tab and the similarity score.
+        """
+        if self.near_duplicate_scope == 'all':
+            history = [self.wb[name] for name in self.wb.sheetnames if name != skip]
+        else:
+            history = [latest_sheet]
+        
+        todo_index = NearDuplicateIndex(self.near_duplicate_threshold)
+        issue_index = NearDuplicateIndex(self.near_duplicate_threshold)
+        for sheet in history:
+            for todo in self.find_existing_todos(sheet):
+                todo_index.add(todo['TO-DO'], (sheet.title, todo['TO-DO']), owner=todo['WHO'])
+            for issue in self.find_existing_issues(sheet):
+                issue_index.add(issue['ISSUE'], (sheet.title, issue['ISSUE']))
+        print(f"Near-duplicate index: {len(todo_index)} TO-DOs and {len(issue_index)} issues "
+              f"from {len(history)} tabs")
+        
+        near_duplicates = []
+        kept_todos = []
+        for todo in new_todos:
+            match = None
+            if isinstance(todo, dict):
+                text = todo.get('TO-DO', '')
+                match = todo_index.query(text, owner=todo.get('WHO'))
+            if match is None:
+                kept_todos.append(todo)
+                continue
+            (sheet_name, matched), score = match
+            near_duplicates.append({'type': 'todo', 'text': text, 'matched': matched,
+                                    'sheet': sheet_name, 'score': round(score, 3)})
+        
+        kept_issues = []
+        for issue in new_issues:
+            match = None
+            if isinstance(issue, dict):
+                text = issue.get('issue_description', issue.get('ISSUE', ''))
+                match = issue_index.query(text)
+            if match is None:
+                kept_issues.append(issue)
+                continue
+            (sheet_name, matched), score = match
+            near_duplicates.append({'type': 'issue', 'text': text, 'matched': matched,
+                                    'sheet': sheet_name, 'score': round(score, 3)})
+        
+        print(f"Dropped {len(near_duplicates)} near-duplicate items")
+        return kept_todos, kept_issues, near_duplicates
+    
+    def find_tracked_items(self, new_todos, new_issues):
+        """New to-dos and issues the item index has already seen on a tab, with the first one"""
+        tracked = []
+        for kind, items in (('todo', new_todos), ('issue', new_issues)):
+            for item in items:
+                if not isinstance(item, dict):
+                    continue
+                if kind == 'todo':
+                    text = item.get('TO-DO', '')
+                else:
+                    text = item.get('issue_description', item.get('ISSUE', ''))
+                first = self.item_index.first_raised(text, kind)
+                if first:
+                    tracked.append({'type': kind, 'text': text, 'first_sheet': first['sheet_name'],
+                                    'first_date': first['sheet_date'], 'status': first['status']})
+        return tracked
     
     def add_ai_section(self, sheet, new_todos, new_issues, existing_todos=[]):
         """Add AI identified items section matching the exact format from screenshot"""
@@ -109,129 +402,59 @@ class L10SheetAutomation:
         print(f"Adding AI section with {len(new_todos)} TODOs, {len(new_issues)} issues, and {len(existing_todos)} existing TODOs")
         
         # Find the last row with content
-        last_row = sheet.max_row
+        last_row = used_range(sheet)[0]
         
         # Add some space
         start_row = last_row + 3
         
-        # Add main header with blue background and white text
-        header_cell = sheet.cell(row=start_row, column=1, 
-                                value="AI IDENTIFIED ITEMS (Review & Move to Appropriate Sections)")
-        header_cell.font = Font(bold=True, color="FFFFFF", size=12)
-        header_cell.fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-        header_cell.alignment = Alignment(horizontal="left", vertical="center")
+        # The whole section is laid out as one block and written in a single call
+        block = SheetBlock()
         
-        # Merge cells for main header across all columns
-        sheet.merge_cells(start_row=start_row, start_column=1, 
-                         end_row=start_row, end_column=5)
-        
-        current_row = start_row + 1
+        # Main header with blue background and white text, merged across all columns
+        block.add_row(["AI IDENTIFIED ITEMS (Review & Move to Appropriate Sections)"],
+                      style='section_title', merge_to=5)
         
         # Add TO-DO section with blue headers
         if new_todos or existing_todos:
-            # TO-DO section headers with blue background
-            headers = ['Who', "To-do's", 'When', 'Context', 'Dependencies']
-            for col, header in enumerate(headers, 1):
-                cell = sheet.cell(row=current_row, column=col, value=header)
-                cell.font = Font(bold=True, color="FFFFFF")
-                cell.fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-                cell.alignment = Alignment(horizontal="left", vertical="center")
-            current_row += 1
-            
-            # Add new TODOs
-            for todo in new_todos:
-                try:
-                    if not isinstance(todo, dict):
-                        continue
-                    
-                    sheet.cell(row=current_row, column=1, value=str(todo.get('WHO', '')))
-                    sheet.cell(row=current_row, column=2, value=str(todo.get('TO-DO', '')))
-                    sheet.cell(row=current_row, column=3, value=str(todo.get('DUE DATE', todo.get('WHEN', 'Next meeting'))))
-                    sheet.cell(row=current_row, column=4, value=str(todo.get('CONTEXT', '')))
-                    sheet.cell(row=current_row, column=5, value=str(todo.get('DEPENDENCIES', 'None')))
-                    
-                    current_row += 1
-                except Exception as e:
-                    print(f"Error processing TODO: {e}")
-                    continue
+            block.add_row(['Who', "To-do's", 'When', 'Context', 'Dependencies'], style='column_header')
+            block.add_rows([str(todo.get('WHO', '')),
+                            str(todo.get('TO-DO', '')),
+                            str(todo.get('DUE DATE', todo.get('WHEN', 'Next meeting'))),
+                            str(todo.get('CONTEXT', '')),
+                            str(todo.get('DEPENDENCIES', 'None'))]
+                           for todo in new_todos if isinstance(todo, dict))
         
         # Add space before Issue List
-        current_row += 1
+        block.skip()
         
         # Add Issue List section with blue headers
         if new_issues:
-            # Issue List header
-            issue_header = sheet.cell(row=current_row, column=1, value="Issue List")
-            issue_header.font = Font(bold=True, color="FFFFFF")
-            issue_header.fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-            issue_header.alignment = Alignment(horizontal="left", vertical="center")
-            sheet.merge_cells(start_row=current_row, start_column=1, end_row=current_row, end_column=5)
-            current_row += 1
-            
-            # Issue section headers with blue background
-            issue_headers = ['Issue_description', 'Raised By', 'Issue Cause', 'Related Discussions', 'Notes']
-            for col, header in enumerate(issue_headers, 1):
-                cell = sheet.cell(row=current_row, column=col, value=header)
-                cell.font = Font(bold=True, color="FFFFFF")
-                cell.fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-                cell.alignment = Alignment(horizontal="left", vertical="center")
-            current_row += 1
-            
-            # Add issues
-            for issue in new_issues:
-                try:
-                    if not isinstance(issue, dict):
-                        continue
-                    
-                    sheet.cell(row=current_row, column=1, value=str(issue.get('issue_description', issue.get('ISSUE', ''))))
-                    sheet.cell(row=current_row, column=2, value=str(issue.get('who_raised_it', issue.get('RAISED BY', ''))))
-                    sheet.cell(row=current_row, column=3, value=str(issue.get('root_cause', issue.get('ISSUE CAUSE', ''))))
-                    sheet.cell(row=current_row, column=4, value=str(issue.get('related_discussions', issue.get('RELATED DISCUSSIONS', ''))))
-                    sheet.cell(row=current_row, column=5, value=str(issue.get('notes', issue.get('NOTES', ''))))
-                    
-                    current_row += 1
-                except Exception as e:
-                    print(f"Error processing Issue: {e}")
-                    continue
+            block.add_row(["Issue List"], style='column_header', merge_to=5)
+            block.add_row(['Issue_description', 'Raised By', 'Issue Cause', 'Related Discussions', 'Notes'],
+                          style='column_header')
+            block.add_rows([str(issue.get('issue_description', issue.get('ISSUE', ''))),
+                            str(issue.get('who_raised_it', issue.get('RAISED BY', ''))),
+                            str(issue.get('root_cause', issue.get('ISSUE CAUSE', ''))),
+                            str(issue.get('related_discussions', issue.get('RELATED DISCUSSIONS', ''))),
+                            str(issue.get('notes', issue.get('NOTES', '')))]
+                           for issue in new_issues if isinstance(issue, dict))
         
         # Add space before Todo Review
-        current_row += 1
+        block.skip()
         
         # Add Todo Review section with blue headers
         if existing_todos:
-            # Todo Review header
-            review_header = sheet.cell(row=current_row, column=1, value="Todo Review")
-            review_header.font = Font(bold=True, color="FFFFFF")
-            review_header.fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-            review_header.alignment = Alignment(horizontal="left", vertical="center")
-            sheet.merge_cells(start_row=current_row, start_column=1, end_row=current_row, end_column=3)
-            current_row += 1
-            
-            # Todo Review section headers
-            review_headers = ['Who', 'Todo', 'Status', 'Notes']
-            for col, header in enumerate(review_headers, 1):
-                cell = sheet.cell(row=current_row, column=col, value=header)
-                cell.font = Font(bold=True, color="FFFFFF")
-                cell.fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-                cell.alignment = Alignment(horizontal="left", vertical="center")
-            current_row += 1
-            
-            # Add existing todos for review
-            for todo in existing_todos:
-                try:
-                    if not isinstance(todo, dict):
-                        continue
-                    
-                    sheet.cell(row=current_row, column=1, value=str(todo.get('WHO', '')))
-                    sheet.cell(row=current_row, column=2, value=str(todo.get('TO-DO', '')))
-                    sheet.cell(row=current_row, column=3, value=str(todo.get('DONE?', 'In Progress')))
-                    sheet.cell(row=current_row, column=4, value=str(todo.get('NOTES', '')))
-                    
-                    current_row += 1
-                except Exception as e:
-                    print(f"Error processing existing TODO: {e}")
-                    continue
-        
+            block.add_row(["Todo Review"], style='column_header', merge_to=3)
+            block.add_row(['Who', 'Todo', 'Status', 'Notes'], style='column_header')
+            block.add_rows([str(todo.get('WHO', '')),
+                            str(todo.get('TO-DO', '')),
+                            str(todo.get('DONE?', 'In Progress')),
+                            str(todo.get('NOTES', ''))]
+                           for todo in existing_todos if isinstance(todo, dict))
+        
+        current_row = block.write(sheet, start_row)
+        extend(sheet, current_row, 5)
+        self.ai_sections[sheet.title] = (start_row, block.rows, existing_todos)
         print(f"Added AI section with {current_row - start_row} total rows")
         return current_row
     
@@ -240,11 +463,11 @@ class L10SheetAutomation:
         print("=== L10 SHEET AUTOMATION (Update Current Sheet) ===")
         
         # Get the latest sheet to update
-        current_sheet = self.get_latest_sheet()
+        current_sheet = self._writable_sheet(self.get_latest_sheet())
         print(f"Updating sheet: {current_sheet.title}")
         
         # Find existing TO-DOs in the current sheet
-        existing_todos = self.find_existing_todos(current_sheet)
+        existing_todos = self.carried_todos(current_sheet)
         print(f"Found {len(existing_todos)} existing TO-DOs")
         
         # Get new TO-DOs from meeting data directly
@@ -264,16 +487,7 @@ class L10SheetAutomation:
                 })
         
         # Filter out duplicates
-        truly_new_todos = []
-        for new_todo in new_todos_from_meeting:
-            is_duplicate = False
-            for existing in existing_todos:
-                if (new_todo.get('WHO', '').lower() == existing.get('WHO', '').lower() and
-                    new_todo.get('TO-DO', '').lower() in existing.get('TO-DO', '').lower()):
-                    is_duplicate = True
-                    break
-            if not is_duplicate:
-                truly_new_todos.append(new_todo)
+        truly_new_todos = filter_new_todos(new_todos_from_meeting, existing_todos)
         
         print(f"Found {len(truly_new_todos)} truly new TO-DOs")
         
@@ -293,8 +507,16 @@ class L10SheetAutomation:
                     'notes': f"Decision: {issue.get('decision', '')} | Owner: {issue.get('owner', '')}"
                 })
         
+        # Drop items that only rephrase tracked ones
+        near_duplicates = []
+        if self.near_duplicate_threshold is not None:
+            truly_new_todos, new_issues, near_duplicates = self.drop_near_duplicates(
+                current_sheet, truly_new_todos, new_issues)
+        
+        self.record_meeting(current_sheet, truly_new_todos, new_issues, meeting_data)
+        
         # ULTIMATE FAILSAFE: If still no data, create debug entry
-        if not truly_new_todos and not new_issues:
+        if not truly_new_todos and not new_issues and not near_duplicates:
             print("WARNING: No data found! Adding debug entry")
             truly_new_todos = [{
                 'WHO': 'System',
@@ -306,22 +528,29 @@ class L10SheetAutomation:
         
         # Add AI section with proper formatting and include existing todos for review
         self.add_ai_section(current_sheet, truly_new_todos, new_issues, existing_todos)
+        if self.item_index is not None:
+            self.item_index.index_sheet(current_sheet)
         
         # Save the workbook
-        self.wb.save(self.workbook_path)
+        self.save()
         print(f"Updated sheet: {current_sheet.title} with AI section")
         
-        return {
+        result = {
             'sheet_name': current_sheet.title,
             'new_todos_count': len(truly_new_todos),
             'new_issues_count': len(new_issues),
             'existing_todos_count': len(existing_todos)
         }
+        if self.near_duplicate_threshold is not None:
+            result['near_duplicates'] = near_duplicates
+        return result
     
     def process_meeting_output(self, meeting_text):
-        """Parse the meeting output text"""
-        from l10_processor import parse_l10_text
-        return parse_l10_text(meeting_text)
+        """Parse the meeting output: text, or an open file / iterable of lines read as it goes"""
+        from l10_processor import parse_l10_text, parse_l10_lines
+        if isinstance(meeting_text, str):
+            return parse_l10_text(meeting_text)
+        return parse_l10_lines(meeting_text)
     
     def create_next_l10_sheet(self, meeting_output_file, meeting_cadence='weekly'):
         """
@@ -350,9 +579,7 @@ class L10SheetAutomation:
         
         # Parse the meeting output
         with open(meeting_output_file, 'r') as f:
-            meeting_text = f.read()
-        
-        meeting_data = self.process_meeting_output(meeting_text)
+            meeting_data = self.process_meeting_output(f)
         
         # Find existing TO-DOs in the new sheet
         existing_todos = self.find_existing_todos(new_sheet)
@@ -362,16 +589,7 @@ class L10SheetAutomation:
         new_todos_from_meeting = meeting_data.get('NEW TO-DOS', [])
         
         # Filter out duplicates
-        truly_new_todos = []
-        for new_todo in new_todos_from_meeting:
-            is_duplicate = False
-            for existing in existing_todos:
-                if (new_todo.get('WHO', '').lower() == existing.get('WHO', '').lower() and
-                    new_todo.get('TO-DO', '').lower() in existing.get('TO-DO', '').lower()):
-                    is_duplicate = True
-                    break
-            if not is_duplicate:
-                truly_new_todos.append(new_todo)
+        truly_new_todos = filter_new_todos(new_todos_from_meeting, existing_todos)
         
         print(f"Found {len(truly_new_todos)} truly new TO-DOs")
         
@@ -381,7 +599,7 @@ class L10SheetAutomation:
         self.add_ai_section(new_sheet, truly_new_todos, new_issues)
         
         # Save the workbook
-        self.wb.save(self.workbook_path)
+        self.save()
         print(f"Saved workbook with new sheet: {new_sheet.title}")
         
         return {
@@ -394,6 +612,38 @@ class L10SheetAutomation:
     
     def create_next_l10_sheet_from_data(self, meeting_data, meeting_cadence='weekly', meeting_date=None):
         """Process meeting data directly without text file"""
+        result = self._append_meeting_sheet(meeting_data, meeting_cadence, meeting_date)
+        
+        # Save the workbook
+        self.save()
+        print(f"Saved workbook with new sheet: {result['new_sheet_name']}")
+        
+        return result
+    
+    def create_next_l10_sheets_from_data(self, meetings, meeting_cadence='weekly'):
+        """
+        Apply an ordered list of meetings in one pass and save once.
+        Each item is a dict with 'meeting_data' and an optional 'meeting_date';
+        every meeting's tab is duplicated from the one created before it.
+        Returns one result per meeting, shaped like create_next_l10_sheet_from_data's.
+        """
+        print(f"=== L10 SHEET AUTOMATION (Batch of {len(meetings)}) ===")
+        results = []
+        for meeting in meetings:
+            results.append(self._append_meeting_sheet(
+                meeting.get('meeting_data', {}),
+                meeting_cadence,
+                meeting.get('meeting_date')
+            ))
+        
+        # Save the workbook
+        self.save()
+        print(f"Saved workbook with {len(results)} new sheets")
+        
+        return results
+    
+    def _append_meeting_sheet(self, meeting_data, meeting_cadence='weekly', meeting_date=None):
+        """Create the next meeting's tab with its AI section, without saving"""
         print("=== L10 SHEET AUTOMATION (Direct Data) ===")
         
         # Get the latest sheet
@@ -430,8 +680,8 @@ class L10SheetAutomation:
         # Duplicate the sheet
         new_sheet = self.duplicate_sheet(latest_sheet, next_date)
         
-        # Find existing TO-DOs in the new sheet
-        existing_todos = self.find_existing_todos(new_sheet)
+        # Find existing TO-DOs: the latest tab's record, or the cells copied from it
+        existing_todos = self.carried_todos(latest_sheet, new_sheet)
         print(f"Found {len(existing_todos)} existing TO-DOs")
         
         # Get new TO-DOs from meeting data directly
@@ -451,16 +701,7 @@ class L10SheetAutomation:
                 })
         
         # Filter out duplicates
-        truly_new_todos = []
-        for new_todo in new_todos_from_meeting:
-            is_duplicate = False
-            for existing in existing_todos:
-                if (new_todo.get('WHO', '').lower() == existing.get('WHO', '').lower() and
-                    new_todo.get('TO-DO', '').lower() in existing.get('TO-DO', '').lower()):
-                    is_duplicate = True
-                    break
-            if not is_duplicate:
-                truly_new_todos.append(new_todo)
+        truly_new_todos = filter_new_todos(new_todos_from_meeting, existing_todos)
         
         print(f"Found {len(truly_new_todos)} truly new TO-DOs")
         
@@ -480,8 +721,16 @@ class L10SheetAutomation:
                     'notes': f"Decision: {issue.get('decision', '')} | Owner: {issue.get('owner', '')}"
                 })
         
+        # Drop items that only rephrase tracked ones
+        near_duplicates = []
+        if self.near_duplicate_threshold is not None:
+            truly_new_todos, new_issues, near_duplicates = self.drop_near_duplicates(
+                latest_sheet, truly_new_todos, new_issues, skip=new_sheet.title)
+        
+        self.record_meeting(new_sheet, truly_new_todos, new_issues, meeting_data)
+        
         # ULTIMATE FAILSAFE: If still no data, create debug entry
-        if not truly_new_todos and not new_issues:
+        if not truly_new_todos and not new_issues and not near_duplicates:
             print("WARNING: No data found! Adding debug entry")
             truly_new_todos = [{
                 'WHO': 'System',
@@ -493,14 +742,20 @@ class L10SheetAutomation:
         
         self.add_ai_section(new_sheet, truly_new_todos, new_issues, existing_todos)
         
-        # Save the workbook
-        self.wb.save(self.workbook_path)
-        print(f"Saved workbook with new sheet: {new_sheet.title}")
+        tracked = []
+        if self.item_index is not None:
+            tracked = self.find_tracked_items(truly_new_todos, new_issues)
+            self.item_index.index_sheet(new_sheet)
         
-        return {
+        result = {
             'new_sheet_name': new_sheet.title,
             'next_date': next_date.strftime("%m/%d/%Y"),
             'new_todos_count': len(truly_new_todos),
             'new_issues_count': len(new_issues),
             'existing_todos_count': len(existing_todos)
-        }
\ No newline at end of file
+        }
+        if self.near_duplicate_threshold is not None:
+            result['near_duplicates'] = near_duplicates
+        if self.item_index is not None:
+            result['already_tracked'] = tracked
+        return result
\ No newline at end of file
@@ -0,0 +1,195 @@
+"""
+Structured meeting data embedded in the workbook as a custom XML part.
+
+Every time the automation fills a tab it records the to-dos listed in the
+tab's TO-DO review cells, the new to-dos and issues the AI section
+suggested and the meeting's ratings, keyed by the tab's name, in a
+customXml part of the .xlsx. The next run reads last week's to-dos back
+from that record instead of finding the TO-DO review header and piecing
+them together from the cells below it. Suggested to-dos are kept apart
+and never carried over: nobody has accepted them into the list yet.
+
+The record also holds the block of cells its to-dos were read from (the
+header row down to the last row the scan looked at) and a digest of their
+raw values when the workbook was saved. Checking that digest reads just
+those cells; if people have since edited them (ticked DONE?, reworded a
+to-do) or the block moved, it no longer matches and the tab is scanned
+instead, as it is when the latest tab has no record at all (it was made
+by hand or by an older version).
+
+The part is a small XML document with one <meeting> element per tab whose
+text is the record as JSON. openpyxl drops custom XML parts when it loads
+a workbook, so for that engine the part is written into the saved file
+afterwards; the xml engine carries it along in its own save.
+"""
+
+import hashlib
+import json
+import re
+import uuid
+import zipfile
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import escape, quoteattr
+
+from sheet_archive import sheet_date
+
+NAMESPACE = 'urn:l10-meeting-automation:meeting-data:1'
+CUSTOM_XML_REL_TYPE = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/customXml'
+CUSTOM_XML_PROPS_REL_TYPE = ('http://schemas.openxmlformats.org/officeDocument/2006/'
+                             'relationships/customXmlProps')
+CUSTOM_XML_PROPS_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.customXmlProperties+xml'
+DATASTORE_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/customXml'
+
+ITEM_RE = re.compile(r'^customXml/item(\d+)\.xml$')
+
+# Only the latest tab's record is read back; a few more are kept for reference
+RECORDS_KEPT = 8
+
+
+def _todo(todo):
+    return {
+        'WHO': str(todo.get('WHO', '')).strip(),
+        'TO-DO': str(todo.get('TO-DO', '')).strip(),
+        'DUE DATE': str(todo.get('DUE DATE', todo.get('WHEN', ''))).strip(),
+        'DONE?': str(todo.get('DONE?', '')).strip(),
+        'NOTES': str(todo.get('NOTES', '')).strip(),
+    }
+
+
+def _issue(issue):
+    return {
+        'ISSUE': str(issue.get('issue_description', issue.get('ISSUE', ''))).strip(),
+        'RAISED BY': str(issue.get('who_raised_it', issue.get('RAISED BY', ''))).strip(),
+        'NOTES': str(issue.get('notes', issue.get('NOTES', ''))).strip(),
+    }
+
+
+def cells_digest(values):
+    """Digest of the raw values of a record's to-do cells, row by row"""
+    cells = [[None if value is None else str(value) for value in row] for row in values]
+    return hashlib.sha256(json.dumps(cells).encode('utf-8')).hexdigest()
+
+
+def build_record(sheet_name, suggested_todos, issues, meeting_data):
+    """
+    The record for one tab: the new to-dos and issues the AI section
+    suggested and the meeting's ratings. The to-dos in the tab's cells are
+    added by set_sheet_todos once the tab is final.
+    """
+    date = sheet_date(sheet_name)
+    return {
+        'sheet': sheet_name,
+        'date': date.strftime('%Y-%m-%d') if date else None,
+        'todos': [],
+        'suggested_todos': [_todo(todo) for todo in suggested_todos if isinstance(todo, dict)],
+        'issues': [_issue(issue) for issue in issues if isinstance(issue, dict)],
+        'ratings': meeting_data.get('MEETING RATING', []),
+        'average_rating': meeting_data.get('average_rating'),
+        'todo_cells': None,
+        'todo_digest': None,
+    }
+
+
+def set_sheet_todos(record, sheet_todos, cells, values):
+    """
+    Store the to-dos find_existing_todos reads from the tab, the block of
+    cells they come from as (first_row, last_row, last_column) and the
+    values of that block
+    """
+    record['todos'] = [dict(todo) for todo in sheet_todos]
+    record['todo_cells'] = list(cells) if cells else None
+    record['todo_digest'] = cells_digest(values) if cells else None
+
+
+def record_cells(record):
+    """(first_row, last_row, last_column) of the cells a record's to-dos were read from, or None"""
+    cells = record.get('todo_cells')
+    return tuple(cells) if cells else None
+
+
+def record_matches(record, values):
+    """
+    Whether the cells a record's to-dos were read from (values, read at
+    record_cells) still hold what they held when it was saved
+    """
+    return record.get('todo_digest') == cells_digest(values)
+
+
+def record_todos(record):
+    """A record's to-dos, as find_existing_todos returned them when it was saved"""
+    return [dict(todo) for todo in record.get('todos', [])]
+
+
+def _find_item(names, read):
+    """Name of the customXml item holding our records, or None"""
+    for name in sorted(names):
+        if ITEM_RE.match(name) and NAMESPACE.encode('utf-8') in read(name):
+            return name
+    return None
+
+
+def _parse(data):
+    records = {}
+    for meeting in ET.fromstring(data):
+        record = json.loads(meeting.text or '{}')
+        records[meeting.get('sheet')] = record
+    return records
+
+
+def read_records(workbook_path):
+    """Records embedded in the workbook file, keyed by tab name ({} if there are none)"""
+    try:
+        with zipfile.ZipFile(workbook_path) as source:
+            part = _find_item(source.namelist(), source.read)
+            return _parse(source.read(part)) if part else {}
+    except (zipfile.BadZipFile, ET.ParseError, ValueError) as e:
+        print(f"Ignoring unreadable meeting records in {workbook_path}: {e}")
+        return {}
+
+
+def _serialize(records):
+    meetings = ''.join(f'<meeting sheet={quoteattr(name)}>{escape(json.dumps(record, separators=(",", ":")))}'
+                       f'</meeting>' for name, record in records.items())
+    return (f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+            f'<meetings xmlns="{NAMESPACE}">{meetings}</meetings>').encode('utf-8')
+
+
+def item_id(part):
+    """
+    Datastore id of our item, derived from its part name rather than random
+    so that saving the same records twice gives the same package
+    """
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f'{NAMESPACE}/{part}')).upper()
+
+
+def write_records(package, records, sheetnames):
+    """
+    Store records for the tabs still in sheetnames (the most recent
+    RECORDS_KEPT of them) in an XmlWorkbook package, creating the custom
+    XML item, its properties part and their relationships on first use.
+    """
+    order = {name: position for position, name in enumerate(sheetnames)}
+    kept = sorted((name for name in records if name in order), key=order.get)[-RECORDS_KEPT:]
+    data = _serialize({name: records[name] for name in kept})
+
+    names = package.part_names()
+    part = _find_item(names, package.read_part)
+    if part:
+        package.write_part(part, data)
+        return part
+
+    number = max((int(ITEM_RE.match(name).group(1)) for name in names if ITEM_RE.match(name)), default=0) + 1
+    part = f'customXml/item{number}.xml'
+    props_part = f'customXml/itemProps{number}.xml'
+    props = (f'<?xml version="1.0" encoding="UTF-8" standalone="no"?>\n'
+             f'<ds:datastoreItem ds:itemID="{{{item_id(part)}}}" xmlns:ds="{DATASTORE_NS}">'
+             f'<ds:schemaRefs><ds:schemaRef ds:uri="{NAMESPACE}"/></ds:schemaRefs></ds:datastoreItem>')
+    item_rels = (f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                 f'<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                 f'<Relationship Id="rId1" Type="{CUSTOM_XML_PROPS_REL_TYPE}" Target="itemProps{number}.xml"/>'
+                 f'</Relationships>')
+    package.write_part(part, data, content_type='application/xml')
+    package.write_part(props_part, props.encode('utf-8'), content_type=CUSTOM_XML_PROPS_CONTENT_TYPE)
+    package.write_part(f'customXml/_rels/item{number}.xml.rels', item_rels.encode('utf-8'))
+    package.add_relationship(CUSTOM_XML_REL_TYPE, part)
+    return part
@@ -0,0 +1,101 @@
+"""
+Near-duplicate detection for to-dos and issues.
+
+The AI transcript often rephrases an item that is already tracked, which
+the exact and substring checks in todo_dedup miss. Each text is reduced
+to its set of character shingles and a MinHash signature; signatures are
+split into bands and bucketed (locality-sensitive hashing), so a query
+only compares against the few items that share a bucket instead of the
+whole history. Candidates are then scored with the exact Jaccard
+similarity of their shingle sets.
+"""
+
+import random
+import zlib
+
+from todo_dedup import normalize
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+
+def shingles(text, size=3):
+    """Set of overlapping character n-grams of the normalized text"""
+    text = normalize(text)
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def lsh_bands(threshold, num_perm):
+    """
+    Band count and rows per band whose LSH threshold, (1/bands) ** (1/rows),
+    is the highest one not above the requested threshold, so items at the
+    threshold are very likely to share a bucket
+    """
+    best = (num_perm, 1)
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        if (1 / bands) ** (1 / rows) <= threshold:
+            best = (bands, rows)
+    return best
+
+
+class NearDuplicateIndex:
+    """MinHash/LSH index of texts; query returns the best match at or above the threshold"""
+
+    def __init__(self, threshold=0.4, num_perm=128, shingle_size=3, seed=1):
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        rng = random.Random(seed)
+        self._perms = [(rng.randrange(1, MERSENNE_PRIME), rng.randrange(0, MERSENNE_PRIME))
+                       for _ in range(num_perm)]
+        self.bands, self.rows = lsh_bands(threshold, num_perm)
+        self._buckets = {}
+        self._items = []
+
+    def _signature(self, shingle_set):
+        hashes = [zlib.crc32(s.encode('utf-8')) for s in shingle_set]
+        return [min((a * h + b) % MERSENNE_PRIME for h in hashes) & MAX_HASH
+                for a, b in self._perms]
+
+    def _band_keys(self, signature, owner):
+        rows = self.rows
+        return [(owner, band, tuple(signature[band * rows:(band + 1) * rows]))
+                for band in range(self.bands)]
+
+    def add(self, text, item, owner=None):
+        """Index text under an optional owner; only texts of the same owner match"""
+        shingle_set = shingles(text, self.shingle_size)
+        if not shingle_set:
+            return
+        position = len(self._items)
+        self._items.append((shingle_set, item))
+        for key in self._band_keys(self._signature(shingle_set), normalize(owner)):
+            self._buckets.setdefault(key, []).append(position)
+
+    def query(self, text, owner=None):
+        """(item, score) of the most similar indexed text at or above the threshold, or None"""
+        shingle_set = shingles(text, self.shingle_size)
+        if not shingle_set:
+            return None
+        candidates = set()
+        for key in self._band_keys(self._signature(shingle_set), normalize(owner)):
+            candidates.update(self._buckets.get(key, ()))
+
+        best = None
+        for position in candidates:
+            candidate_shingles, item = self._items[position]
+            score = jaccard(shingle_set, candidate_shingles)
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (item, score)
+        return best
+
+    def __len__(self):
+        return len(self._items)
@@ -0,0 +1,134 @@
+"""
+The private openpyxl attributes the automation relies on, in one place.
+
+The hot paths skip openpyxl's public cell API, which creates a cell on
+every read and type-checks every write: they read and fill a sheet's cell
+map (Worksheet._cells) directly, read and store a cell's raw value and
+style array (Cell._value, Cell._style, also on row and column dimensions)
+and construct Cell objects themselves. None of that is openpyxl's API and
+any release may change it, which wouldn't raise anything but quietly write
+broken sheets. So every such access goes through the functions below, and
+importing this module fails unless the installed openpyxl is one they
+were checked against; requirements.txt pins that version. After upgrading
+openpyxl, check these functions (and parallel_load, which mirrors the
+reader's worksheet loop) against the new release before adding it to
+TESTED_VERSIONS.
+"""
+
+import openpyxl
+from openpyxl.cell.cell import Cell
+
+# openpyxl releases the private attributes used here were checked against
+TESTED_VERSIONS = ('3.1.5',)
+
+if openpyxl.__version__ not in TESTED_VERSIONS:
+    raise ImportError(f"openpyxl {openpyxl.__version__} is installed, but the openpyxl internals this "
+                      f"app uses were only checked against {', '.join(TESTED_VERSIONS)} "
+                      f"(see openpyxl_internals.py)")
+
+
+def cell_map(ws):
+    """The sheet's {(row, column): Cell} map; callers may add, move and delete entries"""
+    return ws._cells
+
+
+def raw_values(ws):
+    """(row, column, stored value) for every cell the sheet holds"""
+    return ((row, column, cell._value) for (row, column), cell in ws._cells.items())
+
+
+def stored_value(ws, row, column):
+    """The value stored at a position, without creating a cell there the way ws.cell() does"""
+    cell = ws._cells.get((row, column))
+    return cell._value if cell is not None else None
+
+
+def raw_value(cell):
+    """A cell's stored value, bypassing the value property"""
+    return cell._value
+
+
+def set_raw_value(cell, value, data_type):
+    """Store an already-converted value and its data type, bypassing the value setter's checks"""
+    cell._value = value
+    cell.data_type = data_type
+
+
+def put_cell(ws, row, column, value=None, data_type='n', style_array=None):
+    """
+    A new cell at (row, column), replacing any cell there, holding value as
+    set_raw_value stores it and a copy of style_array (the default style if None)
+    """
+    cell = Cell(ws, row=row, column=column, style_array=style_array)
+    cell._value = value
+    cell.data_type = data_type
+    ws._cells[row, column] = cell
+    return cell
+
+
+def bind_cells(ws, cells):
+    """
+    Bind parsed (row, column, value, data_type, style_id) records to new
+    cells of ws, as openpyxl's WorksheetReader.bind_cells does with the
+    records of its own parser
+    """
+    styles = ws.parent._cell_styles
+    bound = ws._cells
+    for row, column, value, data_type, style_id in cells:
+        cell = Cell(ws, row=row, column=column, style_array=styles[style_id])
+        cell._value = value
+        cell.data_type = data_type
+        bound[(row, column)] = cell
+    if bound:
+        ws._current_row = ws.max_row
+
+
+def set_hyperlink(cell, hyperlink):
+    """Attach a hyperlink object as is; the public setter also rewrites the cell's value"""
+    cell._hyperlink = hyperlink
+
+
+def style_array(styleable):
+    """The StyleArray of a cell or dimension (None if a dimension was never styled)"""
+    return styleable._style
+
+
+def set_style_array(styleable, style):
+    """Give a cell or dimension a StyleArray without going through the style descriptors"""
+    styleable._style = style
+
+
+def style_table(wb, name):
+    """
+    One of the workbook's style tables: 'fonts', 'alignments', 'borders',
+    'fills', 'protections', 'number_formats' and 'cell_styles', which style
+    arrays index into, 'named_styles' and 'differential_styles', or the ids
+    of the number formats it reads as dates or durations ('date_formats',
+    'timedelta_formats')
+    """
+    return getattr(wb, f'_{name}')
+
+
+def set_style_table(wb, name, table):
+    """Replace one of the workbook's style tables (see style_table)"""
+    setattr(wb, f'_{name}', table)
+
+
+def sheet_list(wb):
+    """The workbook's list of sheets in tab order; callers may replace and reorder entries"""
+    return wb._sheets
+
+
+def set_sheet_list(wb, sheets):
+    """Give the workbook its own list of sheets"""
+    wb._sheets = sheets
+
+
+def part_list(wb, name):
+    """One of the lists of parts the workbook writes besides its sheets: 'pivots' or 'external_links'"""
+    return getattr(wb, f'_{name}')
+
+
+def set_part_list(wb, name, parts):
+    """Replace one of the workbook's part lists (see part_list)"""
+    setattr(wb, f'_{name}', parts)
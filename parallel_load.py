@@ -0,0 +1,259 @@
+"""
+Loading a workbook with its worksheets parsed in parallel.
+
+openpyxl.load_workbook reads every worksheet part one after the other:
+inflate the XML, parse it into cell records and bind those to Cell
+objects. On the L10 template parsing is about half of the load and binding
+the other half, while inflating the parts is a rounding error. This loader
+reads the zip entries of all worksheets up front on a thread pool (zlib
+releases the GIL while it inflates), sends them in size-balanced chunks to
+a process pool that runs openpyxl's own WorkSheetParser on each, and binds
+the returned cell records in the calling process, where the workbook has
+to live. Everything around the cells (merges, hyperlinks, dimensions,
+conditional formats, page setup, comments, tables, drawings and pivots)
+goes through the same openpyxl steps as a normal load, so the result is an
+ordinary openpyxl Workbook.
+
+The process pool is created on first use and kept for later loads; it is
+rebuilt after a worker dies or when the worker count changes. Inside a
+pool worker (a job queue job) sheets are parsed serially: a worker can't
+safely fork a pool of its own, and the job queue already runs its jobs in
+parallel. With workers <= 1, for a single sheet or for read-only loads it
+falls back to openpyxl.load_workbook as well. Worker counts are capped at
+the number of CPUs: on a single-CPU host the pool only adds the cost of
+shipping parsed cells between processes, so every load there is serial.
+
+ParallelExcelReader.read_worksheets mirrors openpyxl's private reader loop,
+so it is only correct for the openpyxl releases it was checked against;
+it imports openpyxl_internals, which refuses to load under any other.
+
+Either way a workbook whose package has no core properties (the L10
+template has none) is dated UNDATED rather than with the time it was
+loaded, so saving it doesn't depend on the clock.
+"""
+
+import multiprocessing
+import os
+import threading
+import warnings
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from io import BytesIO
+
+import openpyxl
+from openpyxl.cell import MergedCell
+from openpyxl.comments.comment_sheet import CommentSheet
+from openpyxl.drawing.spreadsheet_drawing import SpreadsheetDrawing
+from openpyxl.packaging.relationship import RelationshipList, get_dependents, get_rels_path
+from openpyxl.pivot.table import TableDefinition
+from openpyxl.reader.drawings import find_images
+from openpyxl.reader.excel import ExcelReader
+from openpyxl.worksheet._reader import WorksheetReader, WorkSheetParser
+from openpyxl.worksheet.table import Table
+from openpyxl.xml.constants import ARC_CORE, COMMENTS_NS
+from openpyxl.xml.functions import fromstring
+
+from openpyxl_internals import bind_cells
+
+COMMENT_WARNING = ("Cell '{0}':{1} is part of a merged range but has a comment which will be "
+                   "removed because merged cells cannot contain any data.")
+
+# Creation and modification date of workbooks whose package carries no core
+# properties; openpyxl would date them with the load time, so every save differed
+UNDATED = datetime(1980, 1, 1)
+
+_pool_lock = threading.Lock()
+_pool = None
+_pool_key = None
+
+
+def _parser_pool(workers, reset=False):
+    """The shared parsing pool for this process, sized to workers"""
+    global _pool, _pool_key
+    with _pool_lock:
+        if _pool is None or reset or _pool_key != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            _pool = ProcessPoolExecutor(max_workers=workers)
+            _pool_key = workers
+        return _pool
+
+
+def available_cpus():
+    """CPUs this process may run on"""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def resolve_workers(workers):
+    """
+    workers as a count: 0 (or None) means one per CPU, and more workers than
+    CPUs only add overhead, so the count never exceeds them
+    """
+    cpus = available_cpus()
+    if not workers:
+        return cpus
+    return max(1, min(int(workers), cpus))
+
+
+def _parse_sheets(sources, shared_strings, data_only, epoch, date_formats, timedelta_formats, rich_text):
+    """
+    Pool worker: parse each worksheet's XML and return, per sheet, its cells
+    as (row, column, value, data_type, style_id) tuples and the parser holding
+    everything else read from the sheet
+    """
+    parsed = []
+    for xml in sources:
+        parser = WorkSheetParser(BytesIO(xml), shared_strings, data_only, epoch,
+                                 date_formats, timedelta_formats, rich_text)
+        cells = [(cell['row'], cell['column'], cell['value'], cell['data_type'], cell['style_id'])
+                 for _, row in parser.parse() for cell in row]
+        # Only the parse results go back to the parent
+        parser.source = None
+        parser.shared_strings = None
+        parsed.append((cells, parser))
+    return parsed
+
+
+def _chunks(sizes, count):
+    """Split item indexes into count groups of roughly equal total size, largest items first"""
+    groups = [[] for _ in range(count)]
+    totals = [0] * count
+    for index in sorted(range(len(sizes)), key=lambda i: -sizes[i]):
+        smallest = totals.index(min(totals))
+        groups[smallest].append(index)
+        totals[smallest] += sizes[index]
+    return [group for group in groups if group]
+
+
+class ParsedSheetReader(WorksheetReader):
+    """WorksheetReader over a sheet that was already parsed elsewhere"""
+
+    def __init__(self, ws, parser, cells):
+        self.ws = ws
+        self.parser = parser
+        self.cells = cells
+        self.tables = []
+
+    def bind_cells(self):
+        bind_cells(self.ws, self.cells)
+
+
+class ParallelExcelReader(ExcelReader):
+    """ExcelReader that parses the worksheet parts on a process pool"""
+
+    def __init__(self, filename, workers, **kwargs):
+        super().__init__(filename, **kwargs)
+        self.workers = workers
+
+    def _parse_all(self, targets):
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(targets))) as threads:
+            sources = list(threads.map(self.archive.read, targets))
+
+        groups = _chunks([len(xml) for xml in sources], self.workers)
+        args = (self.shared_strings, self.data_only, self.wb.epoch, self.wb._date_formats,
+                self.wb._timedelta_formats, self.rich_text)
+        try:
+            futures = [_parser_pool(self.workers).submit(_parse_sheets, [sources[i] for i in group], *args)
+                       for group in groups]
+            results = [future.result() for future in futures]
+        except BrokenProcessPool:
+            print("Sheet parser pool was broken, starting a new one")
+            pool = _parser_pool(self.workers, reset=True)
+            futures = [pool.submit(_parse_sheets, [sources[i] for i in group], *args) for group in groups]
+            results = [future.result() for future in futures]
+
+        parsed = {}
+        for group, result in zip(groups, results):
+            for index, sheet in zip(group, result):
+                parsed[targets[index]] = sheet
+        return parsed
+
+    def read_worksheets(self):
+        # Mirrors ExcelReader.read_worksheets of the openpyxl releases in
+        # openpyxl_internals.TESTED_VERSIONS, with the cells parsed ahead of time
+        sheets = [(sheet, rel) for sheet, rel in self.parser.find_sheets() if rel.target in self.valid_files]
+        targets = [rel.target for _, rel in sheets if "chartsheet" not in rel.Type]
+        parsed = self._parse_all(targets) if targets else {}
+
+        for sheet, rel in sheets:
+            if "chartsheet" in rel.Type:
+                self.read_chartsheet(sheet, rel)
+                continue
+
+            rels_path = get_rels_path(rel.target)
+            rels = RelationshipList()
+            if rels_path in self.valid_files:
+                rels = get_dependents(self.archive, rels_path)
+
+            ws = self.wb.create_sheet(sheet.name)
+            ws._rels = rels
+            cells, parser = parsed[rel.target]
+            ws_parser = ParsedSheetReader(ws, parser, cells)
+            ws_parser.bind_all()
+
+            for r in rels.find(COMMENTS_NS):
+                comment_sheet = CommentSheet.from_tree(fromstring(self.archive.read(r.target)))
+                for ref, comment in comment_sheet.comments:
+                    try:
+                        ws[ref].comment = comment
+                    except AttributeError:
+                        c = ws[ref]
+                        if isinstance(c, MergedCell):
+                            warnings.warn(COMMENT_WARNING.format(ws.title, c.coordinate))
+
+            if self.wb.vba_archive and ws.legacy_drawing:
+                ws.legacy_drawing = rels.get(ws.legacy_drawing).target
+            else:
+                ws.legacy_drawing = None
+
+            for t in ws_parser.tables:
+                ws.add_table(Table.from_tree(fromstring(self.archive.read(t))))
+
+            for drawing in rels.find(SpreadsheetDrawing._rel_type):
+                charts, images = find_images(self.archive, drawing.target)
+                for c in charts:
+                    ws.add_chart(c, c.anchor)
+                for im in images:
+                    ws.add_image(im, im.anchor)
+
+            pivot_caches = self.parser.pivot_caches
+            for r in rels.find(TableDefinition.rel_type):
+                pivot = TableDefinition.from_tree(fromstring(self.archive.read(r.Target)))
+                pivot.cache = pivot_caches[pivot.cacheId]
+                ws.add_pivot(pivot)
+
+            ws.sheet_state = sheet.state
+
+
+def _pin_undated(wb, filename):
+    """Give a workbook whose package has no core properties UNDATED instead of the load time"""
+    with zipfile.ZipFile(filename) as archive:
+        if ARC_CORE in archive.namelist():
+            return
+    wb.properties.created = wb.properties.modified = UNDATED
+
+
+def load_workbook(filename, workers=1, read_only=False, **kwargs):
+    """
+    openpyxl.load_workbook with the worksheets parsed on up to workers
+    processes (0 means one per CPU); takes the same keyword arguments
+    """
+    workers = resolve_workers(workers)
+    if workers <= 1 or read_only or multiprocessing.parent_process() is not None:
+        wb = openpyxl.load_workbook(filename, read_only=read_only, **kwargs)
+    else:
+        reader = ParallelExcelReader(filename, workers, **kwargs)
+        sheet_count = sum(1 for name in reader.archive.namelist() if name.startswith('xl/worksheets/sheet'))
+        if sheet_count < 2:
+            reader.archive.close()
+            wb = openpyxl.load_workbook(filename, **kwargs)
+        else:
+            reader.read()
+            wb = reader.wb
+    if not read_only:
+        _pin_undated(wb, filename)
+    return wb
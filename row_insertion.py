@@ -0,0 +1,107 @@
+"""
+Row insertions planned up front and applied to an openpyxl sheet in one shift.
+
+ws.insert_rows moves every cell below the insertion point (and first
+materializes the whole grid below it), so a fill that inserts blocks for
+several sections moves the bottom of the sheet once per block, and each
+later position has to account for the rows inserted before it. A
+RowInsertionPlan takes the same insert_rows calls and cell writes in the
+same order but only records them: positions are given in the coordinates
+the sheet would have at that point, exactly as with sequential
+insert_rows, and plan.inserted replaces the hand-kept running offset.
+apply() works out where every existing row and every written row ends up,
+moves each cell once and then replays the writes at their final rows.
+
+Unlike insert_rows, the shift also carries merged ranges and row formats
+(heights, row styles) along with their rows; inserted rows take the row
+format of the row above them, as they do when rows are inserted in Excel.
+"""
+
+from copy import copy
+
+from openpyxl_internals import cell_map
+from style_registry import apply_style
+from used_range import invalidate
+
+
+class RowInsertionPlan:
+    """Recorded insert_rows calls and writes for one sheet, applied together by apply()"""
+
+    def __init__(self, ws):
+        self.ws = ws
+        self._inserts = []
+        self._writes = []
+
+    @property
+    def inserted(self):
+        """Rows inserted by the plan so far"""
+        return sum(amount for _, amount in self._inserts)
+
+    def insert_rows(self, idx, amount=1):
+        """Plan inserting amount rows before row idx of the sheet as planned so far"""
+        if amount > 0:
+            self._inserts.append((idx, amount))
+
+    def cell(self, row, column, value=None, style=None):
+        """Plan writing a value (and a registered style) to a cell of the sheet as planned so far"""
+        self._writes.append((len(self._inserts), self._write_cell, (row,), (column, value, style)))
+
+    def defer(self, function, *rows):
+        """Plan calling function(ws, *rows) with rows given in the sheet as planned so far"""
+        self._writes.append((len(self._inserts), function, rows, ()))
+
+    def _write_cell(self, ws, row, column, value, style):
+        cell = ws.cell(row=row, column=column, value=value)
+        if style:
+            apply_style(cell, style)
+
+    def final_row(self, row, after=0):
+        """Where a row of the sheet as it was after the first `after` inserts ends up"""
+        for idx, amount in self._inserts[after:]:
+            if row >= idx:
+                row += amount
+        return row
+
+    def _shift_cells(self):
+        cells = cell_map(self.ws)
+        moved = {}
+        for (row, column), cell in cells.items():
+            new_row = self.final_row(row)
+            if new_row != row:
+                cell.row = new_row
+            moved[new_row, column] = cell
+        cells.clear()
+        cells.update(moved)
+
+    def _shift_merged_ranges(self):
+        for merged in self.ws.merged_cells.ranges:
+            # An insert inside a merged range widens it, as in Excel
+            merged.min_row, merged.max_row = self.final_row(merged.min_row), self.final_row(merged.max_row)
+
+    def _shift_row_formats(self):
+        dimensions = self.ws.row_dimensions
+        shifted = {self.final_row(row): dimension for row, dimension in dimensions.items()}
+        for position, (idx, amount) in enumerate(self._inserts):
+            above = self.final_row(idx - 1, position) if idx > 1 else None
+            if above not in shifted:
+                continue
+            for offset in range(amount):
+                target = self.final_row(idx + offset, position + 1)
+                if target not in shifted:
+                    shifted[target] = copy(shifted[above])
+        dimensions.clear()
+        for row, dimension in sorted(shifted.items()):
+            dimension.index = row
+            dimensions[row] = dimension
+
+    def apply(self):
+        """Shift the sheet once for every planned insert, then replay the planned writes"""
+        if self._inserts:
+            self._shift_cells()
+            self._shift_merged_ranges()
+            self._shift_row_formats()
+            invalidate(self.ws)
+        for after, function, rows, args in self._writes:
+            function(self.ws, *(self.final_row(row, after) for row in rows), *args)
+        self._inserts = []
+        self._writes = []
@@ -0,0 +1,186 @@
+"""
+Rotation of old weekly tabs out of the live L10 workbook.
+
+The live workbook gains a tab every week, and load, save and upload time
+grow with it. archive_sheets moves the tabs a retention policy no longer
+wants into a separate archive workbook and records in a JSON index which
+archive holds which meeting date, so the live file stays bounded. It runs
+through L10SheetAutomation.archive_old_sheets, as an optional step of
+/process-l10 (which sends the archive back along with the live workbook),
+or from the command line:
+
+    python sheet_archive.py "L10 Summary Template 1.xlsx" l10_archive --keep-last 26
+"""
+
+import argparse
+import json
+import os
+import re
+import tempfile
+from datetime import datetime
+
+from xlsx_engine import XmlWorkbook
+
+INDEX_NAME = 'archive_index.json'
+
+# Tab names look like 4.5.24 or 6.20.2025, sometimes with trailing spaces
+SHEET_DATE_RE = re.compile(r'^(\d{1,2})\.(\d{1,2})\.(\d{4}|\d{2})$')
+
+DATE_FORMATS = ('%m.%d.%Y', '%m/%d/%Y', '%m-%d-%Y', '%Y-%m-%d')
+
+
+def sheet_date(name):
+    """Meeting date encoded in a tab name, or None for tabs that aren't dated"""
+    match = SHEET_DATE_RE.match(name.strip())
+    if not match:
+        return None
+    month, day, year = (int(part) for part in match.groups())
+    if year < 100:
+        year += 2000
+    try:
+        return datetime(year, month, day)
+    except ValueError:
+        return None
+
+
+def parse_date(value):
+    """Parse a cutoff date in any of the formats meeting dates arrive in"""
+    if isinstance(value, datetime):
+        return value
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"Could not parse date '{value}'")
+
+
+def select_sheets_to_archive(sheetnames, keep_last=None, keep_since=None):
+    """
+    Dated tabs that no retention rule keeps, oldest first. keep_last keeps
+    the N most recent dated tabs, keep_since keeps tabs dated on or after it.
+    Undated tabs and the last tab (next week's source) are never archived.
+    """
+    if keep_last is None and keep_since is None:
+        return []
+
+    dated = [(sheet_date(name), name) for name in sheetnames]
+    dated = sorted((date, name) for date, name in dated if date is not None)
+    kept = {sheetnames[-1]} if sheetnames else set()
+    if keep_last is not None and keep_last > 0:
+        kept.update(name for _, name in dated[-keep_last:])
+    if keep_since is not None:
+        cutoff = parse_date(keep_since)
+        kept.update(name for date, name in dated if date >= cutoff)
+    return [name for _, name in dated if name not in kept]
+
+
+class ArchiveIndex:
+    """JSON map of meeting date to the archive workbook and tab holding it"""
+
+    def __init__(self, archive_dir):
+        self.path = os.path.join(archive_dir, INDEX_NAME)
+        self.entries = {}
+        if os.path.exists(self.path):
+            with open(self.path, 'r') as f:
+                self.entries = json.load(f)
+
+    def add(self, sheet_name, archive_name):
+        date = sheet_date(sheet_name)
+        self.entries[date.strftime('%Y-%m-%d')] = {'sheet': sheet_name, 'archive': archive_name}
+
+    def lookup(self, meeting_date):
+        """Archive entry for a meeting date, or None if it was never archived"""
+        return self.entries.get(parse_date(meeting_date).strftime('%Y-%m-%d'))
+
+    def save(self):
+        fd, tmp_path = tempfile.mkstemp(suffix='.part', dir=os.path.dirname(self.path))
+        with os.fdopen(fd, 'w') as f:
+            json.dump(self.entries, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+def write_archive(workbook_path, names, archive_path):
+    """Copy of the workbook on disk that keeps only the given tabs"""
+    wb = XmlWorkbook(workbook_path)
+    try:
+        missing = set(names) - set(wb.sheetnames)
+        if missing:
+            raise ValueError(f"Tabs {sorted(missing)} are not saved in {workbook_path} yet")
+        for name in wb.sheetnames:
+            if name not in names:
+                wb.remove(wb[name])
+        fd, tmp_path = tempfile.mkstemp(suffix='.part', dir=os.path.dirname(archive_path))
+        os.close(fd)
+        try:
+            wb.save(tmp_path)
+            os.replace(tmp_path, archive_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+    finally:
+        wb.close()
+
+
+def archive_sheets(automation, archive_dir, keep_last=None, keep_since=None, min_sheets=1):
+    """
+    Move the tabs outside the retention policy from automation's workbook
+    into a new archive workbook in archive_dir and index them. The archive
+    is cut from the file at automation.workbook_path, so run this before
+    making other changes (or after saving them). The live workbook is only
+    changed in memory; saving it is up to the caller. The archived tabs'
+    items are dropped from automation's item index, if it has one.
+    """
+    names = select_sheets_to_archive(automation.wb.sheetnames, keep_last, keep_since)
+    if not names or len(names) < min_sheets:
+        print(f"Nothing to archive ({len(names)} tabs past retention, minimum {min_sheets})")
+        return {'archived_sheets': [], 'archive': None}
+
+    os.makedirs(archive_dir, exist_ok=True)
+    first, last = sheet_date(names[0]), sheet_date(names[-1])
+    archive_name = f"L10_Archive_{first:%Y-%m-%d}_to_{last:%Y-%m-%d}.xlsx"
+    write_archive(automation.workbook_path, names, os.path.join(archive_dir, archive_name))
+
+    index = ArchiveIndex(archive_dir)
+    for name in names:
+        index.add(name, archive_name)
+    index.save()
+
+    for name in names:
+        automation.wb.remove(automation.wb[name])
+    if automation.item_index is not None:
+        automation.item_index.remove_sheets(names)
+    if automation.engine == 'openpyxl' and automation.wb.active is None:
+        automation.wb.active = len(automation.wb.sheetnames) - 1
+    print(f"Archived {len(names)} tabs to {archive_name}")
+    return {'archived_sheets': names, 'archive': archive_name}
+
+
+def main():
+    from l10_sheet_automation import L10SheetAutomation, ENGINES
+
+    parser = argparse.ArgumentParser(description='Move old weekly tabs into an archive workbook')
+    parser.add_argument('workbook', help='Live L10 workbook; updated in place unless --output is given')
+    parser.add_argument('archive_dir', help='Directory for archive workbooks and the archive index')
+    parser.add_argument('--keep-last', type=int, help='Keep the N most recent dated tabs')
+    parser.add_argument('--keep-since', help='Keep tabs dated on or after this date')
+    parser.add_argument('--min-sheets', type=int, default=1,
+                        help='Only archive when at least this many tabs are past retention')
+    parser.add_argument('--engine', choices=ENGINES, default='xml')
+    parser.add_argument('--output', help='Write the trimmed live workbook here instead')
+    args = parser.parse_args()
+
+    if args.keep_last is None and args.keep_since is None:
+        parser.error('give --keep-last and/or --keep-since')
+
+    automation = L10SheetAutomation(args.workbook, engine=args.engine)
+    result = automation.archive_old_sheets(args.archive_dir, keep_last=args.keep_last,
+                                           keep_since=args.keep_since, min_sheets=args.min_sheets)
+    if result['archive']:
+        automation.save(args.output or args.workbook)
+    automation.wb.close()
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
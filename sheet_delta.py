@@ -0,0 +1,170 @@
+"""
+Delta output: just the tabs a run created, instead of the whole workbook.
+
+A /process-l10 response normally carries every tab of the live workbook,
+so its size and save time grow with the meeting history even though
+Zapier and storage only need the new week. With mode=delta the run
+returns a delta instead, in one of two formats:
+
+- 'xlsx': a workbook holding only the new tabs with their cell formats
+  and meeting records. For the openpyxl engine every other tab is dropped
+  before the save; for the xml engine the new tabs are imported into a
+  blank package, so shared strings and styles the rest of the history
+  uses are left behind as well.
+- 'json': a description of each new tab (name, meeting date, the rows of
+  its AI section, the to-dos carried over and its meeting record), with
+  no workbook written at all.
+
+merge_delta folds xlsx deltas back into the master workbook at the zip
+part level, appending their tabs and meeting records:
+
+    python sheet_delta.py "L10 Summary Template 1.xlsx" L10_Delta_10.24.2026.xlsx
+
+Given the master's item index (--index), the merged tabs are indexed and
+the merged workbook is recorded as synced, so the next run doesn't
+rebuild the index.
+"""
+
+import argparse
+import json
+
+import openpyxl
+
+from item_index import ItemIndex
+from xlsx_engine import XmlWorkbook
+from meeting_record import read_records, write_records
+from sheet_archive import sheet_date
+from style_registry import compact_styles
+from zip_writer import stage_workbook
+
+DELTA_FORMATS = ('xlsx', 'json')
+
+# Theme colours and fonts resolve against this part, so a delta carries the master's
+THEME_PART = 'xl/theme/theme1.xml'
+
+
+def blank_package(**options):
+    """An XmlWorkbook over an empty one-sheet workbook; options go to XmlWorkbook"""
+    return XmlWorkbook(stage_workbook(openpyxl.Workbook()), **options)
+
+
+def write_delta(automation, output):
+    """Save the tabs automation created, with their meeting records, as a workbook of their own"""
+    created = automation.created_sheets
+    if not created:
+        raise ValueError('No tabs were created, so there is no delta to write')
+    names = [sheet.title for sheet in created]
+    options = {'compression': automation.compression, 'save_workers': automation.save_workers}
+
+    if automation.engine == 'xml':
+        package = blank_package(**options)
+        placeholder = package[package.sheetnames[0]]
+        for sheet in created:
+            package.import_worksheet(sheet)
+        package.remove(placeholder)
+        if THEME_PART in package.part_names() and THEME_PART in automation.wb.part_names():
+            package.write_part(THEME_PART, automation.wb.read_part(THEME_PART))
+    else:
+        wb = automation.wb
+        keep = {id(sheet) for sheet in created}
+        for sheet in list(wb.worksheets):
+            if id(sheet) not in keep:
+                wb.remove(sheet)
+        wb.active = 0
+        compact_styles(wb)
+        package = XmlWorkbook(stage_workbook(wb), **options)
+
+    try:
+        records = {name: automation.meeting_records[name] for name in names if name in automation.meeting_records}
+        if records:
+            write_records(package, records, names)
+        package.save(output)
+    finally:
+        package.close()
+    print(f"Wrote delta with {len(names)} tabs: {names}")
+
+
+def _plain(item):
+    """A to-do as JSON-safe values, without the row it was read from"""
+    return {key: value.isoformat() if hasattr(value, 'isoformat') else value
+            for key, value in item.items() if key != 'row'}
+
+
+def describe(automation):
+    """JSON-ready description of every tab automation created, in creation order"""
+    deltas = []
+    for sheet in automation.created_sheets:
+        record = automation.meeting_records.get(sheet.title, {})
+        first_row, rows, carried = automation.ai_sections.get(sheet.title, (None, [], []))
+        date = sheet_date(sheet.title)
+        deltas.append({
+            'sheet_name': sheet.title,
+            'meeting_date': date.strftime('%Y-%m-%d') if date else None,
+            'ai_rows': [{'row': first_row + offset, 'values': values}
+                        for offset, values in enumerate(rows) if any(value is not None for value in values)],
+            'carried_todos': [_plain(todo) for todo in carried if isinstance(todo, dict)],
+            'record': record,
+        })
+    return deltas
+
+
+def merge_delta(master_path, delta_paths, output=None, item_index=None):
+    """
+    Append the tabs of each xlsx delta, in order, to the master workbook
+    together with their meeting records, and save it to output (the master
+    itself by default). item_index, an optional ItemIndex of the master,
+    gets the merged tabs. Returns the names of the merged tabs.
+    """
+    master = XmlWorkbook(master_path)
+    try:
+        if item_index is not None:
+            item_index.ensure_current(master, master_path)
+        records = read_records(master_path)
+        records_changed = False
+        merged = []
+        for delta_path in delta_paths:
+            delta = XmlWorkbook(delta_path)
+            try:
+                for name in delta.sheetnames:
+                    if name in master:
+                        raise ValueError(f"Tab {name} from {delta_path} is already in {master_path}")
+                    master.import_worksheet(delta[name])
+                    merged.append(name)
+            finally:
+                delta.close()
+            delta_records = read_records(delta_path)
+            records.update(delta_records)
+            records_changed = records_changed or bool(delta_records)
+        if records_changed:
+            write_records(master, records, master.sheetnames)
+        if item_index is not None:
+            for name in merged:
+                item_index.index_sheet(master[name])
+        master.save(output or master_path)
+        if item_index is not None:
+            item_index.mark_synced(output or master_path)
+    finally:
+        master.close()
+    print(f"Merged {len(merged)} tabs: {merged}")
+    return merged
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fold delta workbooks back into the master L10 workbook')
+    parser.add_argument('master', help='Master L10 workbook; updated in place unless --output is given')
+    parser.add_argument('deltas', nargs='+', help='Delta workbooks from mode=delta, oldest first')
+    parser.add_argument('--output', help='Write the merged workbook here instead')
+    parser.add_argument('--index', help="The master's item index (SQLite file) to add the merged tabs to")
+    args = parser.parse_args()
+
+    item_index = ItemIndex(args.index) if args.index else None
+    try:
+        merged = merge_delta(args.master, args.deltas, args.output, item_index)
+    finally:
+        if item_index is not None:
+            item_index.close()
+    print(json.dumps({'merged_sheets': merged}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
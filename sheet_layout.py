@@ -0,0 +1,158 @@
+"""
+Where the section headers of a weekly tab are.
+
+A fill looks up the headlines, good news, to-do, issues and rating
+headers with find_section_row several times, and the automation looks
+for the TO-DO review header on every tab it reads; each lookup would
+otherwise rescan the header columns cell by cell. A SheetLayout reads the header columns of a
+sheet once, upper-casing each cell a single time, records the first cell
+of every known section and answers keyword lookups from that snapshot.
+Layouts are cached per sheet together with a structural fingerprint (the
+used range and the merged ranges); inserting or deleting rows changes the
+fingerprint, so only a sheet whose structure changed is scanned again.
+Writing header text without changing the structure isn't detected, which
+the automation never does.
+
+Every request loads the template (or the same weekly file) afresh, so a
+layout is also shared between loads of the same file: register_source
+records the content digest of a loaded workbook, and a sheet it was loaded
+with is looked up in a bounded shared cache under (sheet class, digest,
+title, fingerprint). Sheets added after the load, such as a new weekly tab, are
+only cached per object.
+"""
+
+import threading
+import weakref
+from bisect import bisect_left
+from collections import OrderedDict
+
+from used_range import cell_value, used_range
+
+# Header text only ever sits in the first six columns
+LAYOUT_COLUMNS = 6
+
+# Section name -> alternatives; an alternative matches a cell containing all of its parts
+SECTIONS = {
+    'headlines': (('HEADLINES:',), ('HEADLINE',)),
+    'good_news': (('GOOD NEWS',),),
+    'todo_list': (('TO-DO LIST',), ('TO-DO',)),
+    'todo_review': (('TO-DO', 'REVIEW'),),
+    'issues': (('ISSUES (IDS)',), ('ISSUES',)),
+    'rating': (('DID WE START/END',), ('RATING',)),
+}
+
+# Layouts shared between loads of the same file, least recently used first out
+SHARED_LAYOUTS = 512
+
+_layouts = weakref.WeakKeyDictionary()
+_sources = weakref.WeakKeyDictionary()
+_shared = OrderedDict()
+_shared_lock = threading.Lock()
+
+
+def _merged_refs(ws):
+    merged = getattr(ws, 'merged_cells', None)
+    if merged is not None:
+        return tuple(sorted(str(cell_range) for cell_range in merged.ranges))
+    # xlsx_engine sheet: <mergeCells> is a direct child of the worksheet root
+    for element in ws.root:
+        if element.tag.endswith('}mergeCells'):
+            return tuple(sorted(merge.get('ref') for merge in element))
+    return ()
+
+
+def fingerprint(ws):
+    """Cheap structural signature: changes whenever rows are inserted or removed"""
+    return used_range(ws), _merged_refs(ws)
+
+
+class SheetLayout:
+    """Upper-cased header-column text of a sheet and the first cell of each known section"""
+
+    def __init__(self, ws):
+        last_row, last_col = used_range(ws)
+        self.last_row = last_row
+        self.rows = []
+        self.texts = []
+        for row in range(1, last_row + 1):
+            cells = []
+            for col in range(1, min(LAYOUT_COLUMNS, last_col) + 1):
+                value = cell_value(ws, row, col)
+                if value:
+                    cells.append((col, str(value).upper()))
+            if cells:
+                self.rows.append(row)
+                self.texts.append(cells)
+        self.sections = {name: self.find_cell(alternatives) for name, alternatives in SECTIONS.items()}
+        self._memo = {}
+
+    def _scan(self, match, start_row, end_row):
+        for index in range(bisect_left(self.rows, start_row), len(self.rows)):
+            row = self.rows[index]
+            if row > end_row:
+                break
+            for col, text in self.texts[index]:
+                if match(text):
+                    return row, col
+        return None
+
+    def find_cell(self, alternatives, start_row=1, end_row=None):
+        """(row, column) of the first cell containing every part of any alternative, or None"""
+        return self._scan(lambda text: any(all(part in text for part in parts) for parts in alternatives),
+                          start_row, self.last_row if end_row is None else end_row)
+
+    def find_row(self, keywords, start_row=1, end_row=None):
+        """First row in [start_row, end_row] with a cell containing any keyword, or None"""
+        key = (tuple(keywords), start_row, end_row)
+        if key not in self._memo:
+            alternatives = tuple((keyword.upper(),) for keyword in keywords)
+            hit = self.find_cell(alternatives, start_row, end_row)
+            self._memo[key] = hit[0] if hit else None
+        return self._memo[key]
+
+    def section(self, name):
+        """(row, column) of a known section's header, or None"""
+        return self.sections[name]
+
+
+def register_source(wb, digest):
+    """
+    Record that wb was loaded from a file with this content digest (see
+    workbook_cache.file_digest), so the layouts of the sheets it was loaded
+    with are shared with every other load of that file
+    """
+    _sources[wb] = (digest, frozenset(wb.sheetnames))
+
+
+def _shared_key(ws, current):
+    source = _sources.get(getattr(ws, 'parent', None))
+    if source is None or ws.title not in source[1]:
+        return None
+    # Each engine reads cell values its own way, so their layouts aren't shared
+    return type(ws), source[0], ws.title, current
+
+
+def _shared_layout(ws, current):
+    key = _shared_key(ws, current)
+    if key is None:
+        return SheetLayout(ws)
+    with _shared_lock:
+        layout = _shared.get(key)
+        if layout is not None:
+            _shared.move_to_end(key)
+            return layout
+    layout = SheetLayout(ws)
+    with _shared_lock:
+        _shared[key] = layout
+        while len(_shared) > SHARED_LAYOUTS:
+            _shared.popitem(last=False)
+    return layout
+
+
+def layout_for(ws):
+    """The sheet's layout, rebuilt only when its structure changed since the last call"""
+    current = fingerprint(ws)
+    cached = _layouts.get(ws)
+    if cached is None or cached[0] != current:
+        cached = _layouts[ws] = (current, _shared_layout(ws, current))
+    return cached[1]
@@ -0,0 +1,161 @@
+"""
+Read-only extraction of the to-dos and ratings on weekly tabs.
+
+Reading the carried-over to-dos or the meeting ratings of a tab doesn't
+need an editable workbook, yet an ordinary load_workbook binds a Cell
+object for every cell of every tab first. Here the workbook is opened with
+read_only=True: each tab is streamed row by row through openpyxl's own
+parser, with values exactly as an editable load would give them, and
+only the first few columns of each row are kept. One pass over a tab
+finds the TO-DO review header and the "Did we start/end" rating block and
+reads the rows under them, stopping as soon as both are done, so memory
+stays constant per tab no matter how many styled rows it carries.
+
+read_sheet returns the same to-do dicts as
+L10SheetAutomation.find_existing_todos and read_items the same items as
+item_index.read_sheet_items; both work on one tab or, through extract, on
+every tab of a workbook. item_index rebuilds its index this way, since
+streaming the tabs is quicker than loading the workbook for editing:
+
+    python sheet_reader.py "L10 Summary Template 1.xlsx" --sheet 6.20.2025
+"""
+
+import argparse
+import json
+
+import openpyxl
+
+from item_index import HEADER_ROWS, ITEM_COLUMNS, find_headers, find_items, issues_end
+
+# Header text, to-dos and ratings all sit in the first six columns
+READ_COLUMNS = 6
+
+# find_existing_todos only accepts a TO-DO review header above this row
+TODO_HEADER_LIMIT = 30
+
+
+def open_workbook(workbook_path):
+    """The workbook opened read-only; workbook_path may also be an open binary file"""
+    return openpyxl.load_workbook(workbook_path, read_only=True)
+
+
+def _rows(ws, columns=READ_COLUMNS):
+    """(row, values of the first columns cells) for every row, gaps included"""
+    if hasattr(ws, 'reset_dimensions'):
+        # The stored dimension can be stale; read until the last row instead
+        ws.reset_dimensions()
+    return enumerate(ws.iter_rows(min_row=1, max_col=columns, values_only=True), start=1)
+
+
+def _contains(values, *parts):
+    return any(value and all(part in str(value).upper() for part in parts) for value in values)
+
+
+def _rating(value):
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+def read_sheet(ws):
+    """
+    {'todos': [...], 'ratings': [...]} for a tab (read-only or editable).
+    To-dos are the dicts find_existing_todos returns; ratings are
+    {'name', 'rating', 'row'} for each row of the rating block.
+    """
+    todos = []
+    ratings = []
+    todo_row = rating_row = None
+    todos_done = ratings_done = False
+
+    for row, values in _rows(ws):
+        if todo_row is None and not todos_done:
+            if row >= TODO_HEADER_LIMIT:
+                todos_done = True
+            elif _contains(values, 'TO-DO', 'REVIEW'):
+                todo_row = row
+        elif todo_row is not None and not todos_done and row >= todo_row + 3:
+            who, todo, done, notes = values[1:5]
+            if who and todo:
+                todos.append({
+                    'WHO': str(who).strip(),
+                    'TO-DO': str(todo).strip(),
+                    'DONE?': str(done).strip() if done else '',
+                    'NOTES': str(notes).strip() if notes else '',
+                    'row': row
+                })
+            elif not who and not todo and row > todo_row + 10:
+                todos_done = True
+
+        if rating_row is None:
+            if _contains(values, 'DID WE START/END'):
+                rating_row = row
+        elif not ratings_done:
+            name = str(values[0]).strip() if values[0] is not None else ''
+            if not name:
+                ratings_done = True
+            elif not name.endswith(':'):
+                # Labels such as "Meeting Ratings:" and "Average:" aren't ratings
+                ratings.append({'name': name, 'rating': _rating(values[1]), 'row': row})
+
+        if todos_done and ratings_done:
+            break
+
+    return {'todos': todos, 'ratings': ratings}
+
+
+def read_todos(ws):
+    """The to-dos on a tab, as find_existing_todos returns them"""
+    return read_sheet(ws)['todos']
+
+
+def read_items(ws):
+    """
+    item_index.read_sheet_items for a tab (read-only or editable), from one
+    pass over its first ITEM_COLUMNS columns that keeps only their values
+    and stops where the issue list ends
+    """
+    values = {}
+    value_at = lambda row, column: values.get((row, column))
+    last_row = last_col = 0
+    issue_header = None
+    for row, cells in _rows(ws, ITEM_COLUMNS):
+        for col, value in enumerate(cells, start=1):
+            if value is None or (isinstance(value, str) and not value.strip()):
+                continue
+            values[row, col] = value
+            last_row = row
+            last_col = max(last_col, col)
+        if row == HEADER_ROWS:
+            issue_header = find_headers(value_at, row, ITEM_COLUMNS)[1]
+        elif issue_header and row > issue_header[0] and issues_end(value_at, row, issue_header[1]):
+            # Nothing below the issue list is read
+            break
+    return find_items(value_at, max(last_row, 1), max(last_col, 1))
+
+
+def extract(workbook_path, sheet_names=None, read=read_sheet):
+    """
+    Yield (title, read(tab)) for the named tabs, or every tab, of a
+    workbook, reading one tab at a time; read is read_sheet by default, or
+    read_items for the item index
+    """
+    wb = open_workbook(workbook_path)
+    try:
+        for name in sheet_names if sheet_names is not None else wb.sheetnames:
+            yield name, read(wb[name])
+    finally:
+        wb.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Print the to-dos and ratings of L10 tabs without loading the workbook for editing')
+    parser.add_argument('workbook', help='L10 workbook to read')
+    parser.add_argument('--sheet', action='append', help='Tab to read (repeatable); every tab by default')
+    args = parser.parse_args()
+
+    print(json.dumps(dict(extract(args.workbook, args.sheet)), indent=2, default=str))
+
+
+if __name__ == '__main__':
+    main()
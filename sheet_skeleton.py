@@ -0,0 +1,176 @@
+"""
+Skeletons of weekly tabs, for duplicating the latest tab cheaply.
+
+duplicate_sheet's default copy_worksheet allocates a new cell, style array
+and dimension for every cell and row the previous tab has, including the
+thousands of empty styled cells older tabs carry past their content, then
+searches the header block for the date and rescans the copy for to-dos.
+A SheetSkeleton captures a source tab once: the cells inside its visible
+bounds that hold a value, style, hyperlink or comment; its row and
+column formats, merged ranges and page setup; the positions of the date
+cells; and, once read, the to-dos it carries over. Every tab duplicated from that source
+is built from the skeleton, so only cells that show are allocated, the
+date is written at the precomputed positions and the to-dos are read
+back from the skeleton instead of the copy.
+
+Skeletons are cached per source sheet with the structural fingerprint
+from sheet_layout and rebuilt when it changes. They hold no reference to
+the source, so a cached workbook's shared latest tab keeps its skeleton
+across requests while other workbooks are freed as usual. The xml engine
+already clones a sheet as its serialized XML, so there the skeleton only
+supplies the date positions and the to-dos.
+"""
+
+import re
+import weakref
+from copy import copy
+
+from openpyxl.worksheet.cell_range import MultiCellRange
+from openpyxl.worksheet.merge import MergedCellRange
+
+from openpyxl_internals import cell_map, put_cell, raw_value, set_hyperlink, set_style_array, style_array
+from sheet_layout import fingerprint
+from used_range import cell_value, used_range, visible_bounds
+
+DATE_RE = re.compile(r'\d{1,2}/\d{1,2}/\d{2,4}')
+
+# The meeting date sits in the header block of a tab
+DATE_ROWS = 9
+DATE_COLUMNS = 7
+
+_skeletons = weakref.WeakKeyDictionary()
+_built_from = weakref.WeakKeyDictionary()
+
+
+def date_cells(ws):
+    """
+    (row, column, kind) of the cells duplicate_sheet rewrites with the new
+    date: 'date' for a cell holding an m/d/y date (only the first in its
+    row) and 'day' for a "Day:" field
+    """
+    positions = []
+    last_col = used_range(ws)[1]
+    for row in range(1, DATE_ROWS + 1):
+        for col in range(1, min(DATE_COLUMNS, last_col) + 1):
+            value = cell_value(ws, row, col)
+            if value and isinstance(value, str):
+                if DATE_RE.search(value):
+                    positions.append((row, col, 'date'))
+                    break
+                elif 'Day:' in value:
+                    positions.append((row, col, 'day'))
+    return positions
+
+
+def write_date(ws, positions, new_date):
+    """Write new_date into the date cells found by date_cells"""
+    date_text = new_date.strftime("%m/%d/%Y")
+    for row, col, kind in positions:
+        if kind == 'date':
+            ws.cell(row=row, column=col).value = date_text
+            print(f"Updated date in cell {row},{col}")
+        else:
+            ws.cell(row=row, column=col).value = f"Day: {date_text}"
+            print(f"Updated Day field in cell {row},{col}")
+
+
+def _clone_dimension(dimension, parent):
+    """
+    Copy of a row or column dimension bound to parent. Dimension.__copy__
+    re-runs the validating constructor, which dominates building a tab that
+    has a dimension for each of its ~1000 rows.
+    """
+    clone = object.__new__(type(dimension))
+    clone.__dict__.update(dimension.__dict__)
+    clone.__dict__.pop('worksheet', None)
+    set_style_array(clone, copy(style_array(dimension)))
+    clone.parent = parent
+    return clone
+
+
+class SheetSkeleton:
+    """What duplicating a sheet has to reproduce, captured once"""
+
+    def __init__(self, ws):
+        self.fingerprint = fingerprint(ws)
+        self.title = ws.title
+        self.date_cells = date_cells(ws)
+        self.todos = None
+        self.cells = []
+        if hasattr(ws, '_get_value'):
+            return
+
+        last_row, last_col = visible_bounds(ws)
+        for (row, col), cell in cell_map(ws).items():
+            if row > last_row or col > last_col:
+                continue
+            value = raw_value(cell)
+            if value is None and not cell.has_style and not cell.hyperlink and not cell.comment:
+                continue
+            self.cells.append((row, col, value, cell.data_type,
+                               copy(style_array(cell)) if cell.has_style else None,
+                               copy(cell.hyperlink) if cell.hyperlink else None,
+                               copy(cell.comment) if cell.comment else None))
+        # Row heights past the content still set the spacing of the empty rows below it
+        self.row_dimensions = {row: _clone_dimension(dimension, None) for row, dimension in ws.row_dimensions.items()}
+        self.column_dimensions = {key: _clone_dimension(dimension, None)
+                                  for key, dimension in ws.column_dimensions.items()}
+        self.merged_ranges = [cell_range.coord for cell_range in ws.merged_cells.ranges]
+        self.sheet_format = copy(ws.sheet_format)
+        self.sheet_properties = copy(ws.sheet_properties)
+        self.page_margins = copy(ws.page_margins)
+        self.page_setup = copy(ws.page_setup)
+        self.print_options = copy(ws.print_options)
+
+    def build(self, wb):
+        """A new openpyxl sheet at the end of wb with the skeleton's cells and formats"""
+        target = wb.create_sheet(title=f"{self.title} Copy")
+        for row, col, value, data_type, style, hyperlink, comment in self.cells:
+            cell = put_cell(target, row, col, value, data_type, style)
+            if hyperlink is not None:
+                set_hyperlink(cell, copy(hyperlink))
+            if comment is not None:
+                cell.comment = copy(comment)
+
+        for dimensions, source in ((target.row_dimensions, self.row_dimensions),
+                                   (target.column_dimensions, self.column_dimensions)):
+            for key, dimension in source.items():
+                dimensions[key] = _clone_dimension(dimension, target)
+        target.merged_cells = MultiCellRange([MergedCellRange(target, coord) for coord in self.merged_ranges])
+        target.sheet_format = copy(self.sheet_format)
+        target.sheet_properties = copy(self.sheet_properties)
+        target.page_margins = copy(self.page_margins)
+        target.page_setup = copy(self.page_setup)
+        target.print_options = copy(self.print_options)
+        return target
+
+
+def skeleton_for(ws):
+    """The sheet's skeleton, recaptured only when its structure changed since the last call"""
+    cached = _skeletons.get(ws)
+    if cached is None or cached.fingerprint != fingerprint(ws):
+        cached = _skeletons[ws] = SheetSkeleton(ws)
+    return cached
+
+
+def duplicate(wb, source, new_date):
+    """
+    Copy of source appended to wb, built from its skeleton (openpyxl) or as
+    an XML clone (xml engine), with new_date written into the date cells
+    """
+    skeleton = skeleton_for(source)
+    if hasattr(source, '_get_value'):
+        new_sheet = wb.copy_worksheet(source)
+    else:
+        new_sheet = skeleton.build(wb)
+    write_date(new_sheet, skeleton.date_cells, new_date)
+    _built_from[new_sheet] = skeleton
+    return new_sheet
+
+
+def built_from(ws):
+    """The skeleton ws was duplicated from, as long as its structure hasn't changed since, else None"""
+    skeleton = _built_from.get(ws)
+    if skeleton is not None and fingerprint(ws) != skeleton.fingerprint:
+        return None
+    return skeleton
@@ -0,0 +1,154 @@
+"""
+Shared registry of the cell styles used for generated content.
+
+Every style the automation writes is defined once here, and its Font,
+PatternFill and Alignment objects are built once at import. For openpyxl
+workbooks the resulting style array is resolved once per workbook and
+base format and then copied onto each cell, so a header cell costs an
+array copy instead of three fresh style objects and three table lookups.
+xlsx_engine cells take the same interned objects, which its StyleTable
+serializes once.
+
+compact_styles rebuilds an openpyxl workbook's font, fill, border and
+cell-format tables from the cells that still use them, so styles.xml
+stops accumulating variants from old tabs.
+"""
+
+import weakref
+from copy import copy
+
+from openpyxl.styles import Font, PatternFill, Alignment
+from openpyxl.styles.cell_style import StyleArray
+from openpyxl.styles.styleable import StyleableObject
+from openpyxl.utils.indexed_list import IndexedList
+
+from openpyxl_internals import cell_map, set_style_array, set_style_table, style_array, style_table
+
+HEADER_BLUE = "4472C4"
+
+_BLUE_FILL = PatternFill(start_color=HEADER_BLUE, end_color=HEADER_BLUE, fill_type="solid")
+_LEFT_CENTER = Alignment(horizontal="left", vertical="center")
+
+STYLES = {
+    # Banner over the whole AI IDENTIFIED ITEMS block
+    'section_title': {'font': Font(bold=True, color="FFFFFF", size=12),
+                      'fill': _BLUE_FILL, 'alignment': _LEFT_CENTER},
+    # Sub-section banners and column headers inside the block
+    'column_header': {'font': Font(bold=True, color="FFFFFF"),
+                      'fill': _BLUE_FILL, 'alignment': _LEFT_CENTER},
+    'bold': {'font': Font(bold=True)},
+    'italic': {'font': Font(italic=True)},
+    'ai_title': {'font': Font(bold=True, color="0066CC")},
+}
+
+# Style attribute -> (workbook table, StyleArray field)
+COMPONENTS = {
+    'font': ('fonts', 'fontId'),
+    'fill': ('fills', 'fillId'),
+    'border': ('borders', 'borderId'),
+    'alignment': ('alignments', 'alignmentId'),
+    'protection': ('protections', 'protectionId'),
+}
+
+# Leading entries every stylesheet must keep in place (fills 0 and 1 are reserved)
+RESERVED_ENTRIES = {'fonts': 1, 'fills': 2, 'borders': 1, 'alignments': 1, 'protections': 1}
+
+_registries = weakref.WeakKeyDictionary()
+
+
+class StyleRegistry:
+    """The named styles resolved against one openpyxl workbook's style tables"""
+
+    def __init__(self, wb):
+        self.wb = wb
+        self._arrays = {}
+
+    def style_array(self, name, base):
+        """Style array for a named style on top of a cell's current one"""
+        key = (name, tuple(base))
+        array = self._arrays.get(key)
+        if array is None:
+            array = copy(base)
+            for attr, value in STYLES[name].items():
+                table, field = COMPONENTS[attr]
+                setattr(array, field, style_table(self.wb, table).add(value))
+            self._arrays[key] = array
+        return array
+
+
+def registry_for(wb):
+    registry = _registries.get(wb)
+    if registry is None:
+        registry = _registries[wb] = StyleRegistry(wb)
+    return registry
+
+
+def apply_style(cell, name):
+    """Give a cell one of the registered styles"""
+    if not isinstance(cell, StyleableObject):
+        # xlsx_engine cell: its workbook's StyleTable resolves and dedupes
+        for attr, value in STYLES[name].items():
+            setattr(cell, attr, value)
+        return
+    base = style_array(cell)
+    if base is None:
+        base = StyleArray()
+    set_style_array(cell, copy(registry_for(cell.parent.parent).style_array(name, base)))
+
+
+def compact_styles(wb):
+    """
+    Drop the fonts, fills, borders and cell formats that no cell, row,
+    column or named style refers to, merging duplicates on the way.
+    Skipped for a cache clone whose sheets are still shared with the
+    original, since their style arrays must not change. Returns whether
+    the tables were rebuilt.
+    """
+    if any(ws.parent is not wb for ws in wb.worksheets):
+        return False
+
+    old = {table: style_table(wb, table) for table, _ in COMPONENTS.values()}
+    new = {table: IndexedList(entries[:RESERVED_ENTRIES[table]]) for table, entries in old.items()}
+    remapped = {}
+    seen = set()
+
+    def remap(array):
+        # An array object shared by several cells must only be rewritten once
+        if array is None or id(array) in seen:
+            return
+        seen.add(id(array))
+        key = tuple(array)
+        target = remapped.get(key)
+        if target is None:
+            target = copy(array)
+            for table, field in COMPONENTS.values():
+                index = getattr(array, field)
+                if index < len(old[table]):
+                    setattr(target, field, new[table].add(old[table][index]))
+            remapped[key] = target
+        if target != array:
+            array[:] = target
+
+    cell_styles = style_table(wb, 'cell_styles')
+    default_xf = copy(cell_styles[0]) if len(cell_styles) else None
+    for ws in wb.worksheets:
+        for cell in cell_map(ws).values():
+            remap(style_array(cell))
+        for dimension in list(ws.row_dimensions.values()) + list(ws.column_dimensions.values()):
+            remap(style_array(dimension))
+
+    for table, entries in new.items():
+        set_style_table(wb, table, entries)
+    # The writer re-adds every cell format that is still in use as it writes the sheets
+    cell_styles = IndexedList()
+    if default_xf is not None:
+        remap(default_xf)
+        cell_styles.add(default_xf)
+    set_style_table(wb, 'cell_styles', cell_styles)
+    for style in style_table(wb, 'named_styles'):
+        style.bind(wb)
+    _registries.pop(wb, None)
+    print(f"Compacted styles: {len(old['fonts'])} -> {len(new['fonts'])} fonts, "
+          f"{len(old['fills'])} -> {len(new['fills'])} fills, "
+          f"{len(old['borders'])} -> {len(new['borders'])} borders")
+    return True
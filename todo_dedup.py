@@ -0,0 +1,87 @@
+"""
+To-do de-duplication shared by every code path.
+
+Existing to-dos are normalized once and indexed by owner. Exact matches
+are a dict lookup. Containment ("the new text appears inside an existing
+to-do of the same owner") goes through a per-owner index of character
+trigrams: every to-do containing the new text also contains each of its
+trigrams, so only the to-dos listed under its rarest trigram are checked
+with a substring test. A lookup costs about the length of the new text
+plus that short candidate list, however many to-dos the owner has
+accumulated, instead of a scan over all of them.
+"""
+
+# Length of the character n-grams containment candidates are looked up by
+GRAM = 3
+
+
+def normalize(value):
+    """Lower-cased text with runs of whitespace collapsed"""
+    return ' '.join(str(value or '').lower().split())
+
+
+def _grams(text):
+    return {text[i:i + GRAM] for i in range(len(text) - GRAM + 1)}
+
+
+class TodoIndex:
+    """Existing to-dos keyed by normalized owner, for exact and containment lookups"""
+
+    def __init__(self, todos=()):
+        self._exact = {}
+        self._owners = {}
+        for todo in todos:
+            self.add(todo)
+
+    def add(self, todo):
+        who, text = normalize(todo.get('WHO')), normalize(todo.get('TO-DO'))
+        self._exact.setdefault((who, text), todo)
+        owner = self._owners.setdefault(who, {'texts': [], 'todos': [], 'grams': None})
+        owner['texts'].append(text)
+        owner['todos'].append(todo)
+        if owner['grams'] is not None:
+            self._index_grams(owner['grams'], len(owner['texts']) - 1, text)
+
+    @staticmethod
+    def _index_grams(grams, position, text):
+        for gram in _grams(text):
+            grams.setdefault(gram, []).append(position)
+
+    def find_exact(self, who, text):
+        """First existing to-do with the same owner and text, or None"""
+        return self._exact.get((normalize(who), normalize(text)))
+
+    def find_containing(self, who, text):
+        """First existing to-do of the same owner whose text contains text, or None"""
+        owner = self._owners.get(normalize(who))
+        if owner is None:
+            return None
+        text = normalize(text)
+        exact = self._exact.get((normalize(who), text))
+        if exact is not None:
+            return exact
+
+        if len(text) < GRAM:
+            # Too short to have a trigram; only happens for one- or two-letter to-dos
+            candidates = range(len(owner['texts']))
+        else:
+            grams = owner['grams']
+            if grams is None:
+                # Built on the first containment lookup; exact-only users never need it
+                grams = owner['grams'] = {}
+                for position, existing in enumerate(owner['texts']):
+                    self._index_grams(grams, position, existing)
+            candidates = min((grams.get(gram, ()) for gram in _grams(text)), key=len)
+        # Positions are in insertion order, so the first hit is the first containing to-do
+        texts = owner['texts']
+        for position in candidates:
+            if text in texts[position]:
+                return owner['todos'][position]
+        return None
+
+
+def filter_new_todos(new_todos, existing_todos):
+    """New to-dos that aren't already contained in an existing to-do of the same owner"""
+    index = existing_todos if isinstance(existing_todos, TodoIndex) else TodoIndex(existing_todos)
+    return [todo for todo in new_todos
+            if index.find_containing(todo.get('WHO'), todo.get('TO-DO')) is None]
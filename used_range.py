@@ -0,0 +1,131 @@
+"""
+The range of a worksheet that actually holds values.
+
+max_row and max_column count every cell that exists, and after dozens of
+copy_worksheet generations most tabs carry grids of styled but empty
+cells (the oldest ones are 1000 x 26 for about 35 x 5 of content), so
+scans bounded by them and append positions derived from them are
+inflated. used_range finds the last row and column with a value once per
+sheet and caches it; code that writes past it reports the new extent with
+extend, and code that shifts rows calls invalidate. trim_workbook drops
+the empty, unformatted cells past the used range of each sheet before
+saving, so later loads don't parse them again.
+
+Scans inside the used range read values with cell_value, which unlike
+sheet.cell() never allocates a cell for an empty position; on a cached
+workbook those cells would otherwise pile up on the shared sheets.
+"""
+
+import weakref
+
+from openpyxl_internals import cell_map, raw_values, stored_value, style_array, style_table
+
+_cache = weakref.WeakKeyDictionary()
+
+
+def cell_value(sheet, row, column):
+    """A cell's value, without creating the cell the way sheet.cell() does on an openpyxl sheet"""
+    if hasattr(sheet, '_get_value'):
+        return sheet._get_value(row, column)
+    return stored_value(sheet, row, column)
+
+
+def _scan(sheet):
+    last_row = last_col = 0
+    if hasattr(sheet, '_get_value'):
+        # xlsx_engine sheet: cells are XML elements keyed like openpyxl's, and
+        # a styled empty cell is an element without a <v> or <is> child
+        get_value = sheet._get_value
+        values = ((row, col, get_value(row, col)) for (row, col), c_el in sheet._cells.items() if len(c_el))
+    else:
+        values = raw_values(sheet)
+    for row, col, value in values:
+        if value is None or (isinstance(value, str) and not value.strip()):
+            continue
+        if row > last_row:
+            last_row = row
+        if col > last_col:
+            last_col = col
+    # Same floor as max_row / max_column on an empty sheet
+    return [max(last_row, 1), max(last_col, 1)]
+
+
+def used_range(sheet):
+    """(last_row, last_column) holding a value, cached per sheet"""
+    bounds = _cache.get(sheet)
+    if bounds is None:
+        bounds = _cache[sheet] = _scan(sheet)
+    return bounds[0], bounds[1]
+
+
+def extend(sheet, row, column):
+    """Record that values were written up to row and column"""
+    bounds = _cache.get(sheet)
+    if bounds is not None:
+        bounds[0] = max(bounds[0], row)
+        bounds[1] = max(bounds[1], column)
+
+
+def invalidate(sheet):
+    """Forget a sheet's cached range, e.g. after inserting or deleting rows"""
+    _cache.pop(sheet, None)
+
+
+def _visible_style_ids(wb):
+    """Border and fill ids that draw something, so cells using them aren't phantom"""
+    borders = {index for index, border in enumerate(style_table(wb, 'borders'))
+               if any(side is not None and side.style
+                      for side in (border.left, border.right, border.top, border.bottom, border.diagonal))}
+    # Gradient fills have no fill_type and always draw
+    fills = {index for index, fill in enumerate(style_table(wb, 'fills'))
+             if getattr(fill, 'fill_type', 'gradient') not in (None, 'none')}
+    return borders, fills
+
+
+def visible_bounds(ws, visible_ids=None):
+    """
+    (last_row, last_column) of an openpyxl sheet covering every value, every
+    merged range and every bordered or filled cell; nothing past it shows
+    """
+    borders, fills = visible_ids or _visible_style_ids(ws.parent)
+    last_row, last_col = used_range(ws)
+    for merged in ws.merged_cells.ranges:
+        last_row = max(last_row, merged.max_row)
+        last_col = max(last_col, merged.max_col)
+    for (row, col), cell in cell_map(ws).items():
+        style = style_array(cell)
+        if style is not None and (style.borderId in borders or style.fillId in fills):
+            last_row = max(last_row, row)
+            last_col = max(last_col, col)
+    return last_row, last_col
+
+
+def trim_sheet(ws, visible_ids=None):
+    """
+    Delete the cells and row formats of an openpyxl sheet that lie past
+    its visible bounds. Returns how many cells went.
+    """
+    last_row, last_col = visible_bounds(ws, visible_ids)
+    cells = cell_map(ws)
+    phantom = [key for key in cells if key[0] > last_row or key[1] > last_col]
+    for key in phantom:
+        del cells[key]
+    for row in [row for row in ws.row_dimensions if row > last_row]:
+        del ws.row_dimensions[row]
+    return len(phantom)
+
+
+def trim_workbook(wb):
+    """
+    Trim every sheet of an openpyxl workbook. Sheets a cache clone still
+    shares with the cached original are left alone. Returns the number of
+    cells removed.
+    """
+    visible_ids = _visible_style_ids(wb)
+    removed = 0
+    for ws in wb.worksheets:
+        if ws.parent is wb:
+            removed += trim_sheet(ws, visible_ids)
+    if removed:
+        print(f"Trimmed {removed} empty cells outside the used ranges")
+    return removed
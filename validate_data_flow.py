@@ -8,8 +8,13 @@ import json
 import shutil
 import os
 from datetime import datetime
+from io import BytesIO
+import openpyxl
 from l10_sheet_automation import L10SheetAutomation
+from workbook_cache import WorkbookCache
 from l10_processor import parse_l10_json
+from used_range import used_range
+from sheet_reader import extract
 
 def print_separator(title):
     """Print a nice separator for test sections"""
@@ -81,6 +86,13 @@ def test_excel_template():
         print(f"✓ Latest sheet: {latest_sheet.title}")
         print(f"✓ Sheet dimensions: {latest_sheet.max_row} rows x {latest_sheet.max_column} columns")
         
+        # The read-only extraction must see the same to-dos as the editable workbook
+        readonly = dict(extract(test_file, [latest_sheet.title]))[latest_sheet.title]
+        if readonly['todos'] != automation.find_existing_todos(latest_sheet):
+            print(f"❌ Read-only to-dos differ from find_existing_todos on {latest_sheet.title}")
+            return False
+        print(f"✓ Read-only extraction: {len(readonly['todos'])} to-dos, {len(readonly['ratings'])} ratings")
+        
         # Clean up
         automation.wb.close()
         os.remove(test_file)
@@ -125,7 +137,8 @@ def test_ai_section_generation(parsed_data):
         
         # Test AI section addition
         initial_max_row = new_sheet.max_row
-        print(f"✓ Initial sheet max row: {initial_max_row}")
+        initial_used_row = used_range(new_sheet)[0]
+        print(f"✓ Initial sheet max row: {initial_max_row} (content ends at row {initial_used_row})")
         
         end_row = automation.add_ai_section(new_sheet, new_todos, new_issues)
         
@@ -135,7 +148,7 @@ def test_ai_section_generation(parsed_data):
         print(f"✓ Rows added: {final_max_row - initial_max_row}")
         
         # Verify some cells have content
-        ai_header_row = initial_max_row + 3  # Based on add_ai_section logic
+        ai_header_row = initial_used_row + 3  # Based on add_ai_section logic
         header_content = new_sheet.cell(row=ai_header_row, column=1).value
         print(f"✓ AI section header: {header_content}")
         
@@ -199,6 +212,41 @@ def test_full_automation_pipeline(parsed_data):
         print(f"❌ Error in full pipeline test: {e}")
         return False
 
+def test_cached_workbook_reopens(parsed_data):
+    """Test that workbooks saved from a cached, shared parse open again"""
+    print_separator("Testing Workbook Cache Round Trip")
+    
+    if not parsed_data:
+        print("❌ No parsed data available for testing")
+        return False
+    
+    try:
+        template_file = 'L10 Summary Template 1.xlsx'
+        cache = WorkbookCache()
+        
+        # The second request is served from the cache and shares its sheets
+        for attempt in (1, 2):
+            output = BytesIO()
+            with open(template_file, 'rb') as source:
+                automation = L10SheetAutomation(source, cache=cache, output=output)
+                result = automation.create_next_l10_sheet_from_data(parsed_data, 'weekly')
+                automation.close()
+            
+            output.seek(0)
+            reopened = openpyxl.load_workbook(output)
+            if result['new_sheet_name'] not in reopened.sheetnames:
+                print(f"❌ Request {attempt}: new sheet missing from the saved workbook")
+                return False
+            reopened.close()
+            print(f"✓ Request {attempt}: saved workbook reopens with {len(reopened.sheetnames)} sheets")
+        
+        print(f"✓ Cache stats: {cache.stats()}")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Error in workbook cache test: {e}")
+        return False
+
 def test_edge_cases():
     """Test edge cases and error handling"""
     print_separator("Testing Edge Cases")
@@ -260,6 +308,7 @@ def main():
     results['excel_template'] = test_excel_template()
     results['ai_section'] = test_ai_section_generation(parsed_data)
     results['full_pipeline'] = test_full_automation_pipeline(parsed_data)
+    results['cached_reopen'] = test_cached_workbook_reopens(parsed_data)
     results['edge_cases'] = test_edge_cases()
     
     # Summary
@@ -0,0 +1,224 @@
+"""
+In-process cache of parsed workbooks keyed by the SHA-256 of their bytes.
+
+Parsing the L10 workbook with openpyxl is the most expensive step of a
+request, and the same bytes come in again and again (the local template,
+or Zapier retrying the same weekly file). The cache keeps a few parsed
+workbooks around and hands out cheap clones of them: a clone gets its own
+workbook shell and style tables but shares the parsed worksheets, which
+callers must treat as read-only (see private_sheet_copy).
+
+A cell or row finds its style id through its sheet's workbook, so a shared
+sheet looks its ids up in the original's style table even while a clone is
+saved. Before a workbook is first cloned, every style array its sheets
+hold is added to its cell style table; the clone starts with a copy of
+that table, so both give a shared sheet's styles the same ids, and
+writing a clone never adds to the original's table.
+"""
+
+import hashlib
+import threading
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+from copy import copy, deepcopy
+
+from openpyxl import Workbook
+from openpyxl.worksheet.copier import WorksheetCopy
+from openpyxl.styles.differential import DifferentialStyleList
+from openpyxl.styles.named_styles import NamedStyleList
+from openpyxl.utils.indexed_list import IndexedList
+
+from openpyxl_internals import (cell_map, part_list, set_part_list, set_sheet_list, set_style_table,
+                                sheet_list, style_array, style_table)
+from parallel_load import load_workbook
+from sheet_layout import register_source
+
+# Rough RSS cost of one parsed openpyxl cell, measured on the L10 template
+BYTES_PER_CELL = 420
+
+STYLE_TABLES = ('fonts', 'alignments', 'borders', 'fills',
+                'number_formats', 'protections', 'cell_styles')
+
+# openpyxl's writer keeps each sheet's relationships, hyperlinks and part
+# number on the sheet while it writes it, so clones sharing sheets are
+# written one at a time
+_save_lock = threading.Lock()
+
+# Workbooks whose cell style table holds every style array of their sheets
+_indexed = weakref.WeakSet()
+_index_lock = threading.Lock()
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """SHA-256 hex digest of a file's contents; path may also be an open binary file, which is rewound"""
+    digest = hashlib.sha256()
+    if hasattr(path, 'read'):
+        path.seek(0)
+        for chunk in iter(lambda: path.read(chunk_size), b''):
+            digest.update(chunk)
+        path.seek(0)
+        return digest.hexdigest()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def estimate_workbook_bytes(wb):
+    """Approximate memory held by a parsed workbook"""
+    return sum(len(cell_map(ws)) for ws in wb.worksheets) * BYTES_PER_CELL
+
+
+class SharedSheetCopy(WorksheetCopy):
+    """WorksheetCopy from a sheet still shared with the clone's cached original"""
+
+    def _verify_resources(self):
+        if self.source.parent is not self.target.parent.origin:
+            super()._verify_resources()
+
+
+class WorkbookClone(Workbook):
+    """
+    Workbook returned by clone_workbook. Its style tables start as copies of
+    the original's, so style ids on the shared sheets stay valid and those
+    sheets can be copied into the clone.
+    """
+
+    origin = None
+
+    def copy_worksheet(self, from_worksheet):
+        if from_worksheet.parent is not self.origin:
+            return super().copy_worksheet(from_worksheet)
+        to_worksheet = self.create_sheet(title=f"{from_worksheet.title} Copy")
+        SharedSheetCopy(source_worksheet=from_worksheet, target_worksheet=to_worksheet).copy_worksheet()
+        return to_worksheet
+
+    @contextmanager
+    def saving(self):
+        """Every writer of a clone has to run inside this (see _save_lock)"""
+        with _save_lock:
+            yield self
+
+    def save(self, filename):
+        with self.saving():
+            super().save(filename)
+
+
+def index_sheet_styles(wb):
+    """Add every style array held by wb's cells, rows and columns to its cell style table, once"""
+    with _index_lock:
+        if wb in _indexed:
+            return
+        cell_styles = style_table(wb, 'cell_styles')
+        for ws in wb.worksheets:
+            for cell in cell_map(ws).values():
+                cell_styles.add(style_array(cell))
+            for dimension in list(ws.row_dimensions.values()) + list(ws.column_dimensions.values()):
+                if style_array(dimension) is not None:
+                    cell_styles.add(style_array(dimension))
+        _indexed.add(wb)
+
+
+def clone_workbook(wb):
+    """
+    Copy of a parsed workbook that shares its worksheets with the original.
+    Sheets can be added, removed and reordered on the clone, and new styles
+    go into the clone's own style tables, so the original is never touched.
+    """
+    index_sheet_styles(wb)
+    clone = WorkbookClone.__new__(WorkbookClone)
+    clone.__dict__.update(wb.__dict__)
+    clone.origin = wb
+    set_sheet_list(clone, list(sheet_list(wb)))
+    for name in STYLE_TABLES:
+        set_style_table(clone, name, IndexedList(style_table(wb, name)))
+    set_style_table(clone, 'named_styles', NamedStyleList(style_table(wb, 'named_styles')))
+    set_style_table(clone, 'differential_styles',
+                    DifferentialStyleList(dxf=list(style_table(wb, 'differential_styles').dxf)))
+    set_style_table(clone, 'date_formats', copy(style_table(wb, 'date_formats')))
+    set_style_table(clone, 'timedelta_formats', copy(style_table(wb, 'timedelta_formats')))
+    clone.defined_names = copy(wb.defined_names)
+    set_part_list(clone, 'pivots', list(part_list(wb, 'pivots')))
+    set_part_list(clone, 'external_links', list(part_list(wb, 'external_links')))
+    clone.views = list(wb.views)
+    return clone
+
+
+def private_sheet_copy(wb, ws):
+    """Replace a shared worksheet in a cloned workbook with its own deep copy"""
+    private = deepcopy(ws, {id(ws.parent): wb})
+    sheets = sheet_list(wb)
+    sheets[sheets.index(ws)] = private
+    return private
+
+
+class WorkbookCache:
+    """Bounded LRU of parsed workbooks with memory-aware eviction"""
+
+    def __init__(self, max_entries=4, max_bytes=512 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def load(self, workbook_path, workers=1):
+        """
+        Return a clone of the parsed workbook, parsing the file only on a miss
+        (on up to workers processes, see parallel_load)
+        """
+        digest = file_digest(workbook_path)
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is not None:
+                self._entries.move_to_end(digest)
+                self.hits += 1
+                print(f"Workbook cache hit: {digest[:12]}")
+                return clone_workbook(entry[0])
+            self.misses += 1
+
+        print(f"Workbook cache miss: {digest[:12]}")
+        wb = load_workbook(workbook_path, workers=workers)
+        # Clones share these sheets, and with them their layouts
+        register_source(wb, digest)
+        self._store(digest, wb)
+        return clone_workbook(wb)
+
+    def _store(self, digest, wb):
+        size = estimate_workbook_bytes(wb)
+        if size > self.max_bytes:
+            print(f"Workbook too large to cache ({size // (1024 * 1024)} MB)")
+            return
+        with self._lock:
+            if digest in self._entries:
+                return
+            self._entries[digest] = (wb, size)
+            self.total_bytes += size
+            while len(self._entries) > self.max_entries or self.total_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        """Hit/miss counters and current footprint"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'estimated_bytes': self.total_bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            }
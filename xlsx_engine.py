@@ -0,0 +1,972 @@
+"""
+Lightweight XML-level workbook engine.
+
+Works directly on the parts of an .xlsx zip instead of loading the whole
+workbook through openpyxl. Worksheets are proxies that read and parse
+their part on first cell access, so only the sheets that are actually
+touched get parsed; every other part is copied through untouched on
+save. The classes mimic the small subset of the openpyxl Workbook/Worksheet
+API that L10SheetAutomation uses, so the automation code runs unchanged
+on top of it.
+"""
+
+import io
+import re
+import struct
+import zipfile
+import xml.etree.ElementTree as ET
+from bisect import bisect_left
+from copy import deepcopy
+from functools import partial
+from xml.sax.saxutils import quoteattr, unescape
+
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from openpyxl.styles.numbers import builtin_format_code, is_date_format, is_timedelta_format
+from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_excel, from_ISO8601
+from openpyxl.utils import get_column_letter
+from openpyxl.utils.cell import coordinate_from_string, column_index_from_string
+from openpyxl.utils.exceptions import IllegalCharacterError
+
+from zip_writer import PackageWriter
+
+MAIN_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+PKG_REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+WORKSHEET_REL_TYPE = REL_NS + '/worksheet'
+WORKSHEET_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml'
+
+# General purpose flag bit of an encrypted zip entry
+ZIP_ENCRYPTED = 0x1
+
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+# Elements that must come before <mergeCells> inside <worksheet>
+MERGE_PREDECESSORS = ('sheetData', 'sheetCalcPr', 'sheetProtection', 'protectedRanges',
+                      'scenarios', 'autoFilter', 'sortState', 'dataConsolidate',
+                      'customSheetViews')
+
+# Elements of a cloned sheet that point at relationships we don't copy
+RELATIONSHIP_ELEMENTS = ('drawing', 'legacyDrawing', 'legacyDrawingHF', 'picture',
+                         'oleObjects', 'controls', 'tableParts')
+
+UNESCAPE_ENTITIES = {'&quot;': '"', '&apos;': "'"}
+
+# XmlWorksheet attributes that only exist once the sheet XML has been parsed
+PARSED_ATTRIBUTES = frozenset(('root', 'sheet_data', '_rows', '_cells', '_row_numbers',
+                               'max_row', 'max_column', '_namespaces', '_root_start'))
+
+
+def _q(tag):
+    """Qualify a tag with the spreadsheetml namespace"""
+    return f'{{{MAIN_NS}}}{tag}'
+
+
+def _local(tag):
+    """Strip the namespace from an ElementTree tag"""
+    return tag.rsplit('}', 1)[-1]
+
+
+def _attr(element_xml, name):
+    """Read an attribute from a single serialized XML element"""
+    match = re.search(r'\s' + re.escape(name) + r'="([^"]*)"', element_xml)
+    return unescape(match.group(1), UNESCAPE_ENTITIES) if match else None
+
+
+def _append_children(xml, container, fragments):
+    """Append serialized children to a container element and bump its count"""
+    if not fragments:
+        return xml
+    body = ''.join(fragments)
+    closed = re.search(rf'<{container}\b([^>]*?)/>', xml)
+    if closed:
+        attrs = re.sub(r'\scount="\d+"', '', closed.group(1))
+        replacement = f'<{container} count="{len(fragments)}"{attrs}>{body}</{container}>'
+        return xml[:closed.start()] + replacement + xml[closed.end():]
+
+    opening = re.search(rf'<{container}\b([^>]*)>', xml)
+    end = xml.index(f'</{container}>', opening.end())
+    count = re.search(r'count="(\d+)"', opening.group(1))
+    xml = xml[:end] + body + xml[end:]
+    if count:
+        new_open = opening.group(0).replace(count.group(0),
+                                            f'count="{int(count.group(1)) + len(fragments)}"')
+        xml = xml[:opening.start()] + new_open + xml[opening.end():]
+    return xml
+
+
+def _canonical(element):
+    """
+    Serialization of a spreadsheetml element without namespace prefixes, as
+    styles.xml spells its children; used to compare and copy style entries
+    """
+    attrs = ''.join(f' {name}={quoteattr(value)}' for name, value in element.attrib.items()
+                    if not name.startswith('{'))
+    children = ''.join(_canonical(child) for child in element
+                       if not child.tag.startswith('{') or child.tag.startswith(f'{{{MAIN_NS}}}'))
+    tag = _local(element.tag)
+    return f'<{tag}{attrs}>{children}</{tag}>' if children else f'<{tag}{attrs}/>'
+
+
+class XmlCell:
+    """Proxy for a single cell; reads and writes go straight to the sheet XML"""
+
+    def __init__(self, sheet, row, column):
+        self.parent = sheet
+        self.row = row
+        self.column = column
+
+    @property
+    def coordinate(self):
+        return f"{get_column_letter(self.column)}{self.row}"
+
+    @property
+    def value(self):
+        return self.parent._get_value(self.row, self.column)
+
+    @value.setter
+    def value(self, value):
+        self.parent._set_value(self.row, self.column, value)
+
+    def _style_getter(name):
+        def getter(self):
+            return self.parent._pending_styles.get((self.row, self.column), {}).get(name)
+
+        def setter(self, value):
+            self.parent._set_style(self.row, self.column, name, value)
+
+        return property(getter, setter)
+
+    font = _style_getter('font')
+    fill = _style_getter('fill')
+    border = _style_getter('border')
+    alignment = _style_getter('alignment')
+    del _style_getter
+
+
+class XmlWorksheet:
+    """
+    A single worksheet backed by its own XML part. The part is read and
+    parsed on first cell access, so a sheet that is only looked up by name
+    costs nothing and is written back verbatim.
+    """
+
+    def __init__(self, workbook, title, part_name, load_xml, is_new=False):
+        self.parent = workbook
+        self._title = title
+        self.part_name = part_name
+        self.is_new = is_new
+        self.dirty = is_new
+        self._pending_styles = {}
+        self._load_xml = load_xml
+
+    def __getattr__(self, name):
+        # Only called for attributes _parse has not set yet
+        if name in PARSED_ATTRIBUTES:
+            self._parse()
+            return self.__dict__[name]
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    @property
+    def parsed(self):
+        return 'root' in self.__dict__
+
+    def _parse(self):
+        xml_bytes = self._load_xml()
+        self._namespaces = []
+        parser = ET.iterparse(io.BytesIO(xml_bytes), events=('start-ns',))
+        for _, (prefix, uri) in parser:
+            self._namespaces.append((prefix, uri))
+        start_tag = re.search(rb'<(?![?!])[^>]+>', xml_bytes)
+        self._root_start = start_tag.group(0).decode('utf-8')
+        root = parser.root
+        self.sheet_data = root.find(_q('sheetData'))
+        if self.sheet_data is None:
+            self.sheet_data = ET.SubElement(root, _q('sheetData'))
+
+        self._rows = {}
+        self._cells = {}
+        last_row = 0
+        for row_el in self.sheet_data.iter(_q('row')):
+            r = int(row_el.get('r', last_row + 1))
+            row_el.set('r', str(r))
+            last_row = r
+            self._rows[r] = row_el
+            last_col = 0
+            for c_el in row_el.findall(_q('c')):
+                if c_el.get('r'):
+                    col = column_index_from_string(coordinate_from_string(c_el.get('r'))[0])
+                else:
+                    col = last_col + 1
+                    c_el.set('r', f"{get_column_letter(col)}{r}")
+                last_col = col
+                self._cells[(r, col)] = c_el
+        self._row_numbers = sorted(self._rows)
+        self._update_dimensions()
+        # Set last: parsed checks for it
+        self.root = root
+
+    def _update_dimensions(self):
+        if self._cells:
+            self.max_row = max(r for r, _ in self._cells)
+            self.max_column = max(c for _, c in self._cells)
+        else:
+            self.max_row = 1
+            self.max_column = 1
+
+    @property
+    def title(self):
+        return self._title
+
+    @title.setter
+    def title(self, value):
+        self.parent._rename_sheet(self, value)
+        self._title = value
+
+    def cell(self, row, column, value=None):
+        """Same contract as openpyxl's Worksheet.cell"""
+        if row < 1 or column < 1:
+            raise ValueError("Row or column values must be at least 1")
+        cell = XmlCell(self, row, column)
+        if value is not None:
+            cell.value = value
+        return cell
+
+    def merge_cells(self, range_string=None, start_row=None, start_column=None,
+                    end_row=None, end_column=None):
+        """Add a merged range to the sheet's <mergeCells>"""
+        if range_string is None:
+            range_string = (f"{get_column_letter(start_column)}{start_row}:"
+                            f"{get_column_letter(end_column)}{end_row}")
+        merge_cells = self.root.find(_q('mergeCells'))
+        if merge_cells is None:
+            merge_cells = ET.Element(_q('mergeCells'))
+            position = 0
+            for index, child in enumerate(self.root):
+                if _local(child.tag) in MERGE_PREDECESSORS:
+                    position = index + 1
+            self.root.insert(position, merge_cells)
+        ET.SubElement(merge_cells, _q('mergeCell'), {'ref': range_string})
+        merge_cells.set('count', str(len(merge_cells)))
+        self.dirty = True
+
+    def _get_value(self, row, column):
+        """The cell's value as openpyxl reads it: dates as datetimes, missing values as None"""
+        c_el = self._cells.get((row, column))
+        if c_el is None:
+            return None
+        cell_type = c_el.get('t', 'n')
+        if cell_type == 'inlineStr':
+            inline = c_el.find(_q('is'))
+            if inline is None:
+                return None
+            return ''.join(t.text or '' for t in inline.iter(_q('t'))) or None
+        text = c_el.findtext(_q('v'))
+        if not text:
+            return None
+        if cell_type == 's':
+            return self.parent.shared_strings[int(text)]
+        if cell_type == 'b':
+            return bool(int(text))
+        if cell_type == 'd':
+            return from_ISO8601(text)
+        if cell_type in ('str', 'e'):
+            return text
+        number = float(text) if '.' in text or 'E' in text or 'e' in text else int(text)
+        style_id = int(c_el.get('s', 0))
+        dates, durations = self.parent.date_formats
+        if style_id in dates:
+            try:
+                return from_excel(number, self.parent.epoch, timedelta=style_id in durations)
+            except (OverflowError, ValueError):
+                # openpyxl turns a serial outside the date range into an error cell
+                return '#VALUE!'
+        return number
+
+    def _ensure_cell(self, row, column):
+        c_el = self._cells.get((row, column))
+        if c_el is not None:
+            return c_el
+
+        row_el = self._rows.get(row)
+        if row_el is None:
+            row_el = ET.Element(_q('row'), {'r': str(row)})
+            index = bisect_left(self._row_numbers, row)
+            self.sheet_data.insert(index, row_el)
+            self._row_numbers.insert(index, row)
+            self._rows[row] = row_el
+        row_el.attrib.pop('spans', None)
+
+        c_el = ET.Element(_q('c'), {'r': f"{get_column_letter(column)}{row}"})
+        existing = row_el.findall(_q('c'))
+        position = sum(1 for other in existing
+                       if column_index_from_string(coordinate_from_string(other.get('r'))[0]) < column)
+        row_el.insert(position, c_el)
+        self._cells[(row, column)] = c_el
+        self.max_row = max(self.max_row, row)
+        self.max_column = max(self.max_column, column)
+        return c_el
+
+    def _set_value(self, row, column, value):
+        # openpyxl writes an empty string as an empty cell too
+        if value == '':
+            value = None
+        if value is None and (row, column) not in self._cells:
+            return
+        c_el = self._ensure_cell(row, column)
+        for child in list(c_el):
+            c_el.remove(child)
+        c_el.attrib.pop('t', None)
+        self.dirty = True
+
+        if value is None:
+            return
+        if isinstance(value, bool):
+            c_el.set('t', 'b')
+            ET.SubElement(c_el, _q('v')).text = '1' if value else '0'
+        elif isinstance(value, (int, float)):
+            ET.SubElement(c_el, _q('v')).text = repr(value)
+        else:
+            value = str(value)
+            if ILLEGAL_CHARACTERS_RE.search(value):
+                raise IllegalCharacterError(f"{value} cannot be used in worksheets.")
+            c_el.set('t', 'inlineStr')
+            text_el = ET.SubElement(ET.SubElement(c_el, _q('is')), _q('t'))
+            text_el.text = value
+            if value != value.strip():
+                text_el.set('{http://www.w3.org/XML/1998/namespace}space', 'preserve')
+
+    def _set_style(self, row, column, name, value):
+        self._ensure_cell(row, column)
+        self._pending_styles.setdefault((row, column), {})[name] = value
+        self.dirty = True
+
+    def strip_relationships(self):
+        """Drop elements that reference the source sheet's relationships"""
+        for tag in RELATIONSHIP_ELEMENTS:
+            for element in self.root.findall(_q(tag)):
+                self.root.remove(element)
+        for view in self.root.iter(_q('sheetView')):
+            view.attrib.pop('tabSelected', None)
+
+    def to_xml(self):
+        """Serialize the sheet, resolving any pending cell styles first"""
+        if not self.parsed:
+            return self._load_xml()
+        for (row, column), styles in self._pending_styles.items():
+            c_el = self._cells[(row, column)]
+            c_el.set('s', str(self.parent.styles.resolve(int(c_el.get('s', 0)), styles)))
+        self._pending_styles = {}
+
+        dimension = self.root.find(_q('dimension'))
+        if dimension is not None:
+            dimension.set('ref', f"A1:{get_column_letter(self.max_column)}{self.max_row}")
+
+        for prefix, uri in self._namespaces:
+            if not re.match(r'ns\d+$', prefix):
+                ET.register_namespace(prefix, uri)
+        ET.register_namespace('', MAIN_NS)
+        body = ET.tostring(self.root, encoding='unicode')
+        # Keep the original root tag so every namespace declaration survives
+        body = self._root_start + body[body.index('>') + 1:]
+        return (XML_DECLARATION + body).encode('utf-8')
+
+
+class StyleTable:
+    """Appends the fonts, fills and cell formats generated cells need to styles.xml"""
+
+    def __init__(self, xml_bytes):
+        self.xml = xml_bytes.decode('utf-8')
+        root = ET.fromstring(xml_bytes)
+        self.counts = {}
+        for container in ('numFmts', 'fonts', 'fills', 'borders', 'cellStyleXfs', 'cellXfs'):
+            element = root.find(_q(container))
+            self.counts[container] = len(element) if element is not None else 0
+        cell_xfs = root.find(_q('cellXfs'))
+        self.base_xfs = list(cell_xfs) if cell_xfs is not None else []
+        self.custom_formats = {int(fmt.get('numFmtId')): fmt.get('formatCode') for fmt in root.iter(_q('numFmt'))}
+        self.pending = {'numFmts': [], 'fonts': [], 'fills': [], 'borders': [], 'cellXfs': []}
+        self.ids = {}
+        self.xf_ids = {}
+        self._serialized = {}
+        # Existing entries by their canonical XML, filled in by the first import_xfs
+        self._xf_fragments = None
+        self._num_fmts = None
+        self.modified = False
+
+    def date_formats(self):
+        """
+        (cellXfs indexes with a date or time number format, the ones of those
+        that are durations), as openpyxl indexes them when it loads styles
+        """
+        dates = set()
+        durations = set()
+        for index, xf in enumerate(self.base_xfs):
+            num_fmt_id = int(xf.get('numFmtId', 0))
+            code = self.custom_formats.get(num_fmt_id) or builtin_format_code(num_fmt_id)
+            if is_date_format(code):
+                dates.add(index)
+                if is_timedelta_format(code):
+                    durations.add(index)
+        return frozenset(dates), frozenset(durations)
+
+    def _serialize(self, obj):
+        """XML of a style object; the interned ones from style_registry are serialized once"""
+        cached = self._serialized.get(id(obj))
+        if cached is None:
+            # Keeping obj alive keeps its id from being reused
+            cached = self._serialized[id(obj)] = (obj, ET.tostring(obj.to_tree(), encoding='unicode'))
+        return cached[1]
+
+    def _component_id(self, container, obj):
+        return self._fragment_id(container, self._serialize(obj))
+
+    def _fragment_id(self, container, fragment):
+        key = (container, fragment)
+        if key not in self.ids:
+            self.ids[key] = self.counts[container] + len(self.pending[container])
+            self.pending[container].append(fragment)
+        return self.ids[key]
+
+    def resolve(self, base_id, styles):
+        """Return the cellXfs index for a base format plus openpyxl style overrides"""
+        key = (base_id, tuple(sorted(
+            (name, self._serialize(obj))
+            for name, obj in styles.items() if obj is not None)))
+        if key in self.xf_ids:
+            return self.xf_ids[key]
+
+        base = self.base_xfs[base_id] if base_id < len(self.base_xfs) else None
+        attrs = dict(base.attrib) if base is not None else {
+            'numFmtId': '0', 'fontId': '0', 'fillId': '0', 'borderId': '0', 'xfId': '0'}
+        children = {_local(child.tag): child for child in base} if base is not None else {}
+
+        for name, container, attr, flag in (('font', 'fonts', 'fontId', 'applyFont'),
+                                            ('fill', 'fills', 'fillId', 'applyFill'),
+                                            ('border', 'borders', 'borderId', 'applyBorder')):
+            if styles.get(name) is not None:
+                attrs[attr] = str(self._component_id(container, styles[name]))
+                attrs[flag] = '1'
+
+        alignment = None
+        if styles.get('alignment') is not None:
+            alignment = self._serialize(styles['alignment'])
+            attrs['applyAlignment'] = '1'
+        elif 'alignment' in children:
+            alignment = self._fragment(children['alignment'])
+        protection = self._fragment(children['protection']) if 'protection' in children else ''
+
+        attr_text = ''.join(f' {name}={quoteattr(value)}' for name, value in attrs.items())
+        inner = (alignment or '') + protection
+        xf = f'<xf{attr_text}>{inner}</xf>' if inner else f'<xf{attr_text}/>'
+
+        xf_id = self.counts['cellXfs'] + len(self.pending['cellXfs'])
+        self.pending['cellXfs'].append(xf)
+        self.xf_ids[key] = xf_id
+        self.modified = True
+        return xf_id
+
+    @staticmethod
+    def _fragment(element):
+        attrs = ''.join(f' {_local(k)}={quoteattr(v)}' for k, v in element.attrib.items())
+        return f'<{_local(element.tag)}{attrs}/>'
+
+    def _index_existing(self):
+        """Map the entries already in styles.xml so imports reuse them instead of appending duplicates"""
+        if self._xf_fragments is not None:
+            return
+        root = ET.fromstring(self.to_xml())
+        for container in ('fonts', 'fills', 'borders'):
+            element = root.find(_q(container))
+            for index, child in enumerate(element if element is not None else []):
+                self.ids.setdefault((container, _canonical(child)), index)
+        self._xf_fragments = {}
+        cell_xfs = root.find(_q('cellXfs'))
+        for index, xf in enumerate(cell_xfs if cell_xfs is not None else []):
+            self._xf_fragments.setdefault(_canonical(xf), index)
+        self._num_fmts = {fmt.get('formatCode'): int(fmt.get('numFmtId')) for fmt in root.iter(_q('numFmt'))}
+
+    def import_xfs(self, source, xf_ids):
+        """
+        Map cellXfs indexes of another package's StyleTable to indexes in this
+        one, copying the number formats, fonts, fills and borders they use
+        """
+        self._index_existing()
+        root = ET.fromstring(source.to_xml())
+        entries = {}
+        for container in ('numFmts', 'fonts', 'fills', 'borders', 'cellXfs'):
+            element = root.find(_q(container))
+            entries[container] = list(element) if element is not None else []
+        return {xf_id: self._import_xf(entries, xf_id) for xf_id in xf_ids}
+
+    def _import_xf(self, entries, xf_id):
+        if xf_id >= len(entries['cellXfs']):
+            return 0
+        xf = entries['cellXfs'][xf_id]
+        attrs = {name: value for name, value in xf.attrib.items() if not name.startswith('{')}
+        for container, attr in (('fonts', 'fontId'), ('fills', 'fillId'), ('borders', 'borderId')):
+            index = int(attrs.get(attr, 0))
+            if index < len(entries[container]):
+                attrs[attr] = str(self._fragment_id(container, _canonical(entries[container][index])))
+        # Ids below 164 are built-in formats and mean the same in every package
+        num_fmt_id = int(attrs.get('numFmtId', 0))
+        if num_fmt_id >= 164:
+            attrs['numFmtId'] = str(self._import_num_fmt(entries['numFmts'], num_fmt_id))
+        if int(attrs.get('xfId', 0)) >= self.counts['cellStyleXfs']:
+            attrs['xfId'] = '0'
+
+        attr_text = ''.join(f' {name}={quoteattr(value)}' for name, value in attrs.items())
+        inner = ''.join(_canonical(child) for child in xf)
+        fragment = f'<xf{attr_text}>{inner}</xf>' if inner else f'<xf{attr_text}/>'
+        if fragment not in self._xf_fragments:
+            self._xf_fragments[fragment] = self.counts['cellXfs'] + len(self.pending['cellXfs'])
+            self.pending['cellXfs'].append(fragment)
+            self.modified = True
+        return self._xf_fragments[fragment]
+
+    def _import_num_fmt(self, num_fmts, num_fmt_id):
+        code = next((fmt.get('formatCode') for fmt in num_fmts if fmt.get('numFmtId') == str(num_fmt_id)), None)
+        if code is None:
+            return 0
+        if code not in self._num_fmts:
+            new_id = max(self._num_fmts.values(), default=163) + 1
+            self._num_fmts[code] = new_id
+            self.pending['numFmts'].append(f'<numFmt numFmtId="{new_id}" formatCode={quoteattr(code)}/>')
+        return self._num_fmts[code]
+
+    def to_xml(self):
+        xml = self.xml
+        if self.pending['numFmts'] and not re.search(r'<numFmts\b', xml):
+            # numFmts is optional but has to come first
+            start = re.search(r'<(?:fonts|fills|borders|cellStyleXfs|cellXfs)\b', xml).start()
+            xml = xml[:start] + '<numFmts count="0"/>' + xml[start:]
+        for container in ('numFmts', 'fonts', 'fills', 'borders', 'cellXfs'):
+            xml = _append_children(xml, container, self.pending[container])
+            self.counts[container] += len(self.pending[container])
+            self.pending[container] = []
+        self.xml = xml
+        return xml.encode('utf-8')
+
+
+class XmlWorkbook:
+    """Zip-part level workbook that only parses the sheets it is asked for"""
+
+    def __init__(self, workbook_path, passthrough=True, compression='balanced', save_workers=1):
+        """
+        workbook_path is a path or a readable binary file positioned anywhere.
+        With passthrough, save() copies the compressed bytes of unchanged
+        parts as they are instead of inflating and deflating them again;
+        only parts stored uncompressed in the source are deflated anyway.
+        compression is a zip_writer preset for the parts save() deflates,
+        on up to save_workers threads.
+        """
+        self.workbook_path = workbook_path
+        self.passthrough = passthrough
+        self.compression = compression
+        self.save_workers = save_workers
+        if hasattr(workbook_path, 'read'):
+            workbook_path.seek(0)
+            self._data = workbook_path.read()
+        else:
+            with open(workbook_path, 'rb') as f:
+                self._data = f.read()
+        self._source = zipfile.ZipFile(io.BytesIO(self._data))
+        self._names = set(self._source.namelist())
+
+        self.workbook_part = self._find_workbook_part()
+        self._workbook_xml = self._source.read(self.workbook_part).decode('utf-8')
+        self._rels_part = self._rels_path(self.workbook_part)
+        self._rels_xml = self._source.read(self._rels_part).decode('utf-8')
+        self._content_types = self._source.read('[Content_Types].xml').decode('utf-8')
+
+        targets = {}
+        for rel in ET.fromstring(self._rels_xml):
+            targets[rel.get('Id')] = self._resolve_target(rel.get('Target'))
+
+        self._sheet_entries = []
+        root = ET.fromstring(self._workbook_xml)
+        # Date serial 0, which workbookPr's date1904 moves from 1900 to 1904
+        properties = root.find(_q('workbookPr'))
+        date1904 = properties is not None and properties.get('date1904') in ('1', 'true')
+        self.epoch = CALENDAR_MAC_1904 if date1904 else CALENDAR_WINDOWS_1900
+        for sheet in root.find(_q('sheets')):
+            rid = sheet.get(f'{{{REL_NS}}}id')
+            self._sheet_entries.append({
+                'name': sheet.get('name'),
+                'sheetId': int(sheet.get('sheetId')),
+                'rid': rid,
+                'part': targets.get(rid),
+            })
+
+        self._original_rids = [entry['rid'] for entry in self._sheet_entries]
+        self._removed = []
+        # Non-worksheet parts written through write_part, and what points at them
+        self._written_parts = {}
+        self._extra_rels = []
+        self._extra_overrides = []
+        self._sheets = {}
+        self._shared_strings = None
+        self._styles = None
+        self._date_formats = None
+        self._styles_part = next((target for target in targets.values()
+                                  if target and target.endswith('styles.xml')), None)
+
+    def _find_workbook_part(self):
+        for rel in ET.fromstring(self._source.read('_rels/.rels')):
+            if rel.get('Type', '').endswith('/officeDocument'):
+                return rel.get('Target').lstrip('/')
+        return 'xl/workbook.xml'
+
+    @staticmethod
+    def _rels_path(part):
+        folder, _, name = part.rpartition('/')
+        return f"{folder}/_rels/{name}.rels" if folder else f"_rels/{name}.rels"
+
+    def _resolve_target(self, target):
+        if target.startswith('/'):
+            return target.lstrip('/')
+        folder = self.workbook_part.rpartition('/')[0]
+        return f"{folder}/{target}" if folder else target
+
+    @property
+    def sheetnames(self):
+        return [entry['name'] for entry in self._sheet_entries]
+
+    @property
+    def shared_strings(self):
+        """Shared string table, parsed on first use"""
+        if self._shared_strings is None:
+            self._shared_strings = []
+            part = self._shared_strings_part
+            if part in self._names:
+                for _, element in ET.iterparse(io.BytesIO(self._source.read(part))):
+                    if element.tag == _q('si'):
+                        self._shared_strings.append(self._string_item_text(element))
+                        element.clear()
+        return self._shared_strings
+
+    @property
+    def _shared_strings_part(self):
+        folder = self.workbook_part.rpartition('/')[0]
+        return f"{folder}/sharedStrings.xml" if folder else 'sharedStrings.xml'
+
+    def _string_items(self):
+        """The <si> elements of the shared string table"""
+        if self._shared_strings_part not in self._names:
+            return []
+        return ET.fromstring(self._source.read(self._shared_strings_part)).findall(_q('si'))
+
+    @staticmethod
+    def _string_item_text(si):
+        """Plain text of an <si>, joining rich-text runs and skipping phonetic hints"""
+        parts = []
+        for child in si:
+            if child.tag == _q('t'):
+                parts.append(child.text or '')
+            elif child.tag == _q('r'):
+                run_text = child.find(_q('t'))
+                if run_text is not None:
+                    parts.append(run_text.text or '')
+        return ''.join(parts)
+
+    @property
+    def styles(self):
+        if self._styles is None:
+            self._styles = StyleTable(self._source.read(self._styles_part))
+        return self._styles
+
+    @property
+    def date_formats(self):
+        """Cell formats whose numbers are dates, and durations (see StyleTable.date_formats)"""
+        if self._date_formats is None:
+            self._date_formats = (self.styles.date_formats() if self._styles_part
+                                  else (frozenset(), frozenset()))
+        return self._date_formats
+
+    def __getitem__(self, name):
+        for entry in self._sheet_entries:
+            if entry['name'] == name:
+                if entry['rid'] not in self._sheets:
+                    self._sheets[entry['rid']] = XmlWorksheet(
+                        self, name, entry['part'], partial(self._source.read, entry['part']))
+                return self._sheets[entry['rid']]
+        raise KeyError(f"Worksheet {name} does not exist.")
+
+    def __contains__(self, name):
+        return name in self.sheetnames
+
+    @property
+    def worksheets(self):
+        """Every sheet as a lazy proxy; none of them is parsed until a cell is read"""
+        return [self[name] for name in self.sheetnames]
+
+    def copy_worksheet(self, from_worksheet):
+        """Clone a sheet's XML into a new part appended at the end of the workbook"""
+        source_xml = from_worksheet.to_xml()
+
+        title = f"{from_worksheet.title} Copy"
+        suffix = 1
+        while title in self.sheetnames:
+            title = f"{from_worksheet.title} Copy{suffix}"
+            suffix += 1
+
+        sheet = self._append_sheet(title, lambda: source_xml)
+        sheet.strip_relationships()
+        return sheet
+
+    def import_worksheet(self, from_worksheet):
+        """
+        Append a copy of a sheet of another XmlWorkbook under the same title.
+        Its shared strings are inlined and its cell formats copied into this
+        workbook's styles, so the copy doesn't depend on the other package.
+        """
+        if from_worksheet.title in self.sheetnames:
+            raise ValueError(f"Sheet name {from_worksheet.title} already exists")
+        source = from_worksheet.parent
+        source_xml = from_worksheet.to_xml()
+        sheet = self._append_sheet(from_worksheet.title, lambda: source_xml)
+        sheet.strip_relationships()
+
+        strings = None
+        for c_el in sheet._cells.values():
+            if c_el.get('t') != 's':
+                continue
+            if strings is None:
+                strings = source._string_items()
+            v_el = c_el.find(_q('v'))
+            c_el.remove(v_el)
+            c_el.set('t', 'inlineStr')
+            inline = ET.SubElement(c_el, _q('is'))
+            # Rich-text runs carry over; phonetic hints don't belong in an inline string
+            inline.extend(deepcopy(child) for child in strings[int(v_el.text)]
+                          if child.tag in (_q('t'), _q('r')))
+
+        styled = [(c_el, 's') for c_el in sheet._cells.values() if 's' in c_el.attrib]
+        styled += [(row_el, 's') for row_el in sheet._rows.values() if 's' in row_el.attrib]
+        styled += [(col_el, 'style') for col_el in sheet.root.iter(_q('col')) if 'style' in col_el.attrib]
+        if styled:
+            ids = self.styles.import_xfs(source.styles, {int(element.get(attr)) for element, attr in styled})
+            for element, attr in styled:
+                element.set(attr, str(ids[int(element.get(attr))]))
+        return sheet
+
+    def _append_sheet(self, title, load_xml):
+        """A new worksheet part at the end of the workbook, read through load_xml"""
+        used = []
+        for name in self._names | {e['part'] for e in self._sheet_entries if e['part']}:
+            match = re.search(r'worksheets/sheet(\d+)\.xml$', name)
+            if match:
+                used.append(int(match.group(1)))
+        folder = self.workbook_part.rpartition('/')[0]
+        part_name = f"{folder}/worksheets/sheet{max(used, default=0) + 1}.xml"
+
+        rid = self._next_rid()
+        entry = {
+            'name': title,
+            'sheetId': max((e['sheetId'] for e in self._sheet_entries), default=0) + 1,
+            'rid': rid,
+            'part': part_name,
+            'new': True,
+        }
+        self._sheet_entries.append(entry)
+        sheet = XmlWorksheet(self, title, part_name, load_xml, is_new=True)
+        self._sheets[rid] = sheet
+        return sheet
+
+    def _next_rid(self):
+        rids = [int(m.group(1)) for m in re.finditer(r'Id="rId(\d+)"', self._rels_xml)]
+        rids += [int(e['rid'][3:]) for e in self._sheet_entries if re.match(r'rId\d+$', e['rid'])]
+        rids += [int(rid[3:]) for rid, _, _ in self._extra_rels]
+        return f"rId{max(rids, default=0) + 1}"
+
+    def part_names(self):
+        """Names of every part in the package, including ones written since loading"""
+        return self._names | set(self._written_parts)
+
+    def read_part(self, part_name):
+        if part_name in self._written_parts:
+            return self._written_parts[part_name]
+        return self._source.read(part_name)
+
+    def write_part(self, part_name, data, content_type=None):
+        """
+        Add or replace a package part that isn't a worksheet. content_type
+        registers an Override for a part that is new to the package.
+        """
+        if content_type and part_name not in self.part_names():
+            self._extra_overrides.append((part_name, content_type))
+        self._written_parts[part_name] = data
+
+    def add_relationship(self, rel_type, part_name):
+        """Relate a part to the workbook part and return the relationship id"""
+        folder = self.workbook_part.rpartition('/')[0]
+        depth = folder.count('/') + 1 if folder else 0
+        rid = self._next_rid()
+        self._extra_rels.append((rid, rel_type, '../' * depth + part_name))
+        return rid
+
+    def remove(self, worksheet):
+        """Drop a sheet together with its relationship, content type and part"""
+        entry = next((e for e in self._sheet_entries if e['part'] == worksheet.part_name), None)
+        if entry is None:
+            raise ValueError(f"Worksheet {worksheet.title} is not in this workbook")
+        self._sheet_entries.remove(entry)
+        self._sheets.pop(entry['rid'], None)
+        if not entry.get('new'):
+            self._removed.append(entry)
+
+    def _rename_sheet(self, sheet, title):
+        if title in self.sheetnames and title != sheet.title:
+            raise ValueError(f"Sheet name {title} already exists")
+        for entry in self._sheet_entries:
+            if entry['part'] == sheet.part_name:
+                entry['name'] = title
+                entry['renamed'] = True
+
+    def _patched_workbook_xml(self):
+        xml = self._workbook_xml
+        prefix = re.search(r'xmlns:(\w+)="' + re.escape(REL_NS) + '"', xml)
+        prefix = prefix.group(1) if prefix else 'r'
+
+        removed = {e['rid'] for e in self._removed}
+
+        def rename(match):
+            element = match.group(0)
+            rid = _attr(element, f'{prefix}:id')
+            if rid in removed:
+                return ''
+            entry = next((e for e in self._sheet_entries if e['rid'] == rid), None)
+            if entry and entry.get('renamed'):
+                element = re.sub(r'\sname="[^"]*"', f' name={quoteattr(entry["name"])}', element)
+            return element
+
+        xml = re.sub(r'<sheet\b[^>]*/>', rename, xml)
+        if removed:
+            xml = self._reindex_sheet_references(xml)
+        new_sheets = [f'<sheet state="visible" name={quoteattr(e["name"])} '
+                      f'sheetId="{e["sheetId"]}" {prefix}:id="{e["rid"]}"/>'
+                      for e in self._sheet_entries if e.get('new')]
+        end = xml.index('</sheets>')
+        return xml[:end] + ''.join(new_sheets) + xml[end:]
+
+    def _reindex_sheet_references(self, xml):
+        """Point sheet-position references in workbook.xml past the removed sheets"""
+        removed = {e['rid'] for e in self._removed}
+        kept = [i for i, rid in enumerate(self._original_rids) if rid not in removed]
+        positions = {old: new for new, old in enumerate(kept)}
+
+        def defined_name(match):
+            old = int(match.group(1))
+            if old not in positions:
+                return ''
+            return match.group(0).replace(f'localSheetId="{old}"', f'localSheetId="{positions[old]}"', 1)
+
+        xml = re.sub(r'<definedName\b[^>]*\blocalSheetId="(\d+)"[^>]*(?:/>|>.*?</definedName>)',
+                     defined_name, xml, flags=re.S)
+
+        def view_attr(match):
+            old = int(match.group(2))
+            new = positions.get(old, max(len(self._sheet_entries) - 1, 0))
+            return f'{match.group(1)}="{new}"'
+
+        return re.sub(r'\b(activeTab|firstSheet)="(\d+)"', view_attr, xml)
+
+    def _patched_rels_xml(self):
+        removed = {e['rid'] for e in self._removed}
+        rels_xml = re.sub(r'<Relationship\b[^>]*/>',
+                          lambda m: '' if _attr(m.group(0), 'Id') in removed else m.group(0),
+                          self._rels_xml)
+        folder = self.workbook_part.rpartition('/')[0]
+        new_rels = []
+        for entry in self._sheet_entries:
+            if entry.get('new'):
+                target = entry['part'][len(folder) + 1:] if folder else entry['part']
+                new_rels.append(f'<Relationship Id="{entry["rid"]}" Type="{WORKSHEET_REL_TYPE}" '
+                                f'Target={quoteattr(target)}/>')
+        for rid, rel_type, target in self._extra_rels:
+            new_rels.append(f'<Relationship Id="{rid}" Type="{rel_type}" Target={quoteattr(target)}/>')
+        end = rels_xml.index('</Relationships>')
+        return rels_xml[:end] + ''.join(new_rels) + rels_xml[end:]
+
+    def _patched_content_types(self):
+        removed = {'/' + e['part'] for e in self._removed}
+        content_types = re.sub(r'<Override\b[^>]*/>',
+                               lambda m: '' if _attr(m.group(0), 'PartName') in removed else m.group(0),
+                               self._content_types)
+        overrides = [f'<Override ContentType="{WORKSHEET_CONTENT_TYPE}" '
+                     f'PartName={quoteattr("/" + e["part"])}/>'
+                     for e in self._sheet_entries if e.get('new')]
+        overrides += [f'<Override ContentType="{content_type}" PartName={quoteattr("/" + part_name)}/>'
+                      for part_name, content_type in self._extra_overrides]
+        end = content_types.index('</Types>')
+        return content_types[:end] + ''.join(overrides) + content_types[end:]
+
+    def _compressed_bytes(self, info):
+        """An entry's data as stored in the source zip, or None if it can't be copied as is"""
+        if info.flag_bits & ZIP_ENCRYPTED:
+            return None
+        header = self._data[info.header_offset:info.header_offset + zipfile.sizeFileHeader]
+        if len(header) < zipfile.sizeFileHeader or header[:4] != zipfile.stringFileHeader:
+            return None
+        name_length, extra_length = struct.unpack('<HH', header[26:30])
+        start = info.header_offset + zipfile.sizeFileHeader + name_length + extra_length
+        return self._data[start:start + info.compress_size]
+
+    def save(self, filename):
+        """
+        Write the workbook, re-serializing only the parts that changed.
+        filename is a path or a writable binary file, which is written in place.
+        """
+        replaced = {}
+        added = []
+        for entry in self._sheet_entries:
+            sheet = self._sheets.get(entry['rid'])
+            if sheet is None:
+                continue
+            if entry.get('new'):
+                added.append((entry['part'], sheet.to_xml()))
+            elif sheet.dirty:
+                replaced[entry['part']] = sheet.to_xml()
+
+        if self._styles is not None and self._styles.modified:
+            replaced[self._styles_part] = self._styles.to_xml()
+        if self._removed or any(e.get('new') or e.get('renamed') for e in self._sheet_entries):
+            replaced[self.workbook_part] = self._patched_workbook_xml().encode('utf-8')
+        for part_name, data in self._written_parts.items():
+            if part_name in self._names:
+                replaced[part_name] = data
+            else:
+                added.append((part_name, data))
+        if added or self._removed or self._extra_rels:
+            replaced[self._rels_part] = self._patched_rels_xml().encode('utf-8')
+            replaced['[Content_Types].xml'] = self._patched_content_types().encode('utf-8')
+        # Parts that only removed sheets pointed at (drawings etc.) are left in place
+        dropped = set()
+        for entry in self._removed:
+            dropped.update((entry['part'], self._rels_path(entry['part'])))
+
+        # A path is only overwritten once the whole package has been built
+        to_file = hasattr(filename, 'write')
+        buffer = filename if to_file else io.BytesIO()
+        writer = PackageWriter(self.compression, self.save_workers)
+        for info in self._source.infolist():
+            if info.filename in dropped:
+                continue
+            data = replaced.get(info.filename)
+            if data is None and self.passthrough and info.compress_type == zipfile.ZIP_DEFLATED:
+                raw = self._compressed_bytes(info)
+                if raw is not None:
+                    writer.add_compressed(info, raw)
+                    continue
+            if data is None:
+                data = self._source.read(info.filename)
+            writer.add(info, data)
+        for part_name, data in added:
+            writer.add(part_name, data)
+        writer.write(buffer)
+
+        if not to_file:
+            with open(filename, 'wb') as f:
+                f.write(buffer.getvalue())
+
+    def close(self):
+        self._source.close()
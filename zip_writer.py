@@ -0,0 +1,186 @@
+"""
+Zip packages written with their parts compressed in parallel.
+
+zipfile, and with it openpyxl's save, deflates one part after the other,
+so saving the 60-tab L10 workbook spends most of its time in single-
+threaded zlib. A PackageWriter collects the parts of a package in order,
+deflates the ones that aren't compressed yet on a thread pool (zlib
+releases the GIL while it works) and then writes the local headers, data
+and central directory in the order the parts were added.
+
+The output only depends on the parts and the compression preset, never on
+the number of workers or the clock: every part is deflated on its own at
+the preset's levels, and parts without a timestamp of their own get a
+fixed one. save_workbook runs openpyxl's writer into an uncompressed
+staging zip (with the same fixed timestamps) and compresses that. Unlike
+Workbook.save it doesn't stamp the workbook's modified date with the
+clock: the core properties are written as they were loaded, and
+parallel_load dates a package without any with its fixed UNDATED. Saving
+the same workbook twice therefore gives the same bytes, as long as
+nothing else in it (such as a generated id) changes between saves.
+"""
+
+import io
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+from openpyxl.writer.excel import ExcelWriter
+
+from parallel_load import resolve_workers
+from workbook_cache import WorkbookClone
+
+# zlib levels each preset deflates a part at, keeping the smallest result.
+# 'balanced' is zipfile's default; on sheet XML zlib's level 9 often comes
+# out larger than 6, so 'small' tries both.
+COMPRESSION_PRESETS = {'fast': (1,), 'balanced': (6,), 'small': (6, 9)}
+
+# Timestamp of parts that don't bring one of their own
+PART_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+# Permissions zipfile.writestr gives a part written by name
+PART_ATTRIBUTES = 0o600 << 16
+
+# General purpose flag bit of a zip entry whose sizes follow its data
+ZIP_DATA_DESCRIPTOR = 0x8
+
+
+def compression_levels(compression):
+    """The zlib levels of a compression preset"""
+    if compression not in COMPRESSION_PRESETS:
+        raise ValueError(f"Unknown compression '{compression}', expected one of {tuple(COMPRESSION_PRESETS)}")
+    return COMPRESSION_PRESETS[compression]
+
+
+def deflate(data, levels):
+    """
+    data as a raw deflate stream, exactly as zipfile writes it at the level
+    of levels that gives the smallest output (the first one on a tie)
+    """
+    best = None
+    for level in levels:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+        raw = compressor.compress(data) + compressor.flush()
+        if best is None or len(raw) < len(best):
+            best = raw
+    return best
+
+
+def part_info(name):
+    """ZipInfo for a new part, with the fixed timestamp"""
+    info = zipfile.ZipInfo(name, date_time=PART_DATE_TIME)
+    info.external_attr = PART_ATTRIBUTES
+    return info
+
+
+def clone_info(info):
+    """Fresh ZipInfo for an entry, keeping its name, timestamp and attributes"""
+    clone = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+    clone.compress_type = info.compress_type
+    clone.external_attr = info.external_attr
+    clone.create_system = info.create_system
+    return clone
+
+
+def write_compressed(out, info, raw):
+    """
+    Append an entry to a ZipFile being written from its already-compressed
+    bytes. The sizes and CRC go into the local header, so the source's data
+    descriptor (if it had one) isn't needed.
+    """
+    clone = clone_info(info)
+    clone.CRC = info.CRC
+    clone.compress_size = info.compress_size
+    clone.file_size = info.file_size
+    clone.flag_bits = info.flag_bits & ~ZIP_DATA_DESCRIPTOR
+    clone.header_offset = out.fp.tell()
+    out.fp.write(clone.FileHeader())
+    out.fp.write(raw)
+    out.filelist.append(clone)
+    out.NameToInfo[clone.filename] = clone
+    out.start_dir = out.fp.tell()
+
+
+class PackageWriter:
+    """Parts of a zip package, deflated on a thread pool and written in the order they were added"""
+
+    def __init__(self, compression='balanced', workers=1):
+        self.levels = compression_levels(compression)
+        self.workers = resolve_workers(workers)
+        self._parts = []
+
+    def add(self, name, data):
+        """Add a part to deflate; name is a part name or a ZipInfo whose timestamp and attributes are kept"""
+        info = clone_info(name) if isinstance(name, zipfile.ZipInfo) else part_info(name)
+        info.compress_type = zipfile.ZIP_DEFLATED
+        self._parts.append((info, data, None))
+
+    def add_compressed(self, info, raw):
+        """Add a part from its compressed bytes, as described by info (a source zip's ZipInfo)"""
+        self._parts.append((info, None, raw))
+
+    def _deflate_all(self, datas):
+        if self.workers > 1 and len(datas) > 1:
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(datas))) as threads:
+                return list(threads.map(deflate, datas, [self.levels] * len(datas)))
+        return [deflate(data, self.levels) for data in datas]
+
+    def write(self, target):
+        """Write the package to target, a path or a writable binary file"""
+        pending = [data for _, data, raw in self._parts if raw is None]
+        deflated = iter(self._deflate_all(pending))
+        with zipfile.ZipFile(target, 'w', allowZip64=True) as out:
+            for info, data, raw in self._parts:
+                if raw is None:
+                    raw = next(deflated)
+                    info.CRC = zlib.crc32(data)
+                    info.file_size = len(data)
+                    info.compress_size = len(raw)
+                write_compressed(out, info, raw)
+
+
+class StagingZip(zipfile.ZipFile):
+    """
+    Uncompressed zip that gives every part the fixed timestamp, including the
+    worksheets openpyxl writes from temporary files
+    """
+
+    def __init__(self, file):
+        super().__init__(file, 'w', zipfile.ZIP_STORED, allowZip64=True)
+
+    def writestr(self, zinfo_or_arcname, data, compress_type=None, compresslevel=None):
+        if not isinstance(zinfo_or_arcname, zipfile.ZipInfo):
+            zinfo_or_arcname = part_info(zinfo_or_arcname)
+        super().writestr(zinfo_or_arcname, data, compress_type, compresslevel)
+
+    def write(self, filename, arcname=None, compress_type=None, compresslevel=None):
+        with open(filename, 'rb') as f:
+            self.writestr(arcname or filename, f.read(), compress_type, compresslevel)
+
+
+def stage_workbook(wb):
+    """The openpyxl workbook as an uncompressed package in memory, for a PackageWriter to compress"""
+    if wb.read_only:
+        raise TypeError("Workbook is read-only")
+    if wb.write_only and not wb.worksheets:
+        wb.create_sheet()
+    staged = io.BytesIO()
+    # Clones of a cached workbook share sheets, which openpyxl's writer keeps state on
+    with wb.saving() if isinstance(wb, WorkbookClone) else nullcontext():
+        for ws in wb.worksheets:
+            # openpyxl writes a sheet's outlineLevelCol from its previous write of
+            # the columns, so the first save of a sheet would differ from the rest
+            if hasattr(ws, 'column_dimensions'):
+                ws.column_dimensions.to_tree()
+        ExcelWriter(wb, StagingZip(staged)).save()
+    return staged
+
+
+def save_workbook(wb, target, compression='balanced', workers=1):
+    """wb.save(target) with the parts deflated on up to workers threads (0 means one per CPU)"""
+    writer = PackageWriter(compression, workers)
+    with zipfile.ZipFile(stage_workbook(wb)) as staged:
+        for info in staged.infolist():
+            writer.add(info, staged.read(info))
+    writer.write(target)